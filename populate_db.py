@@ -11,6 +11,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.embeddings.embedding_utils import EmbeddingManager
 from src.vector_db.vector_db_manager import VectorDBManager
+from src.retrieval.chunking import chunk_faq
+from src.config import config
 
 def populate_database():
     """Populate the vector database with FAQ data."""
@@ -33,19 +35,20 @@ def populate_database():
     metadatas = []
     
     for faq in faq_data['faqs']:
-        # Concatenate question and answer for embedding and storage
-        qa_text = f"Q: {faq['question']}\nA: {faq['answer']}"
-        embedding = embedding_manager.get_embedding(qa_text)
+        # Long answers are split into overlapping chunks that each repeat the question
         unique_id = f"{faq['id']}_{faq['language']}"
-        documents.append(qa_text)
-        embeddings.append(embedding)
-        metadatas.append({
-            'id': unique_id,
-            'base_id': faq['id'],
-            'language': faq['language'],
-            'question': faq['question'],
-            'answer': faq['answer']
-        })
+        chunks = chunk_faq(
+            unique_id,
+            faq['question'],
+            faq['answer'],
+            {'base_id': faq['id'], 'language': faq['language']},
+            max_tokens=config.retrieval.chunk_max_tokens,
+            overlap_tokens=config.retrieval.chunk_overlap_tokens
+        )
+        for qa_text, metadata in chunks:
+            documents.append(qa_text)
+            embeddings.append(embedding_manager.get_embedding(qa_text))
+            metadatas.append(metadata)
     
     # Add to vector database
     print(f"Adding {len(documents)} documents to vector database...")
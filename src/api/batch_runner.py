@@ -0,0 +1,311 @@
+"""
+Offline batch answering for evaluation and cache pre-fill.
+
+Questions are read from a JSONL file, retrieved in batches (one batched encoder
+pass per batch) and answered through the same ``QueryPipeline`` stages as
+``/query``, with at most ``--concurrency`` generations in flight. Each answer is
+appended to the output JSONL with its confidence, usage and stage timings. The
+output file doubles as the checkpoint: rerunning with the same output skips
+every question already answered in it and retries the ones that failed, so an
+interrupted or degraded run can be resumed to completion.
+
+Usage:
+    python -m src.api.batch_runner questions.jsonl answers.jsonl
+    python -m src.api.batch_runner requests.jsonl answers.jsonl --id-field request_id --question-field body
+    python -m src.api.batch_runner questions.jsonl answers.jsonl --fill-cache
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from src.api.pipeline import QueryPipeline
+from src.config import config
+from src.utils.validation import sanitize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 32
+
+def load_questions(
+    path: str,
+    question_field: str = "question",
+    id_field: str = "id",
+    language_field: str = "language"
+) -> List[Dict[str, Any]]:
+    """
+    Read questions from a JSONL file.
+
+    Lines without the id field are identified by their line number; lines with
+    an empty question are skipped.
+
+    Args:
+        path (str): Input JSONL file.
+        question_field (str): Field holding the question text.
+        id_field (str): Field holding a stable question id.
+        language_field (str): Field holding the language code; missing means "auto".
+
+    Returns:
+        List[Dict[str, Any]]: Items with id, question and language.
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = sanitize_text(str(record.get(question_field) or ""))
+            if not question:
+                logger.warning(f"Skipping line {line_number}: no '{question_field}'")
+                continue
+            items.append({
+                "id": str(record.get(id_field) or f"line-{line_number}"),
+                "question": question,
+                "language": record.get(language_field) or "auto"
+            })
+    return items
+
+def load_completed_ids(path: str) -> Set[str]:
+    """Ids already answered in an output file, used to resume an interrupted run.
+
+    Error records do not count, so failed questions are retried on the next run.
+    """
+    if not Path(path).exists():
+        return set()
+    completed = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                    if "error" not in record:
+                        completed.add(record["id"])
+                except (ValueError, KeyError):
+                    # A run killed mid-write can leave a truncated last line; that question is redone
+                    continue
+    return completed
+
+class BatchRunner:
+    """Answers question batches through a ``QueryPipeline``."""
+
+    def __init__(
+        self,
+        pipeline: QueryPipeline,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concurrency: Optional[int] = None,
+        cache_manager=None
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            pipeline (QueryPipeline): Pipeline whose retrieval, LLM and confidence managers are used.
+            batch_size (int): Questions retrieved together and written per checkpoint.
+            concurrency (Optional[int]): Generations in flight at once. If None, uses config.llm.max_concurrency.
+            cache_manager: Optional CacheManager to pre-fill with confident answers.
+        """
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.concurrency = concurrency or config.llm.max_concurrency
+        self.cache_manager = cache_manager
+
+    def _resolve_language(self, item: Dict[str, Any]) -> str:
+        retrieval_manager = self.pipeline.retrieval_manager
+        if item["language"] == "auto":
+            return retrieval_manager.detect_language(item["question"])
+        return retrieval_manager.normalize_language(item["language"])
+
+    def _retrieve(self, items: List[Dict[str, Any]]) -> tuple:
+        """
+        Detect languages and retrieve a batch of questions.
+
+        Failures are isolated per item: an item whose language cannot be resolved gets
+        an exception in place of its language, and if the batched retrieval fails each
+        item is retrieved on its own so only the failing ones get an exception in
+        place of their results.
+
+        Returns:
+            tuple: Languages and retrieval results, aligned with ``items``.
+        """
+        retrieval_manager = self.pipeline.retrieval_manager
+        languages = []
+        for item in items:
+            try:
+                languages.append(self._resolve_language(item))
+            except Exception as e:
+                logger.error(f"Language detection failed for {item['id']}: {e}")
+                languages.append(e)
+
+        results = [language if isinstance(language, Exception) else None for language in languages]
+        pending = [index for index, language in enumerate(languages) if not isinstance(language, Exception)]
+        if not pending:
+            return languages, results
+        try:
+            batch_results = retrieval_manager.process_queries(
+                [items[index]["question"] for index in pending],
+                [languages[index] for index in pending],
+                batch_size=self.batch_size
+            )
+            for index, item_results in zip(pending, batch_results):
+                results[index] = item_results
+        except Exception as e:
+            logger.warning(f"Batched retrieval failed ({e}), retrieving {len(pending)} questions one by one")
+            for index in pending:
+                try:
+                    results[index] = retrieval_manager.process_query(items[index]["question"], languages[index])
+                except Exception as item_error:
+                    logger.error(f"Retrieval failed for {items[index]['id']}: {item_error}")
+                    results[index] = item_error
+        return languages, results
+
+    async def _answer(
+        self,
+        item: Dict[str, Any],
+        language: str,
+        retrieval_results,
+        retrieval_seconds: float,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        """Answer one question and build its output record."""
+        timings = {"retrieval": retrieval_seconds}
+        if isinstance(retrieval_results, Exception):
+            # Language detection or retrieval failed for this item alone
+            return {
+                "id": item["id"], "question": item["question"], "language": item["language"],
+                "error": f"retrieval failed: {retrieval_results}", "timings": timings
+            }
+        record = {"id": item["id"], "question": item["question"], "language": language}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self.pipeline.answer(item["question"], language, retrieval_results, timings)
+            except Exception as e:
+                logger.error(f"Failed to answer {item['id']}: {e}")
+                return {**record, "error": str(e), "timings": timings}
+            timings["total"] = retrieval_seconds + time.perf_counter() - start
+
+        if self.cache_manager is not None and not response.confidence["flagged_for_review"]:
+            try:
+                # Keyed like /query: on the requested language, not the detected one
+                await asyncio.to_thread(self.cache_manager.set, item["question"], response.model_dump(), item["language"])
+            except Exception as e:
+                logger.error(f"Cache store failed for {item['id']}: {e}")
+
+        return {
+            **record,
+            "route": response.route,
+            "answer": response.answer,
+            "model": response.model,
+            "usage": response.usage,
+            "confidence": response.confidence,
+            "sources": [result.id for result in retrieval_results or []],
+            "timings": timings
+        }
+
+    async def run(self, items: List[Dict[str, Any]], output_path: str) -> Dict[str, Any]:
+        """
+        Answer ``items``, appending records to ``output_path`` one batch at a time.
+
+        Args:
+            items (List[Dict[str, Any]]): Questions from ``load_questions``.
+            output_path (str): Output JSONL file; questions already answered in it are skipped
+                and questions that failed are retried, appending a new record.
+
+        Returns:
+            Dict[str, Any]: Run summary with counts, routes, elapsed time and throughput.
+        """
+        completed = load_completed_ids(output_path)
+        pending = [item for item in items if item["id"] not in completed]
+        logger.info(f"{len(pending)} questions to answer ({len(items) - len(pending)} already in {output_path})")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        routes = Counter()
+        errors = 0
+        start = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as output:
+            for offset in range(0, len(pending), self.batch_size):
+                batch = pending[offset:offset + self.batch_size]
+                batch_start = time.perf_counter()
+                languages, results = await asyncio.to_thread(self._retrieve, batch)
+                retrieval_seconds = (time.perf_counter() - batch_start) / len(batch)
+
+                records = await asyncio.gather(*(
+                    self._answer(item, language, item_results, retrieval_seconds, semaphore)
+                    for item, language, item_results in zip(batch, languages, results)
+                ))
+                for record in records:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    routes[record.get("route", "error")] += 1
+                    errors += "error" in record
+                # Flushed per batch, so a crash loses at most the batch in flight
+                output.flush()
+                logger.info(f"Answered {offset + len(batch)}/{len(pending)} questions")
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "answered": len(pending) - errors,
+            "errors": errors,
+            "skipped": len(items) - len(pending),
+            "routes": dict(routes),
+            "elapsed_seconds": round(elapsed, 2),
+            "questions_per_hour": round(len(pending) / elapsed * 3600) if elapsed > 0 and pending else 0
+        }
+        logger.info(f"Batch run finished: {summary}")
+        return summary
+
+async def _run_cli(args) -> Dict[str, Any]:
+    from src.retrieval.retrieval_manager import RetrievalManager
+    from src.api.confidence_manager import ConfidenceManager
+    from src.api.cache_manager import CacheManager
+    from src.llm.llm_manager import LLMManager
+    from src.llm.resilience import ResilientLLMManager
+
+    fallback = LLMManager(config.llm.fallback_model_name) if config.llm.fallback_model_name else None
+    llm_manager = ResilientLLMManager(LLMManager(), fallback=fallback)
+    cache_manager = None
+    if args.fill_cache:
+        cache_manager = CacheManager(
+            redis_url=config.cache.redis_url or "redis://localhost:6379",
+            default_ttl=config.cache.ttl,
+            max_size=config.cache.max_size
+        )
+    # Nothing is tracked for review offline, so no question tracker is needed
+    pipeline = QueryPipeline(RetrievalManager(), llm_manager, ConfidenceManager(), question_tracker=None)
+    runner = BatchRunner(pipeline, batch_size=args.batch_size, concurrency=args.concurrency, cache_manager=cache_manager)
+
+    items = load_questions(args.input, args.question_field, args.id_field, args.language_field)
+    if args.limit:
+        items = items[:args.limit]
+    try:
+        return await runner.run(items, args.output)
+    finally:
+        pipeline.shutdown()
+        await llm_manager.aclose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions offline.")
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("output", help="JSONL file to append answers to; also the resume checkpoint")
+    parser.add_argument("--question-field", default="question", help="Field holding the question text")
+    parser.add_argument("--id-field", default="id", help="Field holding a stable question id")
+    parser.add_argument("--language-field", default="language", help="Field holding the language code")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Questions retrieved per batch")
+    parser.add_argument("--concurrency", type=int, default=None, help="Generations in flight at once")
+    parser.add_argument("--fill-cache", action="store_true", help="Store confident answers in the response cache")
+    parser.add_argument("--limit", type=int, default=None, help="Answer at most this many questions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not config.llm.api_key:
+        parser.error("OPENAI_API_KEY is required for batch generation")
+    summary = asyncio.run(_run_cli(args))
+    print(json.dumps(summary, indent=2))
+    sys.exit(1 if summary["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
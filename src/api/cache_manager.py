@@ -1,22 +1,35 @@
 import json
+import time
 import hashlib
+import threading
 import redis
 import logging
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+# Redis counter of FAQ index changes, shared by every worker using the cache
+INDEX_VERSION_KEY = "response_cache:index_version"
+
 class CacheManager:
-    def __init__(self, redis_url: str = "redis://localhost:6379", default_ttl: int = 3600):
+    def __init__(self, redis_url: str = "redis://localhost:6379", default_ttl: int = 3600, max_size: int = 1000):
         """
         Initialize cache manager with Redis connection.
         
         Args:
             redis_url: Redis connection URL
             default_ttl: Default time-to-live in seconds (1 hour)
+            max_size: Maximum entries of the in-memory fallback, evicted least recently used first
         """
         self.default_ttl = default_ttl
+        self.max_size = max_size
+        # Index version of the in-memory fallback, which only this process can see anyway
+        self._local_index_version = 0
+        self._lock = threading.Lock()
+        # Fallback entries: cache key -> (expiry time, response)
+        self._memory_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
         try:
             self.redis_client = redis.from_url(redis_url)
             # Test connection
@@ -25,13 +38,27 @@ class CacheManager:
         except redis.ConnectionError:
             logger.warning("Redis not available, falling back to in-memory cache")
             self.redis_client = None
-            self._memory_cache = {}
+    
+    @property
+    def index_version(self) -> int:
+        """Version of the FAQ index the cached answers belong to.
+        
+        Part of every key, so a change to the FAQ index makes all earlier answers
+        unreachable. With Redis it is a shared counter, so a change seen by one
+        worker retires the answers cached by all of them.
+        """
+        if self.redis_client:
+            try:
+                return int(self.redis_client.get(INDEX_VERSION_KEY) or 0)
+            except Exception as e:
+                logger.error(f"Redis index version error: {e}")
+        return self._local_index_version
     
     def _generate_cache_key(self, question: str, language: str = None) -> str:
         """Generate a unique cache key for a query."""
         # Normalize the question and create a hash
         normalized_question = question.strip().lower()
-        cache_string = f"{normalized_question}:{language or 'auto'}"
+        cache_string = f"{normalized_question}:{language or 'auto'}:{self.index_version}"
         return hashlib.md5(cache_string.encode()).hexdigest()
     
     def get(self, question: str, language: str = None) -> Optional[Dict[str, Any]]:
@@ -48,9 +75,15 @@ class CacheManager:
                 logger.error(f"Redis get error: {e}")
         else:
             # Fallback to in-memory cache
-            if cache_key in self._memory_cache:
-                logger.info(f"Memory cache hit for question: {question[:50]}...")
-                return self._memory_cache[cache_key]
+            with self._lock:
+                entry = self._memory_cache.get(cache_key)
+                if entry is not None and entry[0] <= time.monotonic():
+                    del self._memory_cache[cache_key]
+                    entry = None
+                if entry is not None:
+                    self._memory_cache.move_to_end(cache_key)
+                    logger.info(f"Memory cache hit for question: {question[:50]}...")
+                    return entry[1]
         
         logger.info(f"Cache miss for question: {question[:50]}...")
         return None
@@ -66,7 +99,11 @@ class CacheManager:
                 logger.info(f"Cached response for question: {question[:50]}...")
             else:
                 # Fallback to in-memory cache
-                self._memory_cache[cache_key] = response
+                with self._lock:
+                    self._memory_cache[cache_key] = (time.monotonic() + ttl, response)
+                    self._memory_cache.move_to_end(cache_key)
+                    while len(self._memory_cache) > self.max_size:
+                        self._memory_cache.popitem(last=False)
                 logger.info(f"Memory cached response for question: {question[:50]}...")
             return True
         except Exception as e:
@@ -81,7 +118,8 @@ class CacheManager:
             if self.redis_client:
                 self.redis_client.delete(cache_key)
             else:
-                self._memory_cache.pop(cache_key, None)
+                with self._lock:
+                    self._memory_cache.pop(cache_key, None)
             return True
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
@@ -93,9 +131,27 @@ class CacheManager:
             if self.redis_client:
                 self.redis_client.flushdb()
             else:
-                self._memory_cache.clear()
+                with self._lock:
+                    self._memory_cache.clear()
             logger.info("Cache cleared successfully")
             return True
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def on_vector_db_change(self, event: str, **payload: Any) -> None:
+        """``VectorDBManager.subscribe`` listener: cached answers may cite changed FAQs, so all are retired.
+        
+        Bumping the index version orphans every existing key; Redis entries then expire by TTL.
+        """
+        if self.redis_client:
+            try:
+                version = self.redis_client.incr(INDEX_VERSION_KEY)
+                logger.info(f"FAQ index changed ({event}), response cache moved to version {version}")
+                return
+            except Exception as e:
+                logger.error(f"Redis index version error: {e}")
+        with self._lock:
+            self._local_index_version += 1
+            self._memory_cache.clear()
+        logger.info(f"FAQ index changed ({event}), response cache moved to version {self._local_index_version}")
@@ -1,13 +1,32 @@
 import hashlib
 import logging
 import re
-from typing import Dict, Any, List, Tuple, Optional
+import numpy as np
+from typing import Dict, Any, List, Tuple, Optional, Sequence
 from datetime import datetime
 from src.api.models import ConfidenceMetrics, ConfidenceLevel, LowConfidenceQuestion, QuestionFrequency
 from src.config import config
 
 logger = logging.getLogger(__name__)
 
+# Terms in retrieved context that indicate an official source
+OFFICIAL_TERMS = ["USCIS", "Form", "Department of State", "immigration law"]
+
+def compile_terms(terms: List[str]) -> re.Pattern:
+    """
+    Compile terms into one case-insensitive alternation matched in a single pass.
+    
+    Longer terms come first so a phrase such as "visa bulletin" wins over "visa".
+    
+    Args:
+        terms: Terms to match as substrings
+        
+    Returns:
+        Compiled pattern matching any of the terms
+    """
+    ordered = sorted({term.lower() for term in terms}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(term) for term in ordered), re.IGNORECASE)
+
 class ConfidenceManager:
     def __init__(self, confidence_threshold: Optional[float] = None):
         """
@@ -37,8 +56,24 @@ class ConfidenceManager:
             "纳税申报", "就业授权", "再入境许可", "条件性居留", "解除条件",
             "豁免", "不可入境", "驱逐出境", "驱逐程序", "移民法庭", "上诉"
         ]
+        
+        # Compiled once so scoring stays a single scan however long the term lists grow
+        self._term_patterns = {
+            "en": compile_terms(self.immigration_terms),
+            "zh": compile_terms(self.chinese_immigration_terms)
+        }
+        self._official_terms_pattern = compile_terms(OFFICIAL_TERMS)
+        self._structure_pattern = re.compile(r'\d+\.|[A-Z]\.')
     
-    def calculate_confidence(self, question: str, response: str, context: str, language: str = "en") -> ConfidenceMetrics:
+    def calculate_confidence(
+        self,
+        question: str,
+        response: str,
+        context: str,
+        language: str = "en",
+        similarities: Optional[Sequence[float]] = None,
+        response_similarity: Optional[float] = None
+    ) -> ConfidenceMetrics:
         """
         Calculate confidence score for a response.
         
@@ -47,12 +82,19 @@ class ConfidenceManager:
             response: Generated response
             context: Retrieved context
             language: Language of the question
+            similarities: Retrieval similarities of the context passages. When given, context
+                          relevance comes from them instead of word overlap with the context.
+            response_similarity: Optional similarity between the response and the best passage,
+                                 on the same scale as the retrieval similarities
             
         Returns:
             ConfidenceMetrics object with detailed confidence analysis
         """
         # Calculate individual confidence factors
-        context_relevance = self._calculate_context_relevance(question, context, language)
+        if similarities:
+            context_relevance = self._calculate_similarity_relevance(similarities, response_similarity)
+        else:
+            context_relevance = self._calculate_context_relevance(question, context, language)
         source_quality = self._calculate_source_quality(context)
         response_length = len(response)
         contains_immigration_terms = self._check_immigration_terms(response, language)
@@ -72,8 +114,135 @@ class ConfidenceManager:
             contains_immigration_terms=contains_immigration_terms
         )
     
+    def calculate_confidence_batch(
+        self,
+        questions: Sequence[str],
+        responses: Sequence[str],
+        contexts: Sequence[str],
+        languages: Optional[Sequence[str]] = None,
+        top_similarities: Optional[Sequence[Optional[float]]] = None,
+        response_similarities: Optional[Sequence[Optional[float]]] = None,
+        weights: Optional[Dict[str, float]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate confidence for many responses at once, e.g. to re-score logged answers after a weight change.
+        
+        Text features are extracted once per item (source quality once per distinct context);
+        similarity scaling and the weighted combination run as single NumPy operations.
+        Scores match ``calculate_confidence`` item for item.
+        
+        Args:
+            questions: User questions
+            responses: Generated responses
+            contexts: Retrieved contexts
+            languages: Language of each question. If None, all are "en".
+            top_similarities: Best retrieval similarity per item; None or NaN falls back to word overlap
+            response_similarities: Optional similarity between each response and its best passage, on the retrieval scale
+            weights: Weights keyed like ``get_config_summary()["weights"]``. If None, uses config.
+            
+        Returns:
+            Dictionary of arrays: confidence_score, context_relevance, source_quality,
+            response_length, contains_immigration_terms and flagged_for_review
+        """
+        count = len(questions)
+        if not len(responses) == len(contexts) == count:
+            raise ValueError("questions, responses and contexts must have the same length")
+        languages = languages if languages is not None else ["en"] * count
+        
+        response_length = np.fromiter((len(response) for response in responses), dtype=np.int64, count=count)
+        contains_terms = np.fromiter(
+            (self._check_immigration_terms(response, language) for response, language in zip(responses, languages)),
+            dtype=bool, count=count
+        )
+        # Logged answers share few distinct contexts, so each is scored once
+        quality_by_context = {context: self._calculate_source_quality(context) for context in set(contexts)}
+        source_quality = np.fromiter((quality_by_context[context] for context in contexts), dtype=np.float64, count=count)
+        
+        # Similarity-based relevance where retrieval similarities are known, word overlap elsewhere
+        similarity = np.array(top_similarities if top_similarities is not None else [None] * count, dtype=np.float64)
+        has_similarity = ~np.isnan(similarity)
+        context_relevance = self._scale_similarities(similarity)
+        if response_similarities is not None:
+            response_similarity = np.array(response_similarities, dtype=np.float64)
+            blend = has_similarity & ~np.isnan(response_similarity)
+            weight = config.confidence.response_similarity_weight
+            context_relevance = np.where(
+                blend, (1 - weight) * context_relevance + weight * self._scale_similarities(response_similarity), context_relevance
+            )
+        for index in np.flatnonzero(~has_similarity):
+            context_relevance[index] = self._calculate_context_relevance(questions[index], contexts[index], languages[index])
+        
+        weights = self._resolve_weights(weights)
+        confidence_score = np.minimum(
+            context_relevance * weights["context"]
+            + source_quality * weights["source"]
+            + np.minimum(response_length / 500, 1.0) * weights["length"]
+            + np.where(contains_terms, weights["terms"], 0.0),
+            1.0
+        )
+        return {
+            "confidence_score": confidence_score,
+            "context_relevance": context_relevance,
+            "source_quality": source_quality,
+            "response_length": response_length,
+            "contains_immigration_terms": contains_terms,
+            "flagged_for_review": confidence_score < self.confidence_threshold
+        }
+    
+    def calculate_direct_confidence(self, question: str, answer: str, similarity: float, language: str = "en") -> ConfidenceMetrics:
+        """
+        Calculate confidence for a curated FAQ answer returned without the LLM.
+        
+        The answer is verified FAQ text, so confidence follows how closely the
+        question matched it rather than properties of generated text.
+        
+        Args:
+            question: User's question
+            answer: Stored FAQ answer
+            similarity: Retrieval similarity of the matched FAQ
+            language: Language of the question
+            
+        Returns:
+            ConfidenceMetrics object with the retrieval-based confidence
+        """
+        score = max(0.0, min(similarity, 1.0))
+        return ConfidenceMetrics(
+            question=question,
+            language=language,
+            confidence_score=score,
+            context_relevance=score,
+            source_quality=1.0,
+            response_length=len(answer),
+            contains_immigration_terms=self._check_immigration_terms(answer, language)
+        )
+    
+    def _scale_similarity(self, similarity: float) -> float:
+        """Map a retrieval similarity onto 0-1 between the configured floor and ceiling."""
+        floor = config.confidence.relevance_similarity_floor
+        ceiling = config.confidence.relevance_similarity_ceiling
+        return max(0.0, min((similarity - floor) / (ceiling - floor), 1.0))
+    
+    def _scale_similarities(self, similarities: np.ndarray) -> np.ndarray:
+        """Vectorized ``_scale_similarity``; NaN entries stay NaN."""
+        floor = config.confidence.relevance_similarity_floor
+        ceiling = config.confidence.relevance_similarity_ceiling
+        return np.clip((similarities - floor) / (ceiling - floor), 0.0, 1.0)
+    
+    def _calculate_similarity_relevance(self, similarities: Sequence[float], response_similarity: Optional[float] = None) -> float:
+        """
+        Calculate context relevance from the similarities retrieval already computed.
+        
+        The best passage decides: one strong match is enough to ground an answer.
+        This works the same for every language, unlike word overlap.
+        """
+        relevance = self._scale_similarity(max(similarities))
+        if response_similarity is not None:
+            weight = config.confidence.response_similarity_weight
+            relevance = (1 - weight) * relevance + weight * self._scale_similarity(response_similarity)
+        return relevance
+    
     def _calculate_context_relevance(self, question: str, context: str, language: str) -> float:
-        """Calculate how relevant the retrieved context is to the question."""
+        """Calculate how relevant the retrieved context is to the question from word overlap."""
         if not context or not question:
             return 0.0
         
@@ -110,40 +279,63 @@ class ConfidenceManager:
             quality_score += 0.2
         
         # Boost score for structured responses (numbered lists, etc.)
-        if re.search(r'\d+\.', context) or re.search(r'[A-Z]\.', context):
+        if self._structure_pattern.search(context):
             quality_score += 0.1
         
-        # Boost score for official terminology
-        official_terms = ["USCIS", "Form", "Department of State", "immigration law"]
-        for term in official_terms:
-            if term.lower() in context.lower():
-                quality_score += 0.1
+        # Boost score for each distinct official term
+        official_terms = {match.lower() for match in self._official_terms_pattern.findall(context)}
+        quality_score += 0.1 * len(official_terms)
         
         return min(quality_score, 1.0)
     
+    def _term_pattern(self, language: str) -> re.Pattern:
+        """Compiled immigration term pattern for a language."""
+        return self._term_patterns["en" if language == "en" else "zh"]
+    
+    def find_immigration_terms(self, text: str, language: str) -> List[str]:
+        """
+        Find the immigration terms in a text in one pass.
+        
+        Args:
+            text: Text to scan
+            language: Language whose term list is used
+            
+        Returns:
+            Distinct matched terms, lowercased, in order of first occurrence
+        """
+        return list(dict.fromkeys(match.lower() for match in self._term_pattern(language).findall(text)))
+    
     def _check_immigration_terms(self, response: str, language: str) -> bool:
         """Check if response contains immigration-related terms."""
-        response_lower = response.lower()
-        terms = self.immigration_terms if language == "en" else self.chinese_immigration_terms
-        
-        for term in terms:
-            if term.lower() in response_lower:
-                return True
-        return False
+        return self._term_pattern(language).search(response) is not None
     
     def _calculate_overall_confidence(self, context_relevance: float, source_quality: float, 
                                     response_length: int, contains_immigration_terms: bool) -> float:
         """Calculate overall confidence score using config weights."""
         # Use config weights for weighted combination
+        weights = self._resolve_weights()
         confidence = (
-            context_relevance * config.confidence.context_weight +
-            source_quality * config.confidence.source_weight +
-            min(response_length / 500, 1.0) * config.confidence.length_weight +
-            (config.confidence.terms_weight if contains_immigration_terms else 0.0)
+            context_relevance * weights["context"] +
+            source_quality * weights["source"] +
+            min(response_length / 500, 1.0) * weights["length"] +
+            (weights["terms"] if contains_immigration_terms else 0.0)
         )
         
         return min(confidence, 1.0)
     
+    def _resolve_weights(self, weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Config weights, overridden by any given ones."""
+        resolved = {
+            "context": config.confidence.context_weight,
+            "source": config.confidence.source_weight,
+            "length": config.confidence.length_weight,
+            "terms": config.confidence.terms_weight
+        }
+        unknown = set(weights or {}) - set(resolved)
+        if unknown:
+            raise ValueError(f"Unknown confidence weights: {sorted(unknown)}")
+        return {**resolved, **(weights or {})}
+    
     def get_confidence_level(self, confidence_score: float) -> ConfidenceLevel:
         """Convert confidence score to confidence level."""
         if confidence_score >= 0.8:
@@ -166,12 +358,7 @@ class ConfidenceManager:
         """Get a summary of the current confidence configuration."""
         return {
             "threshold": self.confidence_threshold,
-            "weights": {
-                "context": config.confidence.context_weight,
-                "source": config.confidence.source_weight,
-                "length": config.confidence.length_weight,
-                "terms": config.confidence.terms_weight
-            },
+            "weights": self._resolve_weights(),
             "immigration_terms_count": {
                 "english": len(self.immigration_terms),
                 "chinese": len(self.chinese_immigration_terms)
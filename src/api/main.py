@@ -4,10 +4,12 @@ Main FastAPI application for the Green Card RAG Helper.
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
 from typing import Dict, Any, Optional
 import os
 import time
+import asyncio
 from datetime import datetime
 import json
 
@@ -16,8 +18,14 @@ from src.retrieval.retrieval_manager import RetrievalManager
 from src.api.confidence_manager import ConfidenceManager
 from src.api.question_tracker import QuestionTracker
 from src.api.faq_integration import FAQIntegrationManager
+from src.api.cache_manager import CacheManager
+from src.api.pipeline import QueryPipeline
+from src.api.usage_meter import UsageMeter
 from src.api.models import QueryRequest, QueryResponse, HealthResponse, ExpertReviewRequest
 from src.config import config
+from src.llm.streaming import ResponseStream
+from src.llm.resilience import LLMUnavailableError, ResilientLLMManager
+from src.llm.readiness import ReadinessProbe
 from src.utils.validation import validate_question_input, validate_expert_review, sanitize_text
 
 # Configure logging
@@ -98,7 +106,7 @@ async def startup_event():
         validate_configuration()
         
         # Initialize managers
-        global retrieval_manager, confidence_manager, question_tracker, faq_integration, llm_manager
+        global retrieval_manager, confidence_manager, question_tracker, faq_integration, llm_manager, query_pipeline, llm_probe, usage_meter, usage_persist_task
         
         retrieval_manager = RetrievalManager()
         confidence_manager = ConfidenceManager()
@@ -109,25 +117,77 @@ async def startup_event():
         if config.llm.api_key:  # Enable real LLM
             from src.llm.llm_manager import LLMManager
             llm_manager = LLMManager()
-            # Test LLM connection
-            if not llm_manager.test_connection():
-                logger.warning("LLM connection test failed, falling back to mock manager")
-                llm_manager = MockLLMManager()
+            # Retries, deadlines, hedging and a fallback model for the live API
+            fallback = LLMManager(config.llm.fallback_model_name) if config.llm.fallback_model_name else None
+            # Cached generations are dropped as soon as a FAQ they were generated from changes
+            for manager in (llm_manager, fallback):
+                if manager is not None and manager.generation_cache is not None:
+                    retrieval_manager.vector_db_manager.subscribe(manager.generation_cache.on_vector_db_change)
+            llm_manager = ResilientLLMManager(llm_manager, fallback=fallback)
         else:
             llm_manager = MockLLMManager()
         
+        # Reachability is checked in the background, so startup never waits on the provider
+        llm_probe = ReadinessProbe(
+            llm_manager.check_reachable,
+            interval=config.llm.readiness_interval,
+            timeout=config.llm.readiness_timeout
+        )
+        llm_probe.start()
+        
+        cache_manager = None
+        if config.cache.enabled:
+            cache_manager = CacheManager(
+                redis_url=config.cache.redis_url or "redis://localhost:6379",
+                default_ttl=config.cache.ttl,
+                max_size=config.cache.max_size
+            )
+            # Whole answers are retired as soon as the FAQ index changes
+            retrieval_manager.vector_db_manager.subscribe(cache_manager.on_vector_db_change)
+        
+        if config.usage.enabled:
+            usage_meter = UsageMeter(config.usage.storage_file, retention_days=config.usage.retention_days)
+            usage_persist_task = asyncio.create_task(usage_meter.persist_periodically(config.usage.persist_interval))
+        
+        query_pipeline = QueryPipeline(
+            retrieval_manager,
+            llm_manager,
+            confidence_manager,
+            question_tracker,
+            cache_manager=cache_manager,
+            usage_meter=usage_meter
+        )
+        
         logger.info("All managers initialized successfully")
         
     except Exception as e:
         logger.error(f"Failed to initialize application: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pipeline resources on shutdown."""
+    if llm_probe is not None:
+        await llm_probe.stop()
+    if query_pipeline is not None:
+        query_pipeline.shutdown()
+    if usage_persist_task is not None:
+        usage_persist_task.cancel()
+    if usage_meter is not None:
+        usage_meter.save()
+    if hasattr(llm_manager, "aclose"):
+        await llm_manager.aclose()
+
 # Initialize managers (will be set in startup_event)
 retrieval_manager = None
 confidence_manager = None
 question_tracker = None
 faq_integration = None
 llm_manager = None
+query_pipeline = None
+llm_probe = None
+usage_meter = None
+usage_persist_task = None
 
 # Mock LLM manager for testing
 class MockLLMManager:
@@ -149,6 +209,19 @@ class MockLLMManager:
             }
         }
     
+    async def agenerate_response(self, context: str, user_input: str, **kwargs) -> Dict[str, Any]:
+        """Generate a mock response asynchronously."""
+        return self.generate_response(context, user_input, **kwargs)
+    
+    async def astream_response(self, context: str, user_input: str, **kwargs) -> ResponseStream:
+        """Stream a mock response word by word."""
+        content = self.generate_response(context, user_input, **kwargs)["content"]
+        return ResponseStream((word + " " for word in content.split(" ")), self.model_name, context)
+    
+    async def check_reachable(self) -> bool:
+        """The mock is always reachable."""
+        return True
+    
     def get_config_summary(self) -> Dict[str, Any]:
         """Get mock config summary."""
         return {
@@ -158,26 +231,53 @@ class MockLLMManager:
             "api_key_set": False
         }
 
-@app.get("/health", response_model=HealthResponse)
-def health_check():
-    """Health check endpoint."""
-    # Check if managers are initialized
-    managers_healthy = all([
+def managers_initialized() -> bool:
+    """Whether startup finished loading every manager, including the embedding model."""
+    return all([
         retrieval_manager is not None,
         confidence_manager is not None,
         question_tracker is not None,
         faq_integration is not None,
         llm_manager is not None
     ])
+
+@app.get("/health", response_model=HealthResponse)
+def health_check():
+    """Health check endpoint.
     
-    status = "healthy" if managers_healthy else "unhealthy"
-    message = "Green Card RAG Helper API is running" if managers_healthy else "API is not fully initialized"
+    Reports the cached LLM probe result; it never calls the provider itself.
+    """
+    # Check if managers are initialized
+    managers_healthy = managers_initialized()
+    llm_status = llm_probe.status if llm_probe is not None else None
+    
+    if not managers_healthy:
+        status, message = "unhealthy", "API is not fully initialized"
+    elif llm_status and llm_status["reachable"] is False:
+        status, message = "degraded", "Green Card RAG Helper API is running, but the LLM provider is unreachable"
+    else:
+        status, message = "healthy", "Green Card RAG Helper API is running"
     
     return HealthResponse(
         status=status,
         message=message,
         version="1.0.0",
-        timestamp=datetime.now().isoformat()
+        timestamp=datetime.now().isoformat(),
+        llm=llm_status
+    )
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness endpoint for load balancers and rolling restarts.
+    
+    Separates "models loaded" from "LLM reachable" and answers 503 until both hold.
+    """
+    models_loaded = managers_initialized()
+    llm_status = llm_probe.status if llm_probe is not None else {"reachable": None}
+    ready = models_loaded and llm_status["reachable"] is True
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "models_loaded": models_loaded, "llm_reachable": llm_status["reachable"], "llm": llm_status}
     )
 
 @app.get("/config")
@@ -186,7 +286,7 @@ def get_config():
     return config.to_dict()
 
 @app.post("/query", response_model=QueryResponse)
-def query_endpoint(request: Request, query_request: QueryRequest):
+async def query_endpoint(request: Request, query_request: QueryRequest):
     """Main query endpoint for processing immigration questions."""
     try:
         # Check rate limit
@@ -202,68 +302,58 @@ def query_endpoint(request: Request, query_request: QueryRequest):
         
         logger.info(f"Processing query: {sanitized_question[:50]}... (language: {query_request.language})")
         
-        # Process query through retrieval system
-        retrieval_results = retrieval_manager.process_query(sanitized_question, query_request.language)
-        
-        if not retrieval_results:
-            # No relevant context found
-            response = QueryResponse(
-                answer="I'm sorry, I couldn't find specific information about your question in our immigration database. Please try rephrasing your question or consult with an immigration attorney for specific legal advice.",
-                confidence={
-                    "score": 0.0,
-                    "level": "low",
-                    "context_relevance": 0.0,
-                    "source_quality": 0.0,
-                    "response_length": 0,
-                    "contains_immigration_terms": False,
-                    "flagged_for_review": True
-                },
-                model=llm_manager.model_name,
-                cached=False
-            )
-        else:
-            # Generate context from retrieval results
-            context = retrieval_manager.get_context(retrieval_results)
-            
-            # Generate response using LLM
-            llm_response = llm_manager.generate_response(context, sanitized_question)
-            
-            # Calculate confidence score
-            confidence_metrics = confidence_manager.calculate_confidence(
-                sanitized_question, llm_response["content"], context, query_request.language
-            )
-            
-            # Convert to dictionary and add additional fields
-            confidence_info = {
-                "score": confidence_metrics.confidence_score,
-                "level": confidence_manager.get_confidence_level(confidence_metrics.confidence_score).value,
-                "context_relevance": confidence_metrics.context_relevance,
-                "source_quality": confidence_metrics.source_quality,
-                "response_length": confidence_metrics.response_length,
-                "contains_immigration_terms": confidence_metrics.contains_immigration_terms,
-                "flagged_for_review": confidence_manager.should_flag_for_review(confidence_metrics.confidence_score)
-            }
-            
-            # Track question if confidence is low
-            if confidence_info["flagged_for_review"]:
-                question_tracker.track_question(sanitized_question, query_request.language, confidence_info["score"])
-            
-            response = QueryResponse(
-                answer=llm_response["content"],
-                confidence=confidence_info,
-                model=llm_response["model"],
-                usage=llm_response["usage"],
-                cached=False
-            )
-        
-        return response
+        # Retrieval, generation and confidence scoring run as pipelined async stages
+        return await query_pipeline.run(sanitized_question, query_request.language)
         
     except HTTPException:
         raise
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail="The language model is temporarily unavailable, please retry shortly")
     except Exception as e:
         logger.exception(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream_endpoint(request: Request, query_request: QueryRequest):
+    """Streaming query endpoint.
+    
+    Responds with server-sent events: "retrieval" (language, route and sources),
+    then "token" events with answer fragments, then "done" with the confidence block.
+    An "error" event replaces the rest of the stream if processing fails.
+    """
+    # Check rate limit
+    check_rate_limit(request)
+    
+    # Validate and sanitize input
+    is_valid, validation_errors = validate_question_input(query_request.question, query_request.language)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid input: {'; '.join(validation_errors)}")
+    
+    sanitized_question = sanitize_text(query_request.question)
+    logger.info(f"Streaming query: {sanitized_question[:50]}... (language: {query_request.language})")
+    
+    async def event_stream():
+        try:
+            async for event, data in query_pipeline.stream(sanitized_question, query_request.language):
+                yield format_sse(event, data)
+        except LLMUnavailableError as e:
+            logger.error(f"LLM unavailable: {str(e)}")
+            yield format_sse("error", {"detail": "The language model is temporarily unavailable, please retry shortly", "status": 503})
+        except Exception as e:
+            logger.exception(f"Error streaming query: {str(e)}")
+            yield format_sse("error", {"detail": "Internal server error"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/expert/pending-questions")
 def get_pending_questions():
     """Get questions pending expert review."""
@@ -368,6 +458,23 @@ def get_cache_stats():
         logger.exception(f"Error getting cache stats: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.get("/llm/routes")
+def get_route_stats():
+    """Get per-route latency, token usage and escalation rate of model routing."""
+    router = getattr(llm_manager, "router", None)
+    if router is None:
+        return {"enabled": False}
+    return {"enabled": True, **router.get_stats()}
+
+@app.get("/usage")
+def get_usage(hours: int = 24, window: str = "day"):
+    """Get token usage and estimated cost by model, language, route and time window."""
+    if usage_meter is None:
+        return {"enabled": False}
+    if hours < 1 or window not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="hours must be at least 1 and window 'hour' or 'day'")
+    return {"enabled": True, **usage_meter.get_summary(hours=hours, window=window)}
+
 @app.get("/system/info")
 def get_system_info():
     """Get system information and configuration summary."""
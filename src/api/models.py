@@ -106,10 +106,15 @@ class QueryResponse(BaseModel):
     model: str
     usage: Optional[Dict[str, int]] = None
     cached: bool = False
+    route: str = Field(default="llm", description="Answer path: llm, direct_faq or no_context")
+    saved_usage: Optional[Dict[str, int]] = Field(
+        default=None, description="Usage of the original generation when the answer came from the generation cache"
+    )
 
 class HealthResponse(BaseModel):
     """Health check response model."""
     status: str
     message: str
     version: str
-    timestamp: str 
\ No newline at end of file
+    timestamp: str
+    llm: Optional[Dict[str, Any]] = Field(default=None, description="Cached result of the background LLM readiness probe") 
\ No newline at end of file
@@ -0,0 +1,458 @@
+"""
+Asynchronous query pipeline for the Green Card RAG Helper.
+
+A query runs through: cache lookup and language detection (overlapped),
+query encoding, vector search, LLM generation, confidence scoring and
+low-confidence tracking. CPU-bound stages run on a dedicated thread pool so
+they never block the event loop; blocking I/O stages (Chroma, Redis, the
+question store) are awaited on the default thread pool.
+"""
+import asyncio
+import logging
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from src.api.models import QueryResponse
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT_ANSWER = (
+    "I'm sorry, I couldn't find specific information about your question in our immigration database. "
+    "Please try rephrasing your question or consult with an immigration attorney for specific legal advice."
+)
+# Model name reported for curated FAQ answers returned without the LLM
+DIRECT_ANSWER_MODEL = "faq"
+
+class QueryPipeline:
+    """Runs queries through retrieval, generation and confidence scoring."""
+
+    def __init__(
+        self,
+        retrieval_manager,
+        llm_manager,
+        confidence_manager,
+        question_tracker,
+        cache_manager=None,
+        cpu_workers: Optional[int] = None,
+        usage_meter=None
+    ):
+        """
+        Initialize the query pipeline.
+
+        Args:
+            retrieval_manager: RetrievalManager used for language detection and search.
+            llm_manager: LLM manager providing ``agenerate_response``.
+            confidence_manager: ConfidenceManager used to score responses.
+            question_tracker: QuestionTracker that records low-confidence questions.
+            cache_manager: Optional CacheManager for whole responses.
+            cpu_workers: Size of the CPU-bound stage pool. If None, uses config default.
+            usage_meter: Optional UsageMeter recording the token usage of every answer.
+        """
+        self.retrieval_manager = retrieval_manager
+        self.llm_manager = llm_manager
+        self.confidence_manager = confidence_manager
+        self.question_tracker = question_tracker
+        self.cache_manager = cache_manager
+        self.usage_meter = usage_meter
+        self.cpu_executor = ThreadPoolExecutor(
+            max_workers=cpu_workers or config.api.cpu_workers,
+            thread_name_prefix="rag-cpu"
+        )
+
+    def shutdown(self) -> None:
+        """Stop the CPU stage pool."""
+        self.cpu_executor.shutdown(wait=False)
+
+    async def _run_cpu(self, func, *args):
+        """Run a CPU-bound stage on the dedicated executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.cpu_executor, func, *args)
+
+    async def _lookup_cache(self, question: str, language: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response; cache errors never fail the query."""
+        if self.cache_manager is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.cache_manager.get, question, language)
+        except Exception as e:
+            logger.error(f"Cache lookup failed: {e}")
+            return None
+
+    async def _store_cache(self, question: str, language: str, response: QueryResponse) -> None:
+        """Cache a response; cache errors never fail the query."""
+        if self.cache_manager is None:
+            return
+        try:
+            await asyncio.to_thread(self.cache_manager.set, question, response.model_dump(), language)
+        except Exception as e:
+            logger.error(f"Cache store failed: {e}")
+
+    async def _resolve_language(self, question: str, language: str) -> str:
+        """Detect the language for "auto" requests, otherwise normalize it."""
+        if language == "auto":
+            return await self._run_cpu(self.retrieval_manager.detect_language, question)
+        return self.retrieval_manager.normalize_language(language)
+
+    def _record_usage(self, response: QueryResponse, language: str) -> None:
+        """Meter the token usage of an answered query; metering errors never fail the query."""
+        if self.usage_meter is None:
+            return
+        try:
+            self.usage_meter.record_response(response, language)
+        except Exception as e:
+            logger.warning(f"Usage metering failed: {e}")
+
+    def _no_context_response(self) -> QueryResponse:
+        """Build the response used when retrieval finds nothing relevant."""
+        return QueryResponse(
+            answer=NO_CONTEXT_ANSWER,
+            confidence={
+                "score": 0.0,
+                "level": "low",
+                "context_relevance": 0.0,
+                "source_quality": 0.0,
+                "response_length": 0,
+                "contains_immigration_terms": False,
+                "flagged_for_review": True
+            },
+            model=self.llm_manager.model_name,
+            cached=False,
+            route="no_context"
+        )
+
+    def _direct_answer(self, question: str, language: str, match) -> QueryResponse:
+        """Answer with a curated FAQ, scoring confidence from retrieval similarity."""
+        answer = match.metadata['answer']
+        confidence_metrics = self.confidence_manager.calculate_direct_confidence(
+            question, answer, match.similarity, language
+        )
+        return QueryResponse(
+            answer=answer,
+            confidence=self._confidence_info(confidence_metrics),
+            model=DIRECT_ANSWER_MODEL,
+            usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            cached=False,
+            route="direct_faq"
+        )
+
+    def _confidence_info(self, confidence_metrics) -> Dict[str, Any]:
+        """Convert confidence metrics to the response's confidence block."""
+        return {
+            "score": confidence_metrics.confidence_score,
+            "level": self.confidence_manager.get_confidence_level(confidence_metrics.confidence_score).value,
+            "context_relevance": confidence_metrics.context_relevance,
+            "source_quality": confidence_metrics.source_quality,
+            "response_length": confidence_metrics.response_length,
+            "contains_immigration_terms": confidence_metrics.contains_immigration_terms,
+            "flagged_for_review": self.confidence_manager.should_flag_for_review(confidence_metrics.confidence_score)
+        }
+
+    async def _generate_answer(
+        self,
+        question: str,
+        language: str,
+        retrieval_results,
+        timings: Dict[str, float]
+    ) -> QueryResponse:
+        """Answer with the LLM over the retrieved context and score the result."""
+        # Generate context from retrieval results
+        built = self.retrieval_manager.build_context(retrieval_results)
+
+        # With routing enabled, strong matches are answered by the fast model first
+        router = getattr(self.llm_manager, "router", None)
+        decision = router.select(self._top_similarity(retrieval_results)) if router is not None else None
+
+        stage_start = time.perf_counter()
+        llm_response = await self.llm_manager.agenerate_response(
+            built.context,
+            question,
+            doc_ids=built.included_ids,
+            **({"model": decision.model, "max_tokens": decision.max_tokens} if decision else {})
+        )
+        timings["generation"] = time.perf_counter() - stage_start
+
+        response = await self._score_llm_answer(question, language, built.context, llm_response, timings, retrieval_results)
+        if decision is None:
+            return response
+
+        escalate = decision is not router.primary and response.confidence["flagged_for_review"]
+        router.record(decision, timings["generation"], llm_response["usage"], escalated=escalate)
+        if not escalate:
+            return response
+
+        logger.info(f"Answer from {decision.model} would be flagged, escalating to {router.primary.model}")
+        stage_start = time.perf_counter()
+        escalated_response = await self.llm_manager.agenerate_response(
+            built.context,
+            question,
+            doc_ids=built.included_ids,
+            model=router.primary.model,
+            max_tokens=router.primary.max_tokens
+        )
+        timings["escalation"] = time.perf_counter() - stage_start
+        router.record(router.primary, timings["escalation"], escalated_response["usage"])
+
+        # Both generations were paid for
+        usage = {
+            key: llm_response["usage"].get(key, 0) + escalated_response["usage"].get(key, 0)
+            for key in escalated_response["usage"]
+        }
+        return await self._score_llm_answer(
+            question, language, built.context, {**escalated_response, "usage": usage}, timings, retrieval_results
+        )
+
+    def _top_similarity(self, retrieval_results) -> Optional[float]:
+        """Best similarity among the retrieval results, if they carry one."""
+        similarities = [result.similarity for result in retrieval_results if getattr(result, "similarity", None) is not None]
+        return max(similarities) if similarities else None
+
+    def _response_similarity(self, response: str, retrieval_results) -> Optional[float]:
+        """Similarity between the response and the best retrieved passage, in one encoder pass.
+
+        Scored like retrieval (one minus the squared L2 distance of the normalized
+        vectors, i.e. 2·cos − 1), so it shares the relevance floor and ceiling.
+        """
+        best = max(
+            (result for result in retrieval_results if getattr(result, "similarity", None) is not None),
+            key=lambda result: result.similarity
+        )
+        response_embedding, passage_embedding = self.retrieval_manager.embedding_manager.get_embeddings(
+            [response, best.document]
+        )
+        norm = np.linalg.norm(response_embedding) * np.linalg.norm(passage_embedding)
+        if not norm:
+            return None
+        return 2 * float(np.dot(response_embedding, passage_embedding) / norm) - 1
+
+    async def _score_llm_answer(
+        self,
+        question: str,
+        language: str,
+        context: str,
+        llm_response: Dict[str, Any],
+        timings: Dict[str, float],
+        retrieval_results=None
+    ) -> QueryResponse:
+        """Calculate confidence for a generated answer and build its response."""
+        stage_start = time.perf_counter()
+        # Relevance reuses the similarities retrieval already computed
+        similarities = [
+            result.similarity for result in retrieval_results or []
+            if getattr(result, "similarity", None) is not None
+        ]
+        response_similarity = None
+        if similarities and config.confidence.response_similarity_enabled:
+            try:
+                response_similarity = await self._run_cpu(
+                    self._response_similarity, llm_response["content"], retrieval_results
+                )
+            except Exception as e:
+                logger.warning(f"Response similarity unavailable: {e}")
+        confidence_metrics = await self._run_cpu(
+            self.confidence_manager.calculate_confidence,
+            question, llm_response["content"], context, language, similarities, response_similarity
+        )
+        timings["confidence"] = time.perf_counter() - stage_start
+
+        return QueryResponse(
+            answer=llm_response["content"],
+            confidence=self._confidence_info(confidence_metrics),
+            model=llm_response["model"],
+            usage=llm_response["usage"],
+            cached=False,
+            route="llm",
+            saved_usage=llm_response.get("saved_usage")
+        )
+
+    async def _start(self, question: str, language: str, timings: Dict[str, float]):
+        """Run the stages before answering: cache lookup, language detection and retrieval.
+
+        Returns:
+            Tuple of the cached response (or None), the detected language and the
+            retrieval results (None on a cache hit).
+        """
+        start = time.perf_counter()
+        # Independent stages overlap: the cache is keyed on the requested language
+        cached, detected_language = await asyncio.gather(
+            self._lookup_cache(question, language),
+            self._resolve_language(question, language)
+        )
+        timings["cache_and_language"] = time.perf_counter() - start
+        if cached:
+            return QueryResponse(**{**cached, "cached": True}), detected_language, None
+
+        stage_start = time.perf_counter()
+        retrieval_results = await self.retrieval_manager.aprocess_query(
+            question, detected_language, executor=self.cpu_executor
+        )
+        timings["retrieval"] = time.perf_counter() - stage_start
+        return None, detected_language, retrieval_results
+
+    async def _finish(
+        self,
+        question: str,
+        language: str,
+        detected_language: str,
+        response: QueryResponse,
+        timings: Dict[str, float],
+        start: float
+    ) -> None:
+        """Track low-confidence answers, cache the rest, meter usage and log stage timings."""
+        self._record_usage(response, detected_language)
+        if response.confidence["flagged_for_review"]:
+            # Track question if confidence is low; flagged answers are not cached so repeats keep counting
+            await asyncio.to_thread(
+                self.question_tracker.track_question, question, detected_language, response.confidence["score"]
+            )
+        else:
+            await self._store_cache(question, language, response)
+
+        timings["total"] = time.perf_counter() - start
+        logger.info(f"Query answered via {response.route}; stage timings: " + ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items()))
+
+    async def run(self, question: str, language: str = "auto") -> QueryResponse:
+        """
+        Answer a sanitized question.
+
+        Args:
+            question: Sanitized user question.
+            language: Requested language code (en, zh, auto).
+
+        Returns:
+            QueryResponse for the question.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        cached, detected_language, retrieval_results = await self._start(question, language, timings)
+        if cached:
+            self._record_usage(cached, detected_language)
+            return cached
+
+        if not retrieval_results:
+            # No relevant context found
+            response = self._no_context_response()
+            self._record_usage(response, detected_language)
+            return response
+
+        response = await self.answer(question, detected_language, retrieval_results, timings)
+        await self._finish(question, language, detected_language, response, timings, start)
+        return response
+
+    async def answer(
+        self,
+        question: str,
+        language: str,
+        retrieval_results,
+        timings: Optional[Dict[str, float]] = None
+    ) -> QueryResponse:
+        """
+        Answer a question from retrieval results that are already available.
+
+        Used by ``run`` and by offline callers that retrieve in batches; nothing is
+        cached or tracked here.
+
+        Args:
+            question: Sanitized user question.
+            language: Detected language code.
+            retrieval_results: Results of ``RetrievalManager.process_query``.
+            timings: Optional dictionary receiving stage timings in seconds.
+
+        Returns:
+            QueryResponse for the question.
+        """
+        timings = timings if timings is not None else {}
+        if not retrieval_results:
+            return self._no_context_response()
+
+        direct_match = self.retrieval_manager.find_direct_answer(question, retrieval_results, language)
+        if direct_match is not None:
+            return self._direct_answer(question, language, direct_match)
+        return await self._generate_answer(question, language, retrieval_results, timings)
+
+    async def stream(self, question: str, language: str = "auto") -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Answer a sanitized question as a sequence of events.
+
+        Yields a "retrieval" event with the detected language, answer route and
+        sources first, then "token" events carrying answer fragments as they are
+        generated, then a "done" event with the confidence block, model and usage.
+        Answers that need no generation arrive as a single token event.
+
+        Args:
+            question: Sanitized user question.
+            language: Requested language code (en, zh, auto).
+
+        Yields:
+            Tuple of the event name and its payload.
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        cached, detected_language, retrieval_results = await self._start(question, language, timings)
+        if cached:
+            self._record_usage(cached, detected_language)
+            for event in self._replay(cached, detected_language, []):
+                yield event
+            return
+
+        sources = [self._source_info(result) for result in retrieval_results or []]
+        if not retrieval_results:
+            response = self._no_context_response()
+            self._record_usage(response, detected_language)
+            for event in self._replay(response, detected_language, sources):
+                yield event
+            return
+
+        direct_match = self.retrieval_manager.find_direct_answer(question, retrieval_results, detected_language)
+        if direct_match is not None:
+            response = self._direct_answer(question, detected_language, direct_match)
+            for event in self._replay(response, detected_language, sources):
+                yield event
+            await self._finish(question, language, detected_language, response, timings, start)
+            return
+
+        yield "retrieval", {"language": detected_language, "route": "llm", "sources": sources}
+        built = self.retrieval_manager.build_context(retrieval_results)
+        context = built.context
+
+        stage_start = time.perf_counter()
+        response_stream = await self.llm_manager.astream_response(context, question, doc_ids=built.included_ids)
+        first_token = True
+        async for delta in response_stream:
+            if first_token:
+                timings["first_token"] = time.perf_counter() - stage_start
+                first_token = False
+            yield "token", {"content": delta}
+        timings["generation"] = time.perf_counter() - stage_start
+
+        response = await self._score_llm_answer(
+            question, detected_language, context, response_stream.result, timings, retrieval_results
+        )
+        await self._finish(question, language, detected_language, response, timings, start)
+        yield "done", self._done_payload(response)
+
+    def _source_info(self, result) -> Dict[str, Any]:
+        """Summarize a retrieval result for the client."""
+        metadata = result.metadata or {}
+        return {
+            "id": result.id,
+            "question": metadata.get('question', ''),
+            "language": metadata.get('language'),
+            "similarity": round(float(result.similarity), 4)
+        }
+
+    def _done_payload(self, response: QueryResponse) -> Dict[str, Any]:
+        """Everything in a response except the answer, which was already streamed."""
+        return response.model_dump(exclude={"answer"})
+
+    def _replay(self, response: QueryResponse, language: str, sources) -> List[Tuple[str, Dict[str, Any]]]:
+        """Events for a response that is complete before streaming starts."""
+        return [
+            ("retrieval", {"language": language, "route": response.route, "sources": sources}),
+            ("token", {"content": response.answer}),
+            ("done", self._done_payload(response))
+        ]
@@ -0,0 +1,123 @@
+"""
+Test the offline batch runner.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+from src.api.batch_runner import BatchRunner, load_questions
+from src.api.confidence_manager import ConfidenceManager
+from src.api.pipeline import QueryPipeline
+
+ANSWER = (
+    "A Green Card is proof of lawful permanent residence. According to USCIS, "
+    "you can apply through family, employment or asylum, and you may need an immigration attorney."
+)
+
+class BatchRetrievalManager:
+    """Retrieval stand-in recording batched calls."""
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_language(self, query):
+        return "en"
+
+    def normalize_language(self, language):
+        return language
+
+    def process_queries(self, queries, languages, batch_size=32):
+        self.batches.append(list(queries))
+        return [[SimpleNamespace(id=f"faq-{index}", similarity=0.7, metadata={})] for index, _ in enumerate(queries)]
+
+    def find_direct_answer(self, query, results, language=None):
+        return None
+
+    def build_context(self, results):
+        return SimpleNamespace(context="Q: What is a Green Card?\nA: Proof of permanent residence.", included_ids=["faq-0"])
+
+class CountingLLMManager:
+    model_name = "fake-model"
+
+    def __init__(self, fail_once=()):
+        self.calls = 0
+        self.fail_once = set(fail_once)
+
+    async def agenerate_response(self, context, user_input, **kwargs):
+        self.calls += 1
+        if user_input in self.fail_once:
+            self.fail_once.discard(user_input)
+            raise RuntimeError("LLM unavailable")
+        return {"content": ANSWER, "model": self.model_name, "usage": {"total_tokens": 15}}
+
+def write_questions(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(count):
+            f.write(json.dumps({"request_id": f"q{index}", "body": f"What is a Green Card? ({index})"}) + "\n")
+        f.write(json.dumps({"request_id": "blank", "body": "  "}) + "\n")
+
+def test_batch_run_writes_records_and_resumes(tmp_path):
+    input_path, output_path = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    write_questions(input_path, 5)
+    items = load_questions(str(input_path), question_field="body", id_field="request_id")
+    assert [item["id"] for item in items] == ["q0", "q1", "q2", "q3", "q4"]
+
+    # q1 hits a transient outage on the first run
+    retrieval_manager, llm_manager = BatchRetrievalManager(), CountingLLMManager(fail_once=[items[1]["question"]])
+    pipeline = QueryPipeline(retrieval_manager, llm_manager, ConfidenceManager(), None, cpu_workers=1)
+    cache_manager = Mock()
+    runner = BatchRunner(pipeline, batch_size=2, concurrency=2, cache_manager=cache_manager)
+
+    summary = asyncio.run(runner.run(items[:3], str(output_path)))
+    assert summary["answered"] == 2 and summary["errors"] == 1
+    assert [len(batch) for batch in retrieval_manager.batches] == [2, 1]
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [record["id"] for record in records] == ["q0", "q1", "q2"]
+    assert records[0]["route"] == "llm" and "retrieval" in records[0]["timings"]
+    assert "LLM unavailable" in records[1]["error"]
+    answered = [record for record in records if "error" not in record]
+    assert cache_manager.set.call_count == sum(not record["confidence"]["flagged_for_review"] for record in answered)
+
+    # A second run over the full file answers what is missing and retries the failure
+    summary = asyncio.run(runner.run(items, str(output_path)))
+    assert summary["skipped"] == 2 and summary["answered"] == 3 and summary["errors"] == 0
+    assert llm_manager.calls == 6
+    records = [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()]
+    assert [record["id"] for record in records if "error" not in record] == ["q0", "q2", "q1", "q3", "q4"]
+    pipeline.shutdown()
+
+class FlakyRetrievalManager(BatchRetrievalManager):
+    """Fails language detection for one item and batched retrieval whenever a question contains "boom"."""
+
+    def detect_language(self, query):
+        if query == "undetectable":
+            raise ValueError("no language")
+        return "en"
+
+    def process_queries(self, queries, languages, batch_size=32):
+        if any("boom" in query for query in queries):
+            raise RuntimeError("encoder failed")
+        return super().process_queries(queries, languages, batch_size)
+
+    def process_query(self, query, language=None):
+        if "boom" in query:
+            raise RuntimeError("encoder failed")
+        return [SimpleNamespace(id="faq-0", similarity=0.7, metadata={})]
+
+def test_retrieval_failures_are_isolated_per_item(tmp_path):
+    output_path = tmp_path / "answers.jsonl"
+    items = [
+        {"id": "ok", "question": "What is a Green Card?", "language": "auto"},
+        {"id": "boom", "question": "boom", "language": "en"},
+        {"id": "undetectable", "question": "undetectable", "language": "auto"}
+    ]
+    pipeline = QueryPipeline(FlakyRetrievalManager(), CountingLLMManager(), ConfidenceManager(), None, cpu_workers=1)
+    summary = asyncio.run(BatchRunner(pipeline, batch_size=3).run(items, str(output_path)))
+    pipeline.shutdown()
+
+    assert summary["answered"] == 1 and summary["errors"] == 2
+    records = {record["id"]: record for record in map(json.loads, output_path.read_text(encoding="utf-8").splitlines())}
+    assert records["ok"]["route"] == "llm"
+    assert "encoder failed" in records["boom"]["error"]
+    assert "no language" in records["undetectable"]["error"]
+
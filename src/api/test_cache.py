@@ -1,9 +1,11 @@
 """
 Test the caching functionality.
 """
+import time
 import pytest
-from unittest.mock import Mock, patch
-from src.api.cache_manager import CacheManager
+import redis
+from unittest.mock import DEFAULT, Mock, patch
+from src.api.cache_manager import CacheManager, INDEX_VERSION_KEY
 
 @pytest.fixture
 def cache_manager():
@@ -12,6 +14,9 @@ def cache_manager():
         mock_client = Mock()
         mock_client.ping.return_value = True
         mock_client.get.return_value = None  # Default to cache miss
+        versions = {INDEX_VERSION_KEY: 0}
+        mock_client.get.side_effect = lambda key: str(versions[key]).encode() if key in versions else DEFAULT
+        mock_client.incr.side_effect = lambda key: versions.update({key: versions[key] + 1}) or versions[key]
         mock_client.setex.return_value = True
         mock_client.delete.return_value = 1
         mock_client.flushdb.return_value = True
@@ -23,16 +28,8 @@ def memory_cache_manager():
     """Create a cache manager that falls back to in-memory cache."""
     with patch('redis.from_url') as mock_redis:
         # Mock the connection error
-        mock_redis.side_effect = Exception("Redis not available")
-        try:
-            return CacheManager()
-        except Exception:
-            # If the exception handling doesn't work as expected, create a manual fallback
-            manager = CacheManager.__new__(CacheManager)
-            manager.default_ttl = 3600
-            manager.redis_client = None
-            manager._memory_cache = {}
-            return manager
+        mock_redis.side_effect = redis.ConnectionError("Redis not available")
+        return CacheManager(max_size=2)
 
 def test_cache_key_generation(cache_manager):
     """Test cache key generation."""
@@ -122,4 +119,34 @@ def test_cache_clear_all(cache_manager):
     
     # Verify all cache is cleared
     assert cache_manager.get(question1, "en") is None
-    assert cache_manager.get(question2, "en") is None 
\ No newline at end of file
+    assert cache_manager.get(question2, "en") is None
+
+def test_memory_cache_is_bounded_and_expires(memory_cache_manager):
+    """Test LRU eviction and TTL of the in-memory fallback."""
+    response = {"content": "Test answer"}
+    memory_cache_manager.set("q1", response, "en")
+    memory_cache_manager.set("q2", response, "en")
+    assert memory_cache_manager.get("q1", "en") == response
+    # q2 is now least recently used and makes room for q3
+    memory_cache_manager.set("q3", response, "en")
+    assert memory_cache_manager.get("q2", "en") is None
+    assert len(memory_cache_manager._memory_cache) == 2
+    
+    with patch("src.api.cache_manager.time.monotonic", return_value=time.monotonic() + 3601):
+        assert memory_cache_manager.get("q1", "en") is None
+
+def test_index_change_retires_cached_responses(memory_cache_manager):
+    """Test that a FAQ index change makes earlier answers unreachable."""
+    memory_cache_manager.set("What is EB-2?", {"content": "Old answer"}, "en")
+    key = memory_cache_manager._generate_cache_key("What is EB-2?", "en")
+    memory_cache_manager.on_vector_db_change("reset")
+    assert memory_cache_manager.get("What is EB-2?", "en") is None
+    assert memory_cache_manager._generate_cache_key("What is EB-2?", "en") != key
+
+def test_index_version_is_shared_through_redis(cache_manager):
+    """Test that the index version lives in Redis, where every worker sees it."""
+    key = cache_manager._generate_cache_key("What is EB-2?", "en")
+    cache_manager.on_vector_db_change("add")
+    cache_manager.redis_client.incr.assert_called_once_with(INDEX_VERSION_KEY)
+    assert cache_manager.index_version == 1
+    assert cache_manager._generate_cache_key("What is EB-2?", "en") != key
@@ -206,6 +206,74 @@ def test_chinese_immigration_terms(confidence_manager):
     assert metrics.contains_immigration_terms is True
     assert 0.0 <= metrics.confidence_score <= 1.0
 
+def test_immigration_term_matching(confidence_manager):
+    """Test single-pass term matching and official source scoring."""
+    terms = confidence_manager.find_immigration_terms("Check the Visa Bulletin before filing your green card form.", "en")
+    # The longer phrase wins over its prefix, and matching ignores case
+    assert terms == ["visa bulletin", "green card", "form"]
+    assert confidence_manager.find_immigration_terms("绿卡持有人可以申请公民身份", "zh") == ["绿卡", "公民身份"]
+    assert confidence_manager._check_immigration_terms("Nothing relevant here.", "en") is False
+    
+    # Each distinct official term adds 0.1 however often it repeats
+    assert confidence_manager._calculate_source_quality("USCIS and uscis") == pytest.approx(0.6)
+    assert confidence_manager._calculate_source_quality("USCIS Form I-130, Department of State") == pytest.approx(0.8)
+
+def test_context_relevance_from_retrieval_similarities(confidence_manager):
+    """Test that retrieval similarities replace word overlap as context relevance."""
+    question = "我的绿卡快过期了怎么办？"
+    response = "您可以提交 I-90 表格更新绿卡。"
+    context = "Q: 如何更新绿卡？\nA: 提交 I-90 表格。"
+    
+    # Unsegmented Chinese barely overlaps word by word
+    lexical = confidence_manager.calculate_confidence(question, response, context, "zh")
+    assert lexical.context_relevance < 0.5
+    
+    # The best passage decides, mapped between the configured floor (0.3) and ceiling (0.8)
+    metrics = confidence_manager.calculate_confidence(question, response, context, "zh", similarities=[0.55, 0.8])
+    assert metrics.context_relevance == pytest.approx(1.0)
+    weak = confidence_manager.calculate_confidence(question, response, context, "zh", similarities=[0.55])
+    assert weak.context_relevance == pytest.approx(0.5)
+    
+    # A response that drifts from the passage pulls relevance down
+    drifted = confidence_manager.calculate_confidence(
+        question, response, context, "zh", similarities=[0.8], response_similarity=0.3
+    )
+    assert drifted.context_relevance == pytest.approx(0.5)
+
+def test_batch_confidence_matches_single_scoring(confidence_manager):
+    """Test that batch scoring reproduces per-item scores and accepts new weights."""
+    questions = ["What is a Green Card?", "什么是绿卡？", "How do I file Form I-130?"]
+    responses = [
+        "A Green Card is proof of permanent residence issued by USCIS.",
+        "绿卡是永久居民身份的证明。",
+        "Not sure."
+    ]
+    contexts = ["Q: What is a Green Card?\nA: Proof of permanent residence. 1. USCIS issues it."] * 3
+    languages = ["en", "zh", "en"]
+    similarities = [0.72, None, 0.41]
+    
+    batch = confidence_manager.calculate_confidence_batch(questions, responses, contexts, languages, similarities)
+    for index, question in enumerate(questions):
+        single = confidence_manager.calculate_confidence(
+            question, responses[index], contexts[index], languages[index],
+            [similarities[index]] if similarities[index] is not None else None
+        )
+        assert batch["confidence_score"][index] == pytest.approx(single.confidence_score)
+        assert batch["context_relevance"][index] == pytest.approx(single.context_relevance)
+        assert bool(batch["contains_immigration_terms"][index]) is single.contains_immigration_terms
+    assert list(batch["flagged_for_review"]) == [
+        score < confidence_manager.confidence_threshold for score in batch["confidence_score"]
+    ]
+    
+    # Re-tuning weights needs no config change
+    reweighted = confidence_manager.calculate_confidence_batch(
+        questions, responses, contexts, languages, similarities,
+        weights={"context": 1.0, "source": 0.0, "length": 0.0, "terms": 0.0}
+    )
+    assert reweighted["confidence_score"] == pytest.approx(batch["context_relevance"])
+    with pytest.raises(ValueError):
+        confidence_manager.calculate_confidence_batch(questions, responses, contexts, weights={"recency": 1.0})
+
 def test_confidence_threshold_configuration():
     """Test that confidence threshold can be configured."""
     high_threshold_manager = ConfidenceManager(confidence_threshold=0.9)
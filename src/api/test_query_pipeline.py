@@ -0,0 +1,233 @@
+"""
+Test the asynchronous query pipeline.
+"""
+import asyncio
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+from src.api.confidence_manager import ConfidenceManager
+from src.api.pipeline import QueryPipeline, NO_CONTEXT_ANSWER
+from src.api.usage_meter import UsageMeter
+from src.config import config
+from src.llm.routing import ModelRouter
+from src.llm.streaming import ResponseStream
+
+CONTEXT = "Q: What is a Green Card?\nA: A Green Card is proof of lawful permanent residence in the United States."
+
+class FakeRetrievalManager:
+    """Retrieval stand-in returning a fixed result."""
+
+    def __init__(self, results, direct_match=None):
+        self.results = results
+        self.direct_match = direct_match
+        self.calls = []
+
+    def detect_language(self, query):
+        return "zh" if any('一' <= char <= '鿿' for char in query) else "en"
+
+    def normalize_language(self, language):
+        return language
+
+    async def aprocess_query(self, query, language=None, executor=None):
+        self.calls.append((query, language))
+        return self.results
+
+    def find_direct_answer(self, query, results, language=None):
+        return self.direct_match
+
+    def get_context(self, results):
+        return CONTEXT
+
+    def build_context(self, results):
+        ids = [result["id"] if isinstance(result, dict) else result.id for result in results]
+        return SimpleNamespace(context=CONTEXT, included_ids=ids)
+
+class FakeLLMManager:
+    """LLM stand-in with a configurable answer."""
+
+    model_name = "fake-model"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    async def agenerate_response(self, context, user_input, **kwargs):
+        return {
+            "content": self.answer,
+            "model": self.model_name,
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        }
+
+    async def astream_response(self, context, user_input, **kwargs):
+        self.calls += 1
+        return ResponseStream(iter(self.answer.split(" ")), self.model_name, context)
+
+def make_pipeline(results, answer, cache_manager=None, confidence_threshold=0.5):
+    question_tracker = Mock()
+    pipeline = QueryPipeline(
+        FakeRetrievalManager(results),
+        FakeLLMManager(answer),
+        ConfidenceManager(confidence_threshold=confidence_threshold),
+        question_tracker,
+        cache_manager=cache_manager,
+        cpu_workers=1
+    )
+    return pipeline, question_tracker
+
+@pytest.fixture
+def good_answer():
+    return (
+        "A Green Card is proof of lawful permanent residence. According to USCIS, "
+        "you can apply through family, employment or asylum, and you may need an immigration attorney."
+    )
+
+def test_pipeline_no_results():
+    pipeline, _ = make_pipeline([], "unused")
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    assert response.answer == NO_CONTEXT_ANSWER
+    assert response.route == "no_context"
+    assert response.confidence["flagged_for_review"] is True
+    pipeline.shutdown()
+
+def test_pipeline_detects_language_and_caches(good_answer):
+    cache_manager = Mock()
+    cache_manager.get.return_value = None
+    # A threshold nothing falls below, so the answer is always cacheable
+    pipeline, question_tracker = make_pipeline([{"id": "1"}], good_answer, cache_manager, confidence_threshold=0.01)
+    response = asyncio.run(pipeline.run("什么是绿卡？", "auto"))
+    assert response.answer == good_answer
+    assert response.cached is False
+    assert response.route == "llm"
+    assert response.confidence["flagged_for_review"] is False
+    # Retrieval receives the detected language while the cache is keyed on the requested one
+    assert pipeline.retrieval_manager.calls == [("什么是绿卡？", "zh")]
+    cache_manager.get.assert_called_once_with("什么是绿卡？", "auto")
+    cache_manager.set.assert_called_once_with("什么是绿卡？", response.model_dump(), "auto")
+    question_tracker.track_question.assert_not_called()
+    pipeline.shutdown()
+
+def test_pipeline_cache_hit(good_answer):
+    pipeline, _ = make_pipeline([{"id": "1"}], good_answer)
+    cached = asyncio.run(pipeline.run("What is a Green Card?", "en")).model_dump()
+    pipeline.cache_manager = Mock()
+    pipeline.cache_manager.get.return_value = cached
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    assert response.cached is True
+    # A cache hit skips retrieval entirely
+    assert len(pipeline.retrieval_manager.calls) == 1
+    pipeline.shutdown()
+
+def test_pipeline_meters_usage_by_route(good_answer):
+    pipeline, _ = make_pipeline([{"id": "1"}], good_answer)
+    pipeline.usage_meter = UsageMeter(storage_file=None)
+    cached = asyncio.run(pipeline.run("What is a Green Card?", "en")).model_dump()
+    pipeline.cache_manager = Mock()
+    pipeline.cache_manager.get.return_value = cached
+    asyncio.run(pipeline.run("What is a Green Card?", "en"))
+
+    routes = pipeline.usage_meter.get_summary()["by_route"]
+    assert routes["llm"]["total_tokens"] == 15
+    assert routes["cache_hit"]["total_tokens"] == 0
+    assert routes["cache_hit"]["saved_tokens"] == 15
+    pipeline.shutdown()
+
+def test_pipeline_tracks_low_confidence():
+    cache_manager = Mock()
+    cache_manager.get.return_value = None
+    pipeline, question_tracker = make_pipeline([{"id": "1"}], "Not sure.", cache_manager, confidence_threshold=0.99)
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    assert response.confidence["flagged_for_review"] is True
+    question_tracker.track_question.assert_called_once_with(
+        "What is a Green Card?", "en", response.confidence["score"]
+    )
+    # Flagged answers are never cached, so repeats keep counting
+    cache_manager.set.assert_not_called()
+    pipeline.shutdown()
+
+def test_pipeline_direct_faq_answer():
+    match = SimpleNamespace(
+        id="what-is-i485_en",
+        similarity=0.93,
+        metadata={"question": "What is Form I-485?", "answer": "Form I-485 is the Green Card application."}
+    )
+    pipeline, _ = make_pipeline([match], "unused")
+    pipeline.retrieval_manager.direct_match = match
+    response = asyncio.run(pipeline.run("What is Form I-485?", "en"))
+    assert response.route == "direct_faq"
+    assert response.answer == match.metadata["answer"]
+    assert response.usage["total_tokens"] == 0
+    assert response.confidence["score"] == pytest.approx(0.93)
+    # The LLM is never called on the direct path
+    assert pipeline.llm_manager.calls == 0
+    pipeline.shutdown()
+
+def test_pipeline_stream_events(good_answer):
+    pipeline, _ = make_pipeline([SimpleNamespace(id="1", similarity=0.7, metadata={"question": "Q"})], good_answer)
+
+    async def collect():
+        return [event async for event in pipeline.stream("What is a Green Card?", "en")]
+
+    events = asyncio.run(collect())
+    names = [name for name, _ in events]
+    assert names[0] == "retrieval" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert events[0][1]["sources"][0]["id"] == "1"
+    assert "".join(data["content"] for name, data in events if name == "token") == "".join(good_answer.split(" "))
+    assert "confidence" in events[-1][1] and "answer" not in events[-1][1]
+    pipeline.shutdown()
+
+def test_pipeline_scores_relevance_from_similarities(good_answer, monkeypatch):
+    result = SimpleNamespace(id="1", similarity=0.55, metadata={}, document=CONTEXT)
+    pipeline, _ = make_pipeline([result], good_answer)
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    assert response.confidence["context_relevance"] == pytest.approx(0.5)
+
+    # With response similarity on, one encoder pass compares the answer with the best passage
+    monkeypatch.setattr(config.confidence, "response_similarity_enabled", True)
+    embedding_manager = Mock()
+    embedding_manager.get_embeddings.return_value = np.array([[1.0, 0.0], [1.0, 0.0]])
+    pipeline.retrieval_manager.embedding_manager = embedding_manager
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    embedding_manager.get_embeddings.assert_called_once_with([good_answer, CONTEXT])
+    assert response.confidence["context_relevance"] == pytest.approx(0.75)
+    pipeline.shutdown()
+
+def test_response_similarity_uses_the_retrieval_scale(good_answer):
+    pipeline, _ = make_pipeline([], good_answer)
+    response_embedding, passage_embedding = np.array([0.6, 0.8]), np.array([1.0, 0.0])
+    embedding_manager = Mock()
+    embedding_manager.get_embeddings.return_value = np.array([response_embedding, passage_embedding])
+    pipeline.retrieval_manager.embedding_manager = embedding_manager
+    best = SimpleNamespace(id="1", similarity=0.55, document=CONTEXT)
+
+    # The collections score a passage as one minus the squared L2 distance
+    retrieval_similarity = 1 - float(np.sum((response_embedding - passage_embedding) ** 2))
+    assert pipeline._response_similarity(good_answer, [best]) == pytest.approx(retrieval_similarity)
+    assert retrieval_similarity == pytest.approx(0.2)
+    pipeline.shutdown()
+
+def test_pipeline_escalates_flagged_fast_answers(good_answer):
+    pipeline, _ = make_pipeline(
+        [SimpleNamespace(id="1", similarity=0.9, metadata={})], good_answer, confidence_threshold=0.65
+    )
+    router = ModelRouter("fake-large", 1000, "fake-small", 200, min_similarity=0.8)
+    answers = {"fake-small": "Not sure.", "fake-large": good_answer}
+
+    async def routed(context, user_input, model=None, **kwargs):
+        return {
+            "content": answers[model],
+            "model": model,
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        }
+
+    pipeline.llm_manager.router = router
+    pipeline.llm_manager.agenerate_response = routed
+    response = asyncio.run(pipeline.run("What is a Green Card?", "en"))
+    assert response.model == "fake-large"
+    assert response.usage["total_tokens"] == 30
+    assert response.confidence["flagged_for_review"] is False
+    routes = router.get_stats()["routes"]
+    assert routes["fast"]["escalations"] == 1
+    assert routes["primary"]["requests"] == 1
+    pipeline.shutdown()
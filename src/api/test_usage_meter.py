@@ -0,0 +1,82 @@
+"""
+Test token usage metering.
+"""
+import pytest
+from datetime import datetime, timedelta
+from src.api.models import QueryResponse
+from src.api.usage_meter import UsageMeter
+
+CONFIDENCE = {"score": 0.8, "level": "high", "flagged_for_review": False}
+
+def make_response(route="llm", cached=False, **usage):
+    return QueryResponse(
+        answer="answer", confidence=CONFIDENCE, model="gpt-4o-mini",
+        usage=usage or None, cached=cached, route=route
+    )
+
+def test_summary_breaks_down_usage_and_cost():
+    meter = UsageMeter(storage_file=None)
+    meter.record_response(make_response(prompt_tokens=2000, completion_tokens=100, cached_tokens=1024, total_tokens=2100), "en")
+    meter.record_response(make_response(prompt_tokens=500, completion_tokens=50, total_tokens=550), "zh")
+    # A cache hit carries the usage of the answer it replays: nothing spent, all of it saved
+    meter.record_response(make_response(cached=True, prompt_tokens=500, completion_tokens=50, total_tokens=550), "zh")
+    meter.record("faq", "en", "direct_faq", {"total_tokens": 0})
+
+    summary = meter.get_summary()
+    assert summary["totals"]["requests"] == 4
+    assert summary["totals"]["total_tokens"] == 2650
+    assert summary["totals"]["saved_tokens"] == 550
+    assert summary["by_route"]["cache_hit"]["total_tokens"] == 0
+    assert summary["by_language"]["zh"]["requests"] == 2
+    assert summary["by_model"]["faq"]["estimated_cost_usd"] is None
+    expected = ((2500 - 1024) * 0.15 + 1024 * 0.075 + 150 * 0.60) / 1_000_000
+    assert abs(summary["by_model"]["gpt-4o-mini"]["estimated_cost_usd"] - expected) < 1e-12
+    assert list(summary["by_day"]) == [datetime.now().strftime("%Y-%m-%d")]
+
+def test_generation_cache_hits_are_metered_as_savings():
+    meter = UsageMeter(storage_file=None)
+    response = make_response(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+    response.saved_usage = {"prompt_tokens": 500, "completion_tokens": 50, "total_tokens": 550}
+    meter.record_response(response, "en")
+    # A whole-response hit on such an answer saves the original generation as well
+    meter.record_response(response.model_copy(update={"cached": True}), "en")
+
+    routes = meter.get_summary()["by_route"]
+    assert "llm" not in routes
+    assert routes["generation_cache"]["requests"] == 1
+    assert routes["generation_cache"]["total_tokens"] == 0
+    assert routes["generation_cache"]["saved_tokens"] == 550
+    assert routes["cache_hit"]["saved_tokens"] == 550
+
+def test_dated_models_are_priced_as_their_base_model():
+    meter = UsageMeter(storage_file=None)
+    assert meter.price_for("gpt-3.5-turbo-0125") == meter.prices["gpt-3.5-turbo"]
+    # The longest matching name wins, so a dated mini is not priced as gpt-4o
+    assert meter.price_for("gpt-4o-mini-2024-07-18") == meter.prices["gpt-4o-mini"]
+    assert meter.price_for("gpt-4o-2024-08-06") == meter.prices["gpt-4o"]
+    assert meter.price_for("gpt-4") is None
+
+    meter.record("gpt-4o-mini-2024-07-18", "en", "llm", {"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100})
+    cost = meter.get_summary()["by_model"]["gpt-4o-mini-2024-07-18"]["estimated_cost_usd"]
+    assert cost == pytest.approx((1000 * 0.15 + 100 * 0.60) / 1_000_000)
+
+def test_summary_window_excludes_old_hours():
+    meter = UsageMeter(storage_file=None)
+    meter.record("gpt-4o-mini", "en", "llm", {"total_tokens": 10}, timestamp=datetime.now() - timedelta(hours=30))
+    meter.record("gpt-4o-mini", "en", "llm", {"total_tokens": 5})
+    assert meter.get_summary(hours=24)["totals"]["total_tokens"] == 5
+    assert len(meter.get_summary(hours=48, window="hour")["by_hour"]) == 2
+
+def test_counters_persist_across_restarts(tmp_path):
+    storage_file = str(tmp_path / "usage.json")
+    meter = UsageMeter(storage_file=storage_file, retention_days=1)
+    meter.record("gpt-4o-mini", "en", "llm", {"total_tokens": 5})
+    meter.record("gpt-4o-mini", "en", "llm", {"total_tokens": 7}, timestamp=datetime.now() - timedelta(days=3))
+    meter.save()
+    assert not (tmp_path / "usage.json.tmp").exists()
+
+    restored = UsageMeter(storage_file=storage_file)
+    summary = restored.get_summary(hours=24 * 7)
+    # Hours older than the retention period are dropped when saving
+    assert summary["totals"]["total_tokens"] == 5
+    assert summary["totals"]["requests"] == 1
@@ -0,0 +1,212 @@
+"""
+Token usage metering.
+
+Counts requests and tokens per model, language and answer route in hourly
+buckets, estimates their cost from per-model prices and persists the counters
+to a JSON file so ``GET /usage`` survives restarts.
+"""
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from src.api.models import QueryResponse
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: (input, output). Cached prompt tokens are billed at CACHED_INPUT_DISCOUNT.
+DEFAULT_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00)
+}
+CACHED_INPUT_DISCOUNT = 0.5
+
+# Routes a response can be metered under, besides its own answer route
+CACHE_HIT_ROUTE = "cache_hit"
+GENERATION_CACHE_ROUTE = "generation_cache"
+
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens", "saved_tokens")
+
+class UsageMeter:
+    """Accumulates token usage and estimated cost per model, language, route and hour."""
+
+    def __init__(
+        self,
+        storage_file: Optional[str] = "usage_metrics.json",
+        retention_days: int = 30,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
+        """
+        Initialize usage meter.
+
+        Args:
+            storage_file: JSON file the counters are persisted to; None keeps them in memory only
+            retention_days: Days of hourly counters to keep
+            prices: USD per million (input, output) tokens by model; defaults to DEFAULT_PRICES
+        """
+        self.storage_file = storage_file
+        self.retention_days = retention_days
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        # hour -> "model|language|route" -> counter -> value
+        self.buckets: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load_data()
+
+    def _load_data(self):
+        """Load persisted counters."""
+        if not self.storage_file:
+            return
+        try:
+            with open(self.storage_file, 'r', encoding='utf-8') as f:
+                self.buckets = json.load(f).get('buckets', {})
+            logger.info(f"Loaded usage counters for {len(self.buckets)} hours")
+        except FileNotFoundError:
+            logger.info("No existing usage data found, starting fresh")
+        except Exception as e:
+            logger.error(f"Error loading usage data: {e}")
+
+    def save(self):
+        """Persist counters if they changed since the last save, dropping expired hours."""
+        if not self.storage_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%dT%H")
+            self.buckets = {hour: counters for hour, counters in self.buckets.items() if hour >= cutoff}
+            data = json.dumps({'buckets': self.buckets, 'saved_at': datetime.now().isoformat()}, indent=2)
+            self._dirty = False
+        # Written beside the store and swapped in, so a crash mid-write never corrupts it
+        tmp_path = f"{self.storage_file}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.storage_file)
+        except Exception as e:
+            logger.error(f"Error saving usage data: {e}")
+
+    async def persist_periodically(self, interval: float):
+        """Save every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.save)
+
+    def record(
+        self,
+        model: str,
+        language: str,
+        route: str,
+        usage: Optional[Dict[str, int]],
+        saved_tokens: int = 0,
+        timestamp: Optional[datetime] = None
+    ):
+        """
+        Record one answered request.
+
+        Args:
+            model: Model that produced the answer
+            language: Language of the question
+            route: Answer route (cache_hit, generation_cache, direct_faq, llm, no_context)
+            usage: Token usage spent on the request
+            saved_tokens: Tokens a cache hit avoided spending
+            timestamp: Time of the request; defaults to now
+        """
+        usage = usage or {}
+        hour = (timestamp or datetime.now()).strftime("%Y-%m-%dT%H")
+        key = f"{model}|{language}|{route}"
+        with self._lock:
+            counters = self.buckets.setdefault(hour, {}).setdefault(key, dict.fromkeys(COUNTERS, 0))
+            counters["requests"] += 1
+            for name in ("prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens"):
+                counters[name] += int(usage.get(name) or 0)
+            counters["saved_tokens"] += saved_tokens
+            self._dirty = True
+
+    def record_response(self, response: QueryResponse, language: str):
+        """
+        Record a pipeline response.
+
+        Response cache hits spend nothing and save the usage of the answer they replay.
+        Generation cache hits spend what was reported (nothing) and save their original generation.
+        """
+        saved_tokens = int((response.saved_usage or {}).get("total_tokens") or 0)
+        if response.cached:
+            saved_tokens += int((response.usage or {}).get("total_tokens") or 0)
+            self.record(response.model, language, CACHE_HIT_ROUTE, None, saved_tokens=saved_tokens)
+        elif response.saved_usage is not None:
+            self.record(response.model, language, GENERATION_CACHE_ROUTE, response.usage, saved_tokens=saved_tokens)
+        else:
+            self.record(response.model, language, response.route, response.usage)
+
+    def price_for(self, model: str) -> Optional[Tuple[float, float]]:
+        """
+        Price of a model, matching dated snapshots to their base model.
+
+        ``gpt-4o-mini-2024-07-18`` is priced as ``gpt-4o-mini``: the longest priced
+        name the model starts with (followed by ``-``) wins.
+        """
+        if model in self.prices:
+            return self.prices[model]
+        matches = [name for name in self.prices if model.startswith(f"{name}-")]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def estimate_cost(self, model: str, counters: Dict[str, int]) -> Optional[float]:
+        """Estimated USD cost of counters for a model, or None if its price is unknown."""
+        price = self.price_for(model)
+        if price is None:
+            return None
+        input_price, output_price = price
+        uncached = counters["prompt_tokens"] - counters["cached_tokens"]
+        return (
+            uncached * input_price
+            + counters["cached_tokens"] * input_price * CACHED_INPUT_DISCOUNT
+            + counters["completion_tokens"] * output_price
+        ) / 1_000_000
+
+    def get_summary(self, hours: int = 24, window: str = "day") -> Dict[str, Any]:
+        """
+        Aggregate the counters of the last ``hours`` hours.
+
+        Args:
+            hours: How far back to look
+            window: Time window of the breakdown, "hour" or "day"
+
+        Returns:
+            Totals, estimated cost and breakdowns by model, language, route and window
+        """
+        if window not in ("hour", "day"):
+            raise ValueError("window must be 'hour' or 'day'")
+        cutoff = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%dT%H")
+        totals = dict.fromkeys(COUNTERS, 0)
+        breakdowns = {name: defaultdict(lambda: dict.fromkeys(COUNTERS, 0)) for name in ("model", "language", "route", "window")}
+        with self._lock:
+            for hour, entries in self.buckets.items():
+                if hour < cutoff:
+                    continue
+                period = hour if window == "hour" else hour[:10]
+                for key, counters in entries.items():
+                    model, language, route = key.split("|")
+                    for name, value in (("model", model), ("language", language), ("route", route), ("window", period)):
+                        for counter in COUNTERS:
+                            breakdowns[name][value][counter] += counters[counter]
+                    for counter in COUNTERS:
+                        totals[counter] += counters[counter]
+
+        by_model = dict(breakdowns["model"])
+        costs = {model: self.estimate_cost(model, counters) for model, counters in by_model.items()}
+        for model, cost in costs.items():
+            by_model[model]["estimated_cost_usd"] = cost
+        return {
+            "hours": hours,
+            "totals": {**totals, "estimated_cost_usd": sum(cost for cost in costs.values() if cost is not None)},
+            "by_model": by_model,
+            "by_language": dict(breakdowns["language"]),
+            "by_route": dict(breakdowns["route"]),
+            f"by_{window}": dict(sorted(breakdowns["window"].items()))
+        }
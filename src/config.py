@@ -13,6 +13,32 @@ class DatabaseConfig:
     persist_dir: str = "chroma_db"
     similarity_threshold: float = 0.5
     max_results: int = 3
+    partition_by_language: bool = True
+    languages: tuple = ("en", "zh")
+
+@dataclass
+class RetrievalConfig:
+    """Retrieval pipeline configuration."""
+    hybrid_enabled: bool = True
+    candidate_multiplier: int = 3
+    rrf_k: int = 60
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
+    context_token_budget: int = 1200
+    rerank_enabled: bool = False
+    rerank_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    rerank_candidates: int = 10
+    rerank_batch_size: int = 8
+    rerank_latency_budget_ms: float = 150.0
+    rerank_margin: float = 0.1
+    rerank_use_onnx: bool = True
+    chunk_max_tokens: int = 384
+    chunk_overlap_tokens: int = 48
+    direct_answer_enabled: bool = True
+    direct_answer_similarity: float = 0.8
+    direct_answer_question_overlap: float = 0.75
+    cross_lingual_enabled: bool = False
+    cross_lingual_penalty: float = 0.05
 
 @dataclass
 class LLMConfig:
@@ -21,6 +47,33 @@ class LLMConfig:
     temperature: float = 0.7
     max_tokens: int = 1000
     api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    request_timeout: float = 60.0
+    connect_timeout: float = 5.0
+    max_concurrency: int = 32
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    deadline: float = 30.0
+    max_retries: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+    hedge_enabled: bool = False
+    hedge_min_delay: float = 1.0
+    fallback_model_name: Optional[str] = None
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    generation_cache_enabled: bool = True
+    generation_cache_max_temperature: float = 0.3
+    generation_cache_size: int = 512
+    generation_cache_ttl: float = 3600.0
+    routing_enabled: bool = False
+    fast_model_name: str = "gpt-4o-mini"
+    fast_max_tokens: int = 400
+    routing_min_similarity: float = 0.75
+    readiness_interval: float = 30.0
+    readiness_timeout: float = 5.0
 
 @dataclass
 class ConfidenceConfig:
@@ -30,6 +83,12 @@ class ConfidenceConfig:
     source_weight: float = 0.3
     length_weight: float = 0.2
     terms_weight: float = 0.1
+    # Retrieval similarity mapped to context relevance 0.0 at the floor and 1.0 at the ceiling
+    relevance_similarity_floor: float = 0.3
+    relevance_similarity_ceiling: float = 0.8
+    # Blend in the similarity between the response and the best passage (costs one encoder pass)
+    response_similarity_enabled: bool = False
+    response_similarity_weight: float = 0.5
 
 @dataclass
 class APIConfig:
@@ -38,6 +97,7 @@ class APIConfig:
     port: int = 8000
     reload: bool = True
     workers: int = 1
+    cpu_workers: int = 2
     rate_limit_window: int = 60
     rate_limit_max_requests: int = 100
 
@@ -49,6 +109,14 @@ class CacheConfig:
     max_size: int = 1000
     redis_url: Optional[str] = None
 
+@dataclass
+class UsageConfig:
+    """Token usage metering configuration."""
+    enabled: bool = True
+    storage_file: str = "usage_metrics.json"
+    persist_interval: float = 60.0  # seconds between saves
+    retention_days: int = 30
+
 @dataclass
 class LoggingConfig:
     """Logging configuration."""
@@ -69,10 +137,12 @@ class Config:
     
     def __init__(self):
         self.database = DatabaseConfig()
+        self.retrieval = RetrievalConfig()
         self.llm = LLMConfig()
         self.confidence = ConfidenceConfig()
         self.api = APIConfig()
         self.cache = CacheConfig()
+        self.usage = UsageConfig()
         self.logging = LoggingConfig()
         self.security = SecurityConfig()
         
@@ -86,12 +156,65 @@ class Config:
         self.database.persist_dir = os.getenv("DB_PERSIST_DIR", self.database.persist_dir)
         self.database.similarity_threshold = float(os.getenv("DB_SIMILARITY_THRESHOLD", self.database.similarity_threshold))
         self.database.max_results = int(os.getenv("DB_MAX_RESULTS", self.database.max_results))
+        self.database.partition_by_language = os.getenv("DB_PARTITION_BY_LANGUAGE", "true").lower() == "true"
+        languages = os.getenv("DB_LANGUAGES")
+        if languages:
+            self.database.languages = tuple(lang.strip() for lang in languages.split(",") if lang.strip())
+        
+        # Retrieval
+        self.retrieval.hybrid_enabled = os.getenv("RETRIEVAL_HYBRID_ENABLED", "true").lower() == "true"
+        self.retrieval.candidate_multiplier = int(os.getenv("RETRIEVAL_CANDIDATE_MULTIPLIER", self.retrieval.candidate_multiplier))
+        self.retrieval.rrf_k = int(os.getenv("RETRIEVAL_RRF_K", self.retrieval.rrf_k))
+        self.retrieval.bm25_k1 = float(os.getenv("RETRIEVAL_BM25_K1", self.retrieval.bm25_k1))
+        self.retrieval.bm25_b = float(os.getenv("RETRIEVAL_BM25_B", self.retrieval.bm25_b))
+        self.retrieval.context_token_budget = int(os.getenv("RETRIEVAL_CONTEXT_TOKEN_BUDGET", self.retrieval.context_token_budget))
+        self.retrieval.rerank_enabled = os.getenv("RETRIEVAL_RERANK_ENABLED", "false").lower() == "true"
+        self.retrieval.rerank_model = os.getenv("RETRIEVAL_RERANK_MODEL", self.retrieval.rerank_model)
+        self.retrieval.rerank_candidates = int(os.getenv("RETRIEVAL_RERANK_CANDIDATES", self.retrieval.rerank_candidates))
+        self.retrieval.rerank_batch_size = int(os.getenv("RETRIEVAL_RERANK_BATCH_SIZE", self.retrieval.rerank_batch_size))
+        self.retrieval.rerank_latency_budget_ms = float(os.getenv("RETRIEVAL_RERANK_LATENCY_BUDGET_MS", self.retrieval.rerank_latency_budget_ms))
+        self.retrieval.rerank_margin = float(os.getenv("RETRIEVAL_RERANK_MARGIN", self.retrieval.rerank_margin))
+        self.retrieval.rerank_use_onnx = os.getenv("RETRIEVAL_RERANK_USE_ONNX", "true").lower() == "true"
+        self.retrieval.chunk_max_tokens = int(os.getenv("RETRIEVAL_CHUNK_MAX_TOKENS", self.retrieval.chunk_max_tokens))
+        self.retrieval.chunk_overlap_tokens = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP_TOKENS", self.retrieval.chunk_overlap_tokens))
+        self.retrieval.direct_answer_enabled = os.getenv("RETRIEVAL_DIRECT_ANSWER_ENABLED", "true").lower() == "true"
+        self.retrieval.direct_answer_similarity = float(os.getenv("RETRIEVAL_DIRECT_ANSWER_SIMILARITY", self.retrieval.direct_answer_similarity))
+        self.retrieval.direct_answer_question_overlap = float(os.getenv("RETRIEVAL_DIRECT_ANSWER_QUESTION_OVERLAP", self.retrieval.direct_answer_question_overlap))
+        self.retrieval.cross_lingual_enabled = os.getenv("RETRIEVAL_CROSS_LINGUAL_ENABLED", "false").lower() == "true"
+        self.retrieval.cross_lingual_penalty = float(os.getenv("RETRIEVAL_CROSS_LINGUAL_PENALTY", self.retrieval.cross_lingual_penalty))
         
         # LLM
         self.llm.model_name = os.getenv("LLM_MODEL_NAME", self.llm.model_name)
         self.llm.temperature = float(os.getenv("LLM_TEMPERATURE", self.llm.temperature))
         self.llm.max_tokens = int(os.getenv("LLM_MAX_TOKENS", self.llm.max_tokens))
         self.llm.api_key = os.getenv("OPENAI_API_KEY")
+        self.llm.base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.llm.request_timeout = float(os.getenv("LLM_REQUEST_TIMEOUT", self.llm.request_timeout))
+        self.llm.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", self.llm.connect_timeout))
+        self.llm.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", self.llm.max_concurrency))
+        self.llm.max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", self.llm.max_connections))
+        self.llm.max_keepalive_connections = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", self.llm.max_keepalive_connections))
+        self.llm.keepalive_expiry = float(os.getenv("LLM_KEEPALIVE_EXPIRY", self.llm.keepalive_expiry))
+        self.llm.http2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+        self.llm.deadline = float(os.getenv("LLM_DEADLINE", self.llm.deadline))
+        self.llm.max_retries = int(os.getenv("LLM_MAX_RETRIES", self.llm.max_retries))
+        self.llm.retry_base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", self.llm.retry_base_delay))
+        self.llm.retry_max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", self.llm.retry_max_delay))
+        self.llm.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+        self.llm.hedge_min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY", self.llm.hedge_min_delay))
+        self.llm.fallback_model_name = os.getenv("LLM_FALLBACK_MODEL_NAME") or None
+        self.llm.breaker_failure_threshold = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", self.llm.breaker_failure_threshold))
+        self.llm.breaker_reset_timeout = float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", self.llm.breaker_reset_timeout))
+        self.llm.generation_cache_enabled = os.getenv("LLM_GENERATION_CACHE_ENABLED", "true").lower() == "true"
+        self.llm.generation_cache_max_temperature = float(os.getenv("LLM_GENERATION_CACHE_MAX_TEMPERATURE", self.llm.generation_cache_max_temperature))
+        self.llm.generation_cache_size = int(os.getenv("LLM_GENERATION_CACHE_SIZE", self.llm.generation_cache_size))
+        self.llm.generation_cache_ttl = float(os.getenv("LLM_GENERATION_CACHE_TTL", self.llm.generation_cache_ttl))
+        self.llm.routing_enabled = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+        self.llm.fast_model_name = os.getenv("LLM_FAST_MODEL_NAME", self.llm.fast_model_name)
+        self.llm.fast_max_tokens = int(os.getenv("LLM_FAST_MAX_TOKENS", self.llm.fast_max_tokens))
+        self.llm.routing_min_similarity = float(os.getenv("LLM_ROUTING_MIN_SIMILARITY", self.llm.routing_min_similarity))
+        self.llm.readiness_interval = float(os.getenv("LLM_READINESS_INTERVAL", self.llm.readiness_interval))
+        self.llm.readiness_timeout = float(os.getenv("LLM_READINESS_TIMEOUT", self.llm.readiness_timeout))
         
         # Confidence
         self.confidence.threshold = float(os.getenv("CONFIDENCE_THRESHOLD", self.confidence.threshold))
@@ -99,12 +222,17 @@ class Config:
         self.confidence.source_weight = float(os.getenv("CONFIDENCE_SOURCE_WEIGHT", self.confidence.source_weight))
         self.confidence.length_weight = float(os.getenv("CONFIDENCE_LENGTH_WEIGHT", self.confidence.length_weight))
         self.confidence.terms_weight = float(os.getenv("CONFIDENCE_TERMS_WEIGHT", self.confidence.terms_weight))
+        self.confidence.relevance_similarity_floor = float(os.getenv("CONFIDENCE_RELEVANCE_SIMILARITY_FLOOR", self.confidence.relevance_similarity_floor))
+        self.confidence.relevance_similarity_ceiling = float(os.getenv("CONFIDENCE_RELEVANCE_SIMILARITY_CEILING", self.confidence.relevance_similarity_ceiling))
+        self.confidence.response_similarity_enabled = os.getenv("CONFIDENCE_RESPONSE_SIMILARITY_ENABLED", "false").lower() == "true"
+        self.confidence.response_similarity_weight = float(os.getenv("CONFIDENCE_RESPONSE_SIMILARITY_WEIGHT", self.confidence.response_similarity_weight))
         
         # API
         self.api.host = os.getenv("API_HOST", self.api.host)
         self.api.port = int(os.getenv("API_PORT", self.api.port))
         self.api.reload = os.getenv("API_RELOAD", "true").lower() == "true"
         self.api.workers = int(os.getenv("API_WORKERS", self.api.workers))
+        self.api.cpu_workers = int(os.getenv("API_CPU_WORKERS", self.api.cpu_workers))
         self.api.rate_limit_window = int(os.getenv("API_RATE_LIMIT_WINDOW", self.api.rate_limit_window))
         self.api.rate_limit_max_requests = int(os.getenv("API_RATE_LIMIT_MAX_REQUESTS", self.api.rate_limit_max_requests))
         
@@ -114,6 +242,12 @@ class Config:
         self.cache.max_size = int(os.getenv("CACHE_MAX_SIZE", self.cache.max_size))
         self.cache.redis_url = os.getenv("REDIS_URL")
         
+        # Usage metering
+        self.usage.enabled = os.getenv("USAGE_ENABLED", "true").lower() == "true"
+        self.usage.storage_file = os.getenv("USAGE_STORAGE_FILE", self.usage.storage_file)
+        self.usage.persist_interval = float(os.getenv("USAGE_PERSIST_INTERVAL", self.usage.persist_interval))
+        self.usage.retention_days = int(os.getenv("USAGE_RETENTION_DAYS", self.usage.retention_days))
+        
         # Logging
         self.logging.level = os.getenv("LOG_LEVEL", self.logging.level)
         self.logging.format = os.getenv("LOG_FORMAT", self.logging.format)
@@ -143,12 +277,57 @@ class Config:
         if not (0.0 <= self.confidence.threshold <= 1.0):
             errors.append("CONFIDENCE_THRESHOLD must be between 0.0 and 1.0")
         
+        if self.confidence.relevance_similarity_floor >= self.confidence.relevance_similarity_ceiling:
+            errors.append("CONFIDENCE_RELEVANCE_SIMILARITY_FLOOR must be below CONFIDENCE_RELEVANCE_SIMILARITY_CEILING")
+        
+        if not (0.0 <= self.confidence.response_similarity_weight <= 1.0):
+            errors.append("CONFIDENCE_RESPONSE_SIMILARITY_WEIGHT must be between 0.0 and 1.0")
+        
         if not (0.0 <= self.llm.temperature <= 2.0):
             errors.append("LLM_TEMPERATURE must be between 0.0 and 2.0")
         
+        if self.retrieval.candidate_multiplier < 1:
+            errors.append("RETRIEVAL_CANDIDATE_MULTIPLIER must be at least 1")
+        
+        if self.retrieval.context_token_budget <= 0:
+            errors.append("RETRIEVAL_CONTEXT_TOKEN_BUDGET must be positive")
+        
+        if self.retrieval.rerank_candidates < 1 or self.retrieval.rerank_batch_size < 1:
+            errors.append("RETRIEVAL_RERANK_CANDIDATES and RETRIEVAL_RERANK_BATCH_SIZE must be at least 1")
+        
+        if not 0 <= self.retrieval.chunk_overlap_tokens < self.retrieval.chunk_max_tokens:
+            errors.append("RETRIEVAL_CHUNK_OVERLAP_TOKENS must be non-negative and smaller than RETRIEVAL_CHUNK_MAX_TOKENS")
+        
+        if not 0 <= self.retrieval.direct_answer_question_overlap <= 1:
+            errors.append("RETRIEVAL_DIRECT_ANSWER_QUESTION_OVERLAP must be between 0 and 1")
+        
         if self.llm.max_tokens <= 0:
             errors.append("LLM_MAX_TOKENS must be positive")
         
+        if self.llm.max_concurrency < 1 or self.llm.max_connections < 1:
+            errors.append("LLM_MAX_CONCURRENCY and LLM_MAX_CONNECTIONS must be at least 1")
+        
+        if self.llm.request_timeout <= 0 or self.llm.connect_timeout <= 0:
+            errors.append("LLM_REQUEST_TIMEOUT and LLM_CONNECT_TIMEOUT must be positive")
+        
+        if self.llm.deadline <= 0:
+            errors.append("LLM_DEADLINE must be positive")
+        
+        if self.llm.max_retries < 0 or self.llm.breaker_failure_threshold < 1:
+            errors.append("LLM_MAX_RETRIES must be non-negative and LLM_BREAKER_FAILURE_THRESHOLD at least 1")
+        
+        if self.llm.generation_cache_size < 1 or self.llm.generation_cache_ttl <= 0:
+            errors.append("LLM_GENERATION_CACHE_SIZE must be at least 1 and LLM_GENERATION_CACHE_TTL positive")
+        
+        if self.llm.fast_max_tokens <= 0:
+            errors.append("LLM_FAST_MAX_TOKENS must be positive")
+        
+        if self.llm.readiness_interval <= 0 or self.llm.readiness_timeout <= 0:
+            errors.append("LLM_READINESS_INTERVAL and LLM_READINESS_TIMEOUT must be positive")
+        
+        if self.usage.persist_interval <= 0 or self.usage.retention_days < 1:
+            errors.append("USAGE_PERSIST_INTERVAL must be positive and USAGE_RETENTION_DAYS at least 1")
+        
         if self.api.port <= 0 or self.api.port > 65535:
             errors.append("API_PORT must be between 1 and 65535")
         
@@ -172,26 +351,66 @@ class Config:
                 "collection_name": self.database.collection_name,
                 "persist_dir": self.database.persist_dir,
                 "similarity_threshold": self.database.similarity_threshold,
-                "max_results": self.database.max_results
+                "max_results": self.database.max_results,
+                "partition_by_language": self.database.partition_by_language,
+                "languages": list(self.database.languages)
+            },
+            "retrieval": {
+                "hybrid_enabled": self.retrieval.hybrid_enabled,
+                "candidate_multiplier": self.retrieval.candidate_multiplier,
+                "rrf_k": self.retrieval.rrf_k,
+                "bm25_k1": self.retrieval.bm25_k1,
+                "bm25_b": self.retrieval.bm25_b,
+                "context_token_budget": self.retrieval.context_token_budget,
+                "rerank_enabled": self.retrieval.rerank_enabled,
+                "rerank_model": self.retrieval.rerank_model,
+                "rerank_candidates": self.retrieval.rerank_candidates,
+                "rerank_latency_budget_ms": self.retrieval.rerank_latency_budget_ms,
+                "rerank_margin": self.retrieval.rerank_margin,
+                "chunk_max_tokens": self.retrieval.chunk_max_tokens,
+                "chunk_overlap_tokens": self.retrieval.chunk_overlap_tokens,
+                "direct_answer_enabled": self.retrieval.direct_answer_enabled,
+                "direct_answer_similarity": self.retrieval.direct_answer_similarity,
+                "direct_answer_question_overlap": self.retrieval.direct_answer_question_overlap,
+                "cross_lingual_enabled": self.retrieval.cross_lingual_enabled,
+                "cross_lingual_penalty": self.retrieval.cross_lingual_penalty
             },
             "llm": {
                 "model_name": self.llm.model_name,
                 "temperature": self.llm.temperature,
                 "max_tokens": self.llm.max_tokens,
-                "api_key_set": bool(self.llm.api_key)
+                "api_key_set": bool(self.llm.api_key),
+                "base_url": self.llm.base_url,
+                "request_timeout": self.llm.request_timeout,
+                "max_concurrency": self.llm.max_concurrency,
+                "max_connections": self.llm.max_connections,
+                "http2": self.llm.http2,
+                "deadline": self.llm.deadline,
+                "max_retries": self.llm.max_retries,
+                "hedge_enabled": self.llm.hedge_enabled,
+                "fallback_model_name": self.llm.fallback_model_name,
+                "generation_cache_enabled": self.llm.generation_cache_enabled,
+                "generation_cache_max_temperature": self.llm.generation_cache_max_temperature,
+                "routing_enabled": self.llm.routing_enabled,
+                "fast_model_name": self.llm.fast_model_name,
+                "routing_min_similarity": self.llm.routing_min_similarity
             },
             "confidence": {
                 "threshold": self.confidence.threshold,
                 "context_weight": self.confidence.context_weight,
                 "source_weight": self.confidence.source_weight,
                 "length_weight": self.confidence.length_weight,
-                "terms_weight": self.confidence.terms_weight
+                "terms_weight": self.confidence.terms_weight,
+                "relevance_similarity_floor": self.confidence.relevance_similarity_floor,
+                "relevance_similarity_ceiling": self.confidence.relevance_similarity_ceiling,
+                "response_similarity_enabled": self.confidence.response_similarity_enabled
             },
             "api": {
                 "host": self.api.host,
                 "port": self.api.port,
                 "reload": self.api.reload,
                 "workers": self.api.workers,
+                "cpu_workers": self.api.cpu_workers,
                 "rate_limit_window": self.api.rate_limit_window,
                 "rate_limit_max_requests": self.api.rate_limit_max_requests
             },
@@ -201,6 +420,12 @@ class Config:
                 "max_size": self.cache.max_size,
                 "redis_url_set": bool(self.cache.redis_url)
             },
+            "usage": {
+                "enabled": self.usage.enabled,
+                "storage_file": self.usage.storage_file,
+                "persist_interval": self.usage.persist_interval,
+                "retention_days": self.usage.retention_days
+            },
             "logging": {
                 "level": self.logging.level,
                 "format": self.logging.format,
@@ -76,6 +76,19 @@ class EmbeddingManager:
             logger.exception(f"Failed to generate embedding: {str(e)}")
             raise
     
+    def get_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Generate embeddings for many texts in batched forward passes."""
+        try:
+            if any(not text.strip() for text in texts):
+                raise ValueError("Input text cannot be empty")
+            
+            logger.debug(f"Generating embeddings for {len(texts)} texts")
+            return np.asarray(self.model.encode(texts, normalize_embeddings=True, batch_size=batch_size))
+            
+        except Exception as e:
+            logger.exception(f"Failed to generate embeddings: {str(e)}")
+            raise
+    
     def find_similar_faqs(self, query: str, top_k: int = 5) -> List[Dict]:
         """Find similar FAQs based on a query."""
         try:
@@ -0,0 +1,173 @@
+"""
+Generation-level cache for LLM answers.
+
+Paraphrases of a question often retrieve exactly the same FAQ entries, and a
+low-temperature model then writes essentially the same answer again. Answers
+are cached under the retrieved document ids, the normalized question and the
+generation parameters, and evicted by LRU, by TTL, or as soon as one of the
+documents they were generated from changes in the vector database.
+"""
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunked FAQ answers are stored as "<parent id>#c<index>" (see src/retrieval/chunking.py)
+_CHUNK_SUFFIX = re.compile(r"#c\d+$")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?？!！.。,，]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache keys: width, case, whitespace and trailing punctuation.
+
+    Args:
+        question (str): User question.
+
+    Returns:
+        str: Normalized question.
+    """
+    normalized = unicodedata.normalize("NFKC", question).lower()
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return _TRAILING_PUNCTUATION.sub("", normalized)
+
+def document_id(stored_id: str) -> str:
+    """Map a stored vector database id to the FAQ entry it belongs to."""
+    return _CHUNK_SUFFIX.sub("", stored_id)
+
+class GenerationCache:
+    """In-memory LRU + TTL cache of generated answers, indexed by source document."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted.
+            ttl (float): Seconds an entry stays valid.
+            clock (Callable[[], float]): Time source, replaceable in tests.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Set[str], Dict[str, Any]]]" = OrderedDict()
+        self._keys_by_document: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(
+        doc_ids: Iterable[str],
+        question: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """
+        Build the cache key of a generation.
+
+        Args:
+            doc_ids (Iterable[str]): Ids of the documents in the context; order does not matter.
+            question (str): User question.
+            model (str): Model name.
+            temperature (float): Sampling temperature.
+            max_tokens (int): Maximum completion tokens.
+
+        Returns:
+            str: Hex digest identifying the generation.
+        """
+        payload = json.dumps(
+            [sorted(document_id(doc_id) for doc_id in doc_ids), normalize_question(question), model, round(temperature, 3), max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for ``key``, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[0] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(entry[2])
+
+    def put(self, key: str, doc_ids: Iterable[str], response: Dict[str, Any]) -> None:
+        """
+        Store a generated response.
+
+        Args:
+            key (str): Key from ``make_key``.
+            doc_ids (Iterable[str]): Ids of the documents the response was generated from.
+            response (Dict[str, Any]): Response dictionary (content, model, usage).
+        """
+        documents = {document_id(doc_id) for doc_id in doc_ids}
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock(), documents, dict(response))
+            for doc_id in documents:
+                self._keys_by_document.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        _, documents, _ = self._entries.pop(key)
+        for doc_id in documents:
+            keys = self._keys_by_document.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_document[doc_id]
+
+    def invalidate_documents(self, doc_ids: Iterable[str]) -> int:
+        """
+        Drop every entry generated from any of the given documents.
+
+        Args:
+            doc_ids (Iterable[str]): Changed document or chunk ids.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        with self._lock:
+            keys = set()
+            for doc_id in doc_ids:
+                keys |= self._keys_by_document.get(document_id(doc_id), set())
+            for key in keys:
+                self._remove(key)
+            self.stats["invalidations"] += len(keys)
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached generations after a document change")
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._keys_by_document.clear()
+
+    def on_vector_db_change(self, event: str, **payload: Any) -> None:
+        """``VectorDBManager.subscribe`` listener keeping the cache consistent with the FAQ."""
+        if event in ("add", "delete"):
+            self.invalidate_documents(payload.get("ids") or [])
+        else:
+            self.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "size": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl}
@@ -2,11 +2,17 @@
 LLM manager for handling interactions with language models.
 """
 import os
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import importlib.util
+from typing import Dict, Any, List, Optional, Union, AsyncIterator, Sequence
+import httpx
+from openai import OpenAI, AsyncOpenAI
 
 from src.config import config
+from src.llm.streaming import ResponseStream, usage_to_dict
+from src.llm.generation_cache import GenerationCache
+from src.llm.routing import ModelRouter
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +21,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Identical for every request so providers can cache it as a shared prompt prefix;
+# nothing request-specific may be added here
+SYSTEM_PROMPT = """You are a bilingual immigration assistant.
+Answer the user's question based only on the documents in the user message.
+
+Respond in the same language as the question. If you cannot find a relevant answer in the provided documents, 
+say so clearly in the same language as the question. Do not make up information."""
+
 class LLMManager:
     """Manager class for handling LLM interactions."""
     
@@ -33,15 +47,61 @@ class LLMManager:
             if not api_key:
                 raise ValueError("OPENAI_API_KEY environment variable not set")
             
-            # Create client with minimal configuration to avoid compatibility issues
-            self.client = OpenAI(api_key=api_key)
+            self._api_key = api_key
+            self.timeout = httpx.Timeout(config.llm.request_timeout, connect=config.llm.connect_timeout)
+            # base_url points both clients at any OpenAI-compatible server, e.g. src/llm/mock_server.py.
+            # SDK retries are off: ResilientLLMManager owns retries, backoff and the circuit breaker.
+            self.client = OpenAI(api_key=api_key, base_url=config.llm.base_url, timeout=self.timeout, max_retries=0)
+            
+            # The async client and its connection pool are created on first use, inside the event loop
+            self._async_client: Optional[AsyncOpenAI] = None
+            self._http_client: Optional[httpx.AsyncClient] = None
+            self._semaphore: Optional[asyncio.Semaphore] = None
+            
+            # Strong retrieval matches go to a faster model first (see QueryPipeline._generate_answer)
+            self.router: Optional[ModelRouter] = None
+            if config.llm.routing_enabled:
+                self.router = ModelRouter(
+                    primary_model=self.model_name,
+                    primary_max_tokens=config.llm.max_tokens,
+                    fast_model=config.llm.fast_model_name,
+                    fast_max_tokens=config.llm.fast_max_tokens,
+                    min_similarity=config.llm.routing_min_similarity
+                )
+            
+            # Answers generated at low temperature are reused for the same documents and question
+            self.generation_cache: Optional[GenerationCache] = None
+            if config.llm.generation_cache_enabled:
+                self.generation_cache = GenerationCache(
+                    max_entries=config.llm.generation_cache_size,
+                    ttl=config.llm.generation_cache_ttl
+                )
             
         except Exception as e:
             logger.exception(f"Failed to initialize LLMManager: {str(e)}")
             raise
     
+    def _prepare_messages(self, context: str, user_input: str) -> List[Dict[str, str]]:
+        """Prepare the chat messages for the LLM.
+        
+        The instructions form a fixed system message so every request shares the
+        same prefix, which lets the provider's prompt-prefix cache apply. Only the
+        user message varies between requests.
+        
+        Args:
+            context (str): Retrieved context documents.
+            user_input (str): User's question.
+            
+        Returns:
+            List[Dict[str, str]]: System and user messages.
+        """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Documents:\n{context}\n\nQuestion: {user_input}"}
+        ]
+    
     def _prepare_prompt(self, context: str, user_input: str) -> str:
-        """Prepare the prompt for the LLM.
+        """Prepare the full prompt text, as sent in the chat messages.
         
         Args:
             context (str): Retrieved context documents.
@@ -50,23 +110,18 @@ class LLMManager:
         Returns:
             str: Formatted prompt.
         """
-        return f"""You are a bilingual immigration assistant.
-Answer the user's question based only on the following documents:
-
-{context}
-
-Question: {user_input}
-
-Respond in the same language as the question. If you cannot find a relevant answer in the provided documents, 
-say so clearly in the same language as the question. Do not make up information."""
+        return "\n\n".join(message["content"] for message in self._prepare_messages(context, user_input))
     
     def generate_response(
         self,
         context: str,
         user_input: str,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
-    ) -> Dict[str, Any]:
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        doc_ids: Optional[Sequence[str]] = None,
+        model: Optional[str] = None
+    ) -> Union[Dict[str, Any], ResponseStream]:
         """Generate a response using the LLM.
         
         Args:
@@ -74,39 +129,45 @@ say so clearly in the same language as the question. Do not make up information.
             user_input (str): User's question.
             temperature (Optional[float]): Sampling temperature. If None, uses config default.
             max_tokens (Optional[int]): Maximum tokens in response. If None, uses config default.
+            stream (bool): Return a ResponseStream that yields the answer as it is generated.
+            doc_ids (Optional[Sequence[str]]): Ids of the documents in ``context``; enables the generation cache.
+            model (Optional[str]): Model to use for this request, e.g. chosen by ``router``. If None, uses ``model_name``.
             
         Returns:
-            Dict[str, Any]: Response from the LLM.
+            Union[Dict[str, Any], ResponseStream]: Response from the LLM, or the stream of it.
         """
         try:
             # Use config defaults if not provided
             temperature = temperature if temperature is not None else config.llm.temperature
             max_tokens = max_tokens if max_tokens is not None else config.llm.max_tokens
+            model = model or self.model_name
+            
+            cache_key = self._generation_cache_key(doc_ids, user_input, model, temperature, max_tokens)
+            cached = self._cached_generation(cache_key)
+            if cached is not None:
+                return self._replay_stream(cached) if stream else cached
             
             # Prepare the prompt
+            messages = self._prepare_messages(context, user_input)
             prompt = self._prepare_prompt(context, user_input)
             
-            logger.info(f"Sending request to LLM (model: {self.model_name}, temp: {temperature}, max_tokens: {max_tokens})")
+            logger.info(f"Sending request to LLM (model: {model}, temp: {temperature}, max_tokens: {max_tokens}, stream: {stream})")
             response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
+                model=model,
+                messages=messages,
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stream=stream
             )
             
+            if stream:
+                response_stream = ResponseStream.from_chunks(response, model, prompt)
+                response_stream.on_complete = self._cache_generation(cache_key, doc_ids)
+                return response_stream
+            
             # Extract and return the response
-            result = {
-                "content": response.choices[0].message.content,
-                "model": response.model,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
+            result = self._parse_response(response)
+            self._cache_generation(cache_key, doc_ids)(result)
             
             logger.info(f"Generated response with {result['usage']['total_tokens']} total tokens")
             return result
@@ -115,30 +176,229 @@ say so clearly in the same language as the question. Do not make up information.
             logger.exception(f"Failed to generate response: {str(e)}")
             raise
     
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async OpenAI client sharing one pooled keep-alive HTTP client across requests."""
+        self._ensure_async_client()
+        return self._async_client
+    
+    def _ensure_async_client(self) -> None:
+        """Create the async client, its connection pool and the concurrency limit once."""
+        if self._async_client is None:
+            # HTTP/2 multiplexes concurrent completions over few connections, but needs the h2 package
+            http2 = config.llm.http2 and importlib.util.find_spec("h2") is not None
+            self._http_client = httpx.AsyncClient(
+                http2=http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=config.llm.max_connections,
+                    max_keepalive_connections=config.llm.max_keepalive_connections,
+                    keepalive_expiry=config.llm.keepalive_expiry
+                )
+            )
+            self._async_client = AsyncOpenAI(
+                api_key=self._api_key,
+                base_url=config.llm.base_url,
+                http_client=self._http_client,
+                max_retries=0
+            )
+            self._semaphore = asyncio.Semaphore(config.llm.max_concurrency)
+            logger.info(f"Created async LLM client (http2: {http2}, max concurrency: {config.llm.max_concurrency})")
+    
+    def _parse_response(self, response) -> Dict[str, Any]:
+        """Convert a chat completion into the response dictionary."""
+        return {
+            "content": response.choices[0].message.content,
+            "model": response.model,
+            "usage": usage_to_dict(response.usage)
+        }
+    
+    def _generation_cache_key(
+        self,
+        doc_ids: Optional[Sequence[str]],
+        user_input: str,
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """Cache key of a generation, or None when the answer should not be cached."""
+        if self.generation_cache is None or not doc_ids or temperature > config.llm.generation_cache_max_temperature:
+            return None
+        return GenerationCache.make_key(doc_ids, user_input, model, temperature, max_tokens)
+    
+    def _cached_generation(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up a cached answer.
+        
+        It is reported with zero usage since no tokens were spent, and with the usage of
+        the original generation as ``saved_usage``.
+        """
+        if cache_key is None:
+            return None
+        cached = self.generation_cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.info("Answer served from the generation cache")
+        return {
+            **cached,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0},
+            "saved_usage": cached["usage"]
+        }
+    
+    def _cache_generation(self, cache_key: Optional[str], doc_ids: Optional[Sequence[str]]):
+        """Return a callback storing a finished response under ``cache_key``."""
+        def store(result: Dict[str, Any]) -> None:
+            if cache_key is not None and result.get("content"):
+                self.generation_cache.put(cache_key, doc_ids, result)
+        return store
+    
+    def _replay_stream(self, cached: Dict[str, Any]) -> ResponseStream:
+        """Stream a cached answer as a single delta."""
+        response_stream = ResponseStream(iter([cached["content"]]), cached["model"])
+        response_stream.usage = cached["usage"]
+        response_stream.saved_usage = cached.get("saved_usage")
+        return response_stream
+    
+    async def _create_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool
+    ):
+        """Send a chat completion request on the async client."""
+        return await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream
+        )
+    
+    async def agenerate_response(
+        self,
+        context: str,
+        user_input: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        doc_ids: Optional[Sequence[str]] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Asynchronous version of ``generate_response``.
+        
+        At most ``config.llm.max_concurrency`` completions are in flight at once;
+        further calls wait for a slot without holding a thread.
+        """
+        try:
+            temperature = temperature if temperature is not None else config.llm.temperature
+            max_tokens = max_tokens if max_tokens is not None else config.llm.max_tokens
+            model = model or self.model_name
+            cache_key = self._generation_cache_key(doc_ids, user_input, model, temperature, max_tokens)
+            cached = self._cached_generation(cache_key)
+            if cached is not None:
+                return cached
+            
+            messages = self._prepare_messages(context, user_input)
+            self._ensure_async_client()
+            async with self._semaphore:
+                response = await self._create_completion(messages, model, temperature, max_tokens, stream=False)
+            result = self._parse_response(response)
+            self._cache_generation(cache_key, doc_ids)(result)
+            logger.info(f"Generated response with {result['usage']['total_tokens']} total tokens")
+            return result
+            
+        except Exception as e:
+            logger.exception(f"Failed to generate response: {str(e)}")
+            raise
+    
+    async def astream_response(
+        self,
+        context: str,
+        user_input: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        doc_ids: Optional[Sequence[str]] = None,
+        model: Optional[str] = None
+    ) -> ResponseStream:
+        """Start a streamed response; iterate it with ``async for``.
+        
+        The concurrency slot is held until the stream is exhausted or closed.
+        """
+        temperature = temperature if temperature is not None else config.llm.temperature
+        max_tokens = max_tokens if max_tokens is not None else config.llm.max_tokens
+        model = model or self.model_name
+        cache_key = self._generation_cache_key(doc_ids, user_input, model, temperature, max_tokens)
+        cached = self._cached_generation(cache_key)
+        if cached is not None:
+            return self._replay_stream(cached)
+        
+        messages = self._prepare_messages(context, user_input)
+        prompt = self._prepare_prompt(context, user_input)
+        self._ensure_async_client()
+        await self._semaphore.acquire()
+        try:
+            chunks = await self._create_completion(messages, model, temperature, max_tokens, stream=True)
+        except BaseException as e:
+            # Also release on cancellation, e.g. when a deadline expires while the stream opens
+            self._semaphore.release()
+            if isinstance(e, Exception):
+                logger.exception(f"Failed to generate response: {str(e)}")
+            raise
+        response_stream = ResponseStream.from_async_chunks(self._release_after(chunks), model, prompt)
+        response_stream.on_complete = self._cache_generation(cache_key, doc_ids)
+        return response_stream
+    
+    async def _release_after(self, chunks) -> AsyncIterator[Any]:
+        """Pass chunks through, releasing the concurrency slot when the stream ends."""
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self._semaphore.release()
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections of the async client."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._async_client = None
+    
     def get_config_summary(self) -> Dict[str, Any]:
         """Get a summary of the current LLM configuration."""
         return {
             "model_name": self.model_name,
             "temperature": config.llm.temperature,
             "max_tokens": config.llm.max_tokens,
-            "api_key_set": bool(config.llm.api_key)
+            "api_key_set": bool(config.llm.api_key),
+            "base_url": config.llm.base_url,
+            "max_concurrency": config.llm.max_concurrency,
+            "request_timeout": config.llm.request_timeout,
+            "generation_cache": self.generation_cache.get_stats() if self.generation_cache is not None else None,
+            "routing": self.router.get_stats() if self.router is not None else None
         }
     
+    async def check_reachable(self) -> bool:
+        """Check that the API is reachable and the model is available, without generating tokens.
+        
+        Returns:
+            bool: True if the model could be retrieved.
+        """
+        # One attempt only (the client never retries): the probe runs periodically and its caller applies the timeout
+        await self.async_client.models.retrieve(self.model_name)
+        return True
+    
     def test_connection(self) -> bool:
         """Test the connection to the OpenAI API.
         
+        Retrieves the model instead of running a completion, so no tokens are spent.
+        
         Returns:
             bool: True if connection successful, False otherwise.
         """
         try:
-            # Try a simple test request
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=5
-            )
+            self.client.models.retrieve(self.model_name)
             logger.info("LLM connection test successful")
             return True
         except Exception as e:
             logger.error(f"LLM connection test failed: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,312 @@
+"""
+OpenAI-compatible stand-in server for load and latency testing.
+
+Serves ``/v1/chat/completions`` (plain and streamed) and ``/v1/models`` with
+realistic, configurable behaviour: a time-to-first-token distribution, a token
+generation rate, and injected server errors, hangs and 429 rate limits. Point the
+API at it with ``OPENAI_BASE_URL`` to benchmark concurrency, retries and streaming
+without network access or API costs.
+
+Usage:
+    python -m src.llm.mock_server --port 8100 --latency-ms 800 --tokens-per-second 40
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=mock python start_server.py
+
+Settings can be changed while the server runs with ``POST /mock/settings``.
+"""
+import json
+import time
+import hashlib
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from src.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+# Prompt-prefix caching as OpenAI applies it: prefixes of 1024+ tokens, in 128-token steps
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_INCREMENT = 128
+# Distinct prefixes remembered, least recently used forgotten first, so long load tests stay bounded
+PREFIX_CACHE_MAX_ENTRIES = 4096
+
+FILLER_TEXT = (
+    "Based on the provided documents, a Green Card holder is a lawful permanent resident "
+    "of the United States. Eligibility usually depends on family, employment or humanitarian "
+    "categories, and processing times vary by category and country of chargeability."
+)
+
+@dataclass
+class MockServerSettings:
+    """Behaviour of the mock server."""
+    latency_ms: float = 500.0  # median time to first token
+    latency_distribution: str = "lognormal"
+    latency_sigma: float = 0.5  # spread of the lognormal / half-width ratio of the uniform distribution
+    tokens_per_second: float = 50.0
+    completion_tokens: int = 120
+    error_rate: float = 0.0  # share of requests answered with a 500
+    timeout_rate: float = 0.0  # share of requests that hang for timeout_seconds
+    timeout_seconds: float = 120.0
+    rate_limit_rate: float = 0.0  # share of requests answered with a 429
+    rate_limit_rps: float = 0.0  # token bucket refill rate; 0 disables it
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+    def validate(self) -> List[str]:
+        """Return a list of invalid settings."""
+        errors = []
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            errors.append(f"latency_distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        if self.latency_ms < 0 or self.tokens_per_second <= 0 or self.completion_tokens < 1:
+            errors.append("latency_ms must be non-negative, tokens_per_second and completion_tokens positive")
+        for name in ("error_rate", "timeout_rate", "rate_limit_rate"):
+            if not 0 <= getattr(self, name) <= 1:
+                errors.append(f"{name} must be between 0 and 1")
+        return errors
+
+class MockLLMBackend:
+    """Samples latency and failures and builds OpenAI-shaped responses."""
+
+    def __init__(self, settings: Optional[MockServerSettings] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            settings (Optional[MockServerSettings]): Behaviour. If None, defaults are used.
+        """
+        self.settings = settings or MockServerSettings()
+        self.rng = random.Random(self.settings.seed)
+        self._bucket = 0.0
+        self._bucket_updated = time.monotonic()
+        # SHA-256 digests of seen prefixes, oldest first
+        self._seen_prefixes: "OrderedDict[bytes, None]" = OrderedDict()
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "rate_limited": 0, "streamed": 0}
+
+    def sample_latency(self) -> float:
+        """Sample the time to first token in seconds."""
+        median = self.settings.latency_ms / 1000.0
+        if self.settings.latency_distribution == "fixed" or median == 0:
+            return median
+        if self.settings.latency_distribution == "uniform":
+            spread = median * self.settings.latency_sigma
+            return max(0.0, self.rng.uniform(median - spread, median + spread))
+        return self.rng.lognormvariate(0.0, self.settings.latency_sigma) * median
+
+    def _rate_limited(self) -> bool:
+        """Apply the token bucket and the random 429 rate."""
+        rps = self.settings.rate_limit_rps
+        if rps > 0:
+            now = time.monotonic()
+            self._bucket = min(rps, self._bucket + (now - self._bucket_updated) * rps)
+            self._bucket_updated = now
+            if self._bucket < 1:
+                return True
+            self._bucket -= 1
+        return self.rng.random() < self.settings.rate_limit_rate
+
+    def fault(self) -> Optional[str]:
+        """Decide the injected fault for a request: "rate_limit", "error", "timeout" or None."""
+        self.stats["requests"] += 1
+        if self._rate_limited():
+            self.stats["rate_limited"] += 1
+            return "rate_limit"
+        roll = self.rng.random()
+        if roll < self.settings.error_rate:
+            self.stats["errors"] += 1
+            return "error"
+        if roll < self.settings.error_rate + self.settings.timeout_rate:
+            self.stats["timeouts"] += 1
+            return "timeout"
+        return None
+
+    def cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Prompt tokens a provider would serve from its prefix cache.
+
+        The leading system messages are treated as the cacheable prefix: they count
+        as cached once the same prefix has been seen and is long enough.
+        """
+        prefix = _prompt_text([message for message in messages if message.get("role") == "system"])
+        tokens = estimate_tokens(prefix)
+        if tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        digest = hashlib.sha256(prefix.encode("utf-8")).digest()
+        if digest not in self._seen_prefixes:
+            self._seen_prefixes[digest] = None
+            if len(self._seen_prefixes) > PREFIX_CACHE_MAX_ENTRIES:
+                self._seen_prefixes.popitem(last=False)
+            return 0
+        self._seen_prefixes.move_to_end(digest)
+        return tokens - tokens % PREFIX_CACHE_INCREMENT
+
+    def completion_words(self, prompt: str, max_tokens: Optional[int]) -> List[str]:
+        """Words of the generated answer, about ``completion_tokens`` tokens long."""
+        budget = min(self.settings.completion_tokens, max_tokens or self.settings.completion_tokens)
+        filler = FILLER_TEXT.split(" ")
+        words = []
+        while estimate_tokens(" ".join(words)) < budget:
+            words.append(filler[len(words) % len(filler)])
+        return words
+
+def _error_response(status_code: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+        headers=headers
+    )
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(message.get("content") or "") for message in messages)
+
+def create_app(settings: Optional[MockServerSettings] = None) -> FastAPI:
+    """
+    Build the mock server application.
+
+    Args:
+        settings (Optional[MockServerSettings]): Behaviour. If None, defaults are used.
+
+    Returns:
+        FastAPI: Application serving the OpenAI routes under ``/v1``.
+    """
+    app = FastAPI(title="Mock OpenAI API", docs_url=None, redoc_url=None)
+    backend = MockLLMBackend(settings)
+    app.state.backend = backend
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "mock-model", "object": "model", "created": 0, "owned_by": "mock"}]}
+
+    @app.get("/v1/models/{model_id}")
+    async def retrieve_model(model_id: str):
+        return {"id": model_id, "object": "model", "created": 0, "owned_by": "mock"}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fault = backend.fault()
+        if fault == "rate_limit":
+            retry_after = backend.settings.retry_after
+            return _error_response(429, "Rate limit reached (mock)", "requests", {"retry-after": str(retry_after)})
+        if fault == "error":
+            return _error_response(500, "The server had an error (mock)", "server_error")
+        if fault == "timeout":
+            await asyncio.sleep(backend.settings.timeout_seconds)
+            return _error_response(504, "Gateway timeout (mock)", "timeout")
+
+        model = body.get("model", "mock-model")
+        prompt = _prompt_text(body.get("messages", []))
+        words = backend.completion_words(prompt, body.get("max_tokens"))
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(" ".join(words))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": backend.cached_tokens(body.get("messages", []))}
+        }
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        first_token_delay = backend.sample_latency()
+        token_delay = 1.0 / backend.settings.tokens_per_second
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay + completion_tokens * token_delay)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        backend.stats["streamed"] += 1
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(first_token_delay)
+            yield chunk({"role": "assistant", "content": ""})
+            for index, word in enumerate(words):
+                yield chunk({"content": word if index == 0 else " " + word})
+                await asyncio.sleep(estimate_tokens(word) * token_delay)
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/mock/settings")
+    async def get_settings():
+        return {"settings": asdict(backend.settings), "stats": backend.stats}
+
+    @app.post("/mock/settings")
+    async def update_settings(request: Request):
+        updates = await request.json()
+        known = {field.name for field in fields(MockServerSettings)}
+        unknown = set(updates) - known
+        if unknown:
+            return _error_response(400, f"Unknown settings: {', '.join(sorted(unknown))}", "invalid_request_error")
+        candidate = MockServerSettings(**{**asdict(backend.settings), **updates})
+        errors = candidate.validate()
+        if errors:
+            return _error_response(400, "; ".join(errors), "invalid_request_error")
+        backend.settings = candidate
+        if "seed" in updates:
+            backend.rng.seed(candidate.seed)
+        logger.info(f"Mock server settings updated: {updates}")
+        return {"settings": asdict(backend.settings)}
+
+    return app
+
+def main():
+    defaults = MockServerSettings()
+    parser = argparse.ArgumentParser(description="Run an OpenAI-compatible mock server for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Median time to first token")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency_distribution)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate)
+    parser.add_argument("--timeout-seconds", type=float, default=defaults.timeout_seconds)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--rate-limit-rps", type=float, default=defaults.rate_limit_rps)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockServerSettings(**{
+        name: value for name, value in vars(args).items() if name not in ("host", "port")
+    })
+    errors = settings.validate()
+    if errors:
+        parser.error("; ".join(errors))
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Background readiness probe for the LLM provider.
+
+Startup no longer waits on a chat completion to learn whether the provider is
+reachable. The probe checks in the background with a request that generates no
+tokens and caches the outcome for ``/health`` and ``/ready``.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ReadinessProbe:
+    """Periodically runs a reachability check and caches its result."""
+
+    def __init__(self, check: Callable[[], Awaitable[Any]], interval: float = 30.0, timeout: float = 5.0):
+        """
+        Initialize the probe.
+
+        Args:
+            check (Callable[[], Awaitable[Any]]): Coroutine function that raises or returns False when unreachable.
+            interval (float): Seconds between checks.
+            timeout (float): Seconds before a check counts as failed.
+        """
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.reachable: Optional[bool] = None
+        self.last_checked: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def probe(self) -> bool:
+        """Run the check once and record the outcome."""
+        start = time.perf_counter()
+        try:
+            reachable = await asyncio.wait_for(self.check(), self.timeout) is not False
+            error = None if reachable else "check returned False"
+        except Exception as e:
+            reachable, error = False, f"{type(e).__name__}: {e}"
+        self.latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.last_checked = datetime.now().isoformat()
+        if reachable != self.reachable:
+            log = logger.info if reachable else logger.warning
+            log(f"LLM provider {'reachable' if reachable else 'unreachable'}" + (f": {error}" if error else ""))
+        self.reachable, self.last_error = reachable, error
+        return reachable
+
+    async def _loop(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start checking in the background; returns immediately."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def status(self) -> Dict[str, Any]:
+        """Cached outcome of the last check; ``reachable`` is None until the first one finishes."""
+        return {
+            "reachable": self.reachable,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+            "latency_ms": self.latency_ms
+        }
@@ -0,0 +1,357 @@
+"""
+Resilience layer for LLM calls: retries, deadlines, hedging and circuit breaking.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+import httpx
+import openai
+
+from src.config import config
+from src.llm.streaming import ResponseStream
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: request timeout, conflict, rate limit and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# HTTP statuses that mean the model cannot serve any request (bad key, no access, unknown model)
+UNAVAILABLE_STATUS_CODES = {401, 403, 404}
+
+# Successful calls needed before the observed p95 is trusted as the hedge delay
+MIN_HEDGE_SAMPLES = 20
+
+class LLMUnavailableError(Exception):
+    """Raised when no model produced an answer within the deadline."""
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a failed LLM call may succeed when repeated.
+
+    Args:
+        error (BaseException): Error raised by the call.
+
+    Returns:
+        bool: True for rate limits, server errors, timeouts and connection errors.
+    """
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+def is_unavailable(error: BaseException) -> bool:
+    """
+    Decide whether a non-retryable error means the model itself is unusable.
+
+    Args:
+        error (BaseException): Error raised by the call.
+
+    Returns:
+        bool: True for authentication, permission and not-found errors.
+    """
+    return isinstance(error, openai.APIStatusError) and error.status_code in UNAVAILABLE_STATUS_CODES
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, error: Optional[BaseException] = None) -> float:
+    """
+    Delay before the next attempt, using exponential backoff with full jitter.
+
+    A ``Retry-After`` header on a rate limit response takes precedence, capped at ``max_delay``.
+
+    Args:
+        attempt (int): Number of the attempt that failed, starting at 0.
+        base_delay (float): Delay scale in seconds.
+        max_delay (float): Upper bound in seconds.
+        error (Optional[BaseException]): Error of the failed attempt.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Stops calling a model after consecutive failures.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    calls are refused for ``reset_timeout`` seconds. It then lets a single trial
+    call through (half-open); success closes it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout (float): Seconds to stay open before a trial call.
+            clock (Callable[[], float]): Time source, replaceable in tests.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """One of "closed", "open" or "half_open"."""
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit breaker opened after {self.failures} consecutive failures")
+            self.opened_at = self._clock()
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile (0-1) of the window, or None when it is empty."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class ResilientLLMManager:
+    """Wraps an LLM manager with retries, an end-to-end deadline, hedging and a fallback.
+
+    Each request gets ``config.llm.deadline`` seconds in total. Retryable errors
+    are retried with jittered exponential backoff while time remains. With hedging
+    enabled, a second identical request is sent if the first has not answered
+    after the observed p95 latency, and whichever finishes first is kept. When the
+    primary model fails repeatedly its circuit breaker opens and requests go
+    straight to the fallback model. If nothing answers in time
+    ``LLMUnavailableError`` is raised.
+    """
+
+    def __init__(self, primary, fallback=None, breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            primary: LLM manager providing ``agenerate_response`` and ``astream_response``.
+            fallback: Optional manager used when the primary is unavailable.
+            breaker (Optional[CircuitBreaker]): Breaker for the primary. If None, built from config.
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=config.llm.breaker_failure_threshold,
+            reset_timeout=config.llm.breaker_reset_timeout
+        )
+        self.latencies = LatencyTracker()
+        self.stats = {"requests": 0, "retries": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0, "failures": 0}
+
+    @property
+    def model_name(self) -> str:
+        return self.primary.model_name
+
+    @property
+    def router(self):
+        return getattr(self.primary, "router", None)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or the p95 is not known yet."""
+        if not config.llm.hedge_enabled or len(self.latencies.samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.latencies.percentile(0.95), config.llm.hedge_min_delay)
+
+    async def _hedged(self, call: Callable[[], Awaitable[Any]], timeout: float, hedge_delay: Optional[float]) -> Any:
+        """Run ``call`` within ``timeout``, starting a second copy after ``hedge_delay``."""
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await asyncio.wait_for(call(), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = {asyncio.ensure_future(call())}
+        hedge = None
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if not done:
+                hedge = asyncio.ensure_future(call())
+                pending.add(hedge)
+                self.stats["hedged"] += 1
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+                remaining = deadline - loop.time()
+                if not pending:
+                    raise error
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, method: str, kwargs: Dict[str, Any], hedge: bool) -> Any:
+        """Call ``method`` on the primary with retries, then on the fallback, within the deadline."""
+        self.stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.llm.deadline
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(config.llm.max_retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not self.breaker.allow():
+                break
+            started = time.perf_counter()
+            try:
+                result = await self._hedged(
+                    lambda: getattr(self.primary, method)(**kwargs),
+                    remaining,
+                    self._hedge_delay() if hedge else None
+                )
+            except Exception as e:
+                if is_unavailable(e):
+                    # Repeating will not help (e.g. a revoked key), but the fallback may still answer
+                    last_error = e
+                    self.breaker.record_failure()
+                    logger.warning(f"LLM unavailable: {e!r}")
+                    break
+                if not is_retryable(e):
+                    # The request itself was rejected (e.g. a bad request): says nothing about the model
+                    raise
+                last_error = e
+                self.breaker.record_failure()
+                delay = backoff_delay(attempt, config.llm.retry_base_delay, config.llm.retry_max_delay, e)
+                logger.warning(f"LLM call failed (attempt {attempt + 1}): {e!r}")
+                if attempt == config.llm.max_retries or loop.time() + delay >= deadline:
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self.latencies.record(time.perf_counter() - started)
+            return result
+
+        remaining = deadline - loop.time()
+        if self.fallback is not None and remaining > 0:
+            logger.warning(f"Using fallback model {self.fallback.model_name} (breaker: {self.breaker.state})")
+            self.stats["fallbacks"] += 1
+            try:
+                # The fallback answers with its own model, whichever route was chosen
+                fallback_kwargs = {**kwargs, "model": None}
+                return await asyncio.wait_for(getattr(self.fallback, method)(**fallback_kwargs), remaining)
+            except Exception as e:
+                last_error = e
+
+        self.stats["failures"] += 1
+        raise LLMUnavailableError(f"No LLM answer within {config.llm.deadline}s: {last_error!r}") from last_error
+
+    async def agenerate_response(
+        self,
+        context: str,
+        user_input: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        doc_ids: Optional[Sequence[str]] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Generate a response, retrying, hedging and falling back as configured.
+
+        Raises:
+            LLMUnavailableError: If no model answered before the deadline.
+        """
+        kwargs = {
+            "context": context,
+            "user_input": user_input,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "doc_ids": doc_ids,
+            "model": model
+        }
+        return await self._call("agenerate_response", kwargs, hedge=True)
+
+    async def astream_response(
+        self,
+        context: str,
+        user_input: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        doc_ids: Optional[Sequence[str]] = None,
+        model: Optional[str] = None
+    ) -> ResponseStream:
+        """Start a streamed response, retrying and falling back until the stream opens.
+
+        Streams are not hedged, and a failure after tokens have been sent is not retried.
+
+        Raises:
+            LLMUnavailableError: If no stream could be opened before the deadline.
+        """
+        kwargs = {
+            "context": context,
+            "user_input": user_input,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "doc_ids": doc_ids,
+            "model": model
+        }
+        return await self._call("astream_response", kwargs, hedge=False)
+
+    def get_config_summary(self) -> Dict[str, Any]:
+        """Configuration of the primary model plus resilience state."""
+        summary = dict(self.primary.get_config_summary())
+        summary.update({
+            "fallback_model_name": self.fallback.model_name if self.fallback is not None else None,
+            "circuit_breaker": self.breaker.state,
+            "p95_latency": self.latencies.percentile(0.95),
+            "resilience_stats": dict(self.stats)
+        })
+        return summary
+
+    def test_connection(self) -> bool:
+        return self.primary.test_connection()
+
+    async def check_reachable(self) -> bool:
+        return await self.primary.check_reachable()
+
+    async def aclose(self) -> None:
+        for manager in (self.primary, self.fallback):
+            if hasattr(manager, "aclose"):
+                await manager.aclose()
@@ -0,0 +1,111 @@
+"""
+Confidence-based model routing.
+
+Questions whose context is a strong retrieval match are answered by a faster,
+cheaper model with a smaller token cap. The answer is escalated to the primary
+model only when it would be flagged for low confidence. Per-route latency,
+token usage and the escalation rate are tracked for tuning the threshold.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+FAST_ROUTE = "fast"
+PRIMARY_ROUTE = "primary"
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Model and token cap chosen for a generation."""
+    name: str
+    model: str
+    max_tokens: int
+
+class RouteStats:
+    """Latency, token and escalation counters of one route."""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.escalations = 0
+        self.total_tokens = 0
+        self.latencies = deque(maxlen=window)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "escalations": self.escalations,
+            "escalation_rate": self.escalations / self.requests if self.requests else 0.0,
+            "total_tokens": self.total_tokens,
+            "avg_tokens": self.total_tokens / self.requests if self.requests else 0.0,
+            "p50_latency": ordered[len(ordered) // 2] if ordered else None,
+            "p95_latency": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else None
+        }
+
+class ModelRouter:
+    """Chooses between a fast model and the primary model from retrieval similarity."""
+
+    def __init__(
+        self,
+        primary_model: str,
+        primary_max_tokens: int,
+        fast_model: str,
+        fast_max_tokens: int,
+        min_similarity: float
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            primary_model (str): Model used for weaker matches and escalations.
+            primary_max_tokens (int): Token cap of the primary model.
+            fast_model (str): Faster, cheaper model for strong matches.
+            fast_max_tokens (int): Token cap of the fast model.
+            min_similarity (float): Top retrieval similarity needed for the fast route.
+        """
+        self.primary = RouteDecision(PRIMARY_ROUTE, primary_model, primary_max_tokens)
+        self.fast = RouteDecision(FAST_ROUTE, fast_model, fast_max_tokens)
+        self.min_similarity = min_similarity
+        self._stats = {FAST_ROUTE: RouteStats(), PRIMARY_ROUTE: RouteStats()}
+        self._lock = threading.Lock()
+
+    def select(self, top_similarity: Optional[float]) -> RouteDecision:
+        """
+        Pick the route for a question.
+
+        Args:
+            top_similarity (Optional[float]): Similarity of the best retrieved document.
+
+        Returns:
+            RouteDecision: The fast route for strong matches, otherwise the primary route.
+        """
+        if top_similarity is not None and top_similarity >= self.min_similarity:
+            return self.fast
+        return self.primary
+
+    def record(self, decision: RouteDecision, latency: float, usage: Dict[str, int], escalated: bool = False) -> None:
+        """
+        Record one generation on a route.
+
+        Args:
+            decision (RouteDecision): Route that generated the answer.
+            latency (float): Generation time in seconds.
+            usage (Dict[str, int]): Token usage of the generation.
+            escalated (bool): Whether the answer was flagged and regenerated on the primary route.
+        """
+        with self._lock:
+            stats = self._stats[decision.name]
+            stats.requests += 1
+            stats.escalations += int(escalated)
+            stats.total_tokens += usage.get("total_tokens", 0)
+            stats.latencies.append(latency)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "min_similarity": self.min_similarity,
+                "routes": {
+                    name: {"model": decision.model, "max_tokens": decision.max_tokens, **self._stats[name].to_dict()}
+                    for name, decision in ((FAST_ROUTE, self.fast), (PRIMARY_ROUTE, self.primary))
+                }
+            }
@@ -0,0 +1,158 @@
+"""
+Streaming LLM responses.
+"""
+import asyncio
+import threading
+from typing import Any, AsyncIterable, Callable, AsyncIterator, Dict, Iterable, Iterator, Optional
+
+from src.utils.tokens import estimate_tokens
+
+_END = object()
+
+def usage_to_dict(usage: Any) -> Dict[str, int]:
+    """
+    Convert an API usage object to the usage dictionary.
+
+    ``cached_tokens`` counts prompt tokens served from the provider's prefix cache
+    (``usage.prompt_tokens_details.cached_tokens``); it is 0 when not reported.
+
+    Args:
+        usage (Any): ``usage`` of a chat completion or its last stream chunk.
+
+    Returns:
+        Dict[str, int]: Prompt, completion, total and cached token counts.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens")
+    else:
+        cached_tokens = getattr(details, "cached_tokens", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_tokens": cached_tokens if isinstance(cached_tokens, int) else 0
+    }
+
+class ResponseStream:
+    """Text deltas of a streamed completion.
+
+    Iterate the stream (synchronously or with ``async for``) to receive the
+    answer as it is generated. Once it is exhausted, ``result`` holds the same
+    dictionary ``generate_response`` returns: content, model and usage. Usage is
+    taken from the API when it reports it and estimated otherwise.
+    """
+
+    def __init__(self, deltas: Iterable[str], model: str, prompt: str = ""):
+        """
+        Initialize the stream.
+
+        Args:
+            deltas (Iterable[str]): Text fragments in generation order.
+            model (str): Model name to report until the API reports its own.
+            prompt (str): Prompt text, used to estimate prompt tokens.
+        """
+        self._deltas = deltas
+        self._prompt = prompt
+        self.model = model
+        self.usage: Optional[Dict[str, int]] = None
+        # Usage of the original generation when the answer is replayed from the generation cache
+        self.saved_usage: Optional[Dict[str, int]] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self._async_deltas: Optional[AsyncIterator[str]] = None
+        # Called with ``result`` once the stream is exhausted
+        self.on_complete: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._parts = []
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Any], model: str, prompt: str = "") -> "ResponseStream":
+        """Wrap the chunks of an OpenAI chat completion created with ``stream=True``."""
+        stream = cls((), model, prompt)
+        stream._deltas = stream._read_chunks(chunks)
+        return stream
+
+    @classmethod
+    def from_async_chunks(cls, chunks: AsyncIterable[Any], model: str, prompt: str = "") -> "ResponseStream":
+        """Wrap the chunks of an async OpenAI chat completion created with ``stream=True``.
+
+        Such a stream can only be consumed with ``async for``.
+        """
+        stream = cls((), model, prompt)
+        stream._async_deltas = stream._read_async_chunks(chunks)
+        return stream
+
+    def _read_chunk(self, chunk: Any) -> Optional[str]:
+        """Record the model and usage of a completion chunk and return its text delta."""
+        self.model = chunk.model or self.model
+        if getattr(chunk, "usage", None):
+            self.usage = usage_to_dict(chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+        return None
+
+    def _read_chunks(self, chunks: Iterable[Any]) -> Iterator[str]:
+        for chunk in chunks:
+            delta = self._read_chunk(chunk)
+            if delta:
+                yield delta
+
+    async def _read_async_chunks(self, chunks: AsyncIterable[Any]) -> AsyncIterator[str]:
+        async for chunk in chunks:
+            delta = self._read_chunk(chunk)
+            if delta:
+                yield delta
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._deltas:
+            if delta:
+                self._parts.append(delta)
+                yield delta
+        self._finish()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        """Iterate natively for async sources, otherwise on a worker thread so the
+        event loop is never blocked between tokens."""
+        if self._async_deltas is not None:
+            async for delta in self._async_deltas:
+                self._parts.append(delta)
+                yield delta
+            self._finish()
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce() -> None:
+            try:
+                for delta in self:
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+                loop.call_soon_threadsafe(queue.put_nowait, _END)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _finish(self) -> None:
+        content = "".join(self._parts)
+        usage = self.usage
+        if usage is None:
+            prompt_tokens = estimate_tokens(self._prompt, self.model)
+            completion_tokens = estimate_tokens(content, self.model)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "cached_tokens": 0
+            }
+        self.result = {"content": content, "model": self.model, "usage": usage}
+        if self.saved_usage is not None:
+            self.result["saved_usage"] = self.saved_usage
+        if self.on_complete is not None:
+            self.on_complete(self.result)
@@ -0,0 +1,68 @@
+"""
+Test the generation-level answer cache.
+"""
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+from src.config import config
+from src.llm.generation_cache import GenerationCache, normalize_question
+from src.llm.llm_manager import LLMManager
+from src.llm.mock_server import MockServerSettings, create_app
+
+RESPONSE = {"content": "A Green Card is...", "model": "gpt-test", "usage": {"total_tokens": 42}}
+
+def test_key_ignores_paraphrase_noise_and_document_order():
+    assert normalize_question("  What is  a GREEN card？ ") == "what is a green card"
+    key = GenerationCache.make_key(["faq_2", "faq_1"], "What is a Green Card?", "gpt-test", 0.0, 500)
+    assert key == GenerationCache.make_key(["faq_1", "faq_2"], "what is a green card", "gpt-test", 0.0, 500)
+    assert key != GenerationCache.make_key(["faq_1"], "what is a green card", "gpt-test", 0.0, 500)
+    assert key != GenerationCache.make_key(["faq_1", "faq_2"], "what is a green card", "gpt-test", 0.2, 500)
+
+def test_lru_and_ttl_eviction():
+    now = [0.0]
+    cache = GenerationCache(max_entries=2, ttl=10.0, clock=lambda: now[0])
+    cache.put("a", ["faq_1"], RESPONSE)
+    cache.put("b", ["faq_2"], RESPONSE)
+    assert cache.get("a") == RESPONSE  # "a" is now the most recently used
+    cache.put("c", ["faq_3"], RESPONSE)
+    assert cache.get("b") is None
+    assert cache.stats["evictions"] == 1
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+def test_document_changes_invalidate_entries():
+    cache = GenerationCache()
+    cache.put("a", ["faq_1", "faq_2"], RESPONSE)
+    cache.put("b", ["faq_3"], RESPONSE)
+
+    # Chunk ids map back to the FAQ entry they belong to
+    cache.on_vector_db_change("add", ids=["faq_2#c1"], documents=[], metadatas=[])
+    assert cache.get("a") is None
+    assert cache.get("b") == RESPONSE
+
+    cache.on_vector_db_change("reset")
+    assert len(cache) == 0
+
+def test_llm_manager_reuses_low_temperature_answers(monkeypatch):
+    monkeypatch.setattr(config.llm, "api_key", "mock")
+    app = create_app(MockServerSettings(latency_ms=0, tokens_per_second=1e6, completion_tokens=10))
+    manager = LLMManager(model_name="mock-model")
+
+    async def run():
+        manager._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        manager._async_client = AsyncOpenAI(api_key="mock", base_url="http://mock/v1", http_client=manager._http_client)
+        manager._semaphore = asyncio.Semaphore(2)
+        first = await manager.agenerate_response("context", "What is a Green Card?", temperature=0.0, doc_ids=["faq_1"])
+        second = await manager.agenerate_response("context", "what is a green card", temperature=0.0, doc_ids=["faq_1"])
+        warm = await manager.agenerate_response("context", "What is a Green Card?", temperature=0.9, doc_ids=["faq_1"])
+        await manager.aclose()
+        return first, second, warm
+
+    first, second, warm = asyncio.run(run())
+    assert second["content"] == first["content"]
+    assert second["usage"]["total_tokens"] == 0
+    assert second["saved_usage"] == first["usage"]
+    assert warm["usage"]["total_tokens"] > 0
+    assert app.state.backend.stats["requests"] == 2
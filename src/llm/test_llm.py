@@ -1,10 +1,12 @@
 """
 Test the LLM manager functionality.
 """
+import asyncio
 import os
 import pytest
 from unittest.mock import MagicMock, patch
-from src.llm.llm_manager import LLMManager
+from src.config import config
+from src.llm.llm_manager import LLMManager, SYSTEM_PROMPT
 
 @pytest.fixture
 def mock_openai_response():
@@ -18,14 +20,16 @@ def mock_openai_response():
             self.usage = MagicMock(
                 prompt_tokens=10,
                 completion_tokens=20,
-                total_tokens=30
+                total_tokens=30,
+                prompt_tokens_details=MagicMock(cached_tokens=8)
             )
     return MockResponse()
 
 @pytest.fixture
 def llm_manager():
     """Create LLM manager with mocked API key."""
-    with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}):
+    # The config is read at import time, so the key is patched there as well
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"}), patch.object(config.llm, "api_key", "test-key"):
         return LLMManager()
 
 def test_prepare_prompt(llm_manager):
@@ -58,13 +62,35 @@ def test_generate_response(mock_openai, llm_manager, mock_openai_response):
     assert response["content"] == "Test response"
     assert response["model"] == "gpt-4"
     assert response["usage"]["total_tokens"] == 30
+    assert response["usage"]["cached_tokens"] == 8
     
     # Verify API call
     mock_client.chat.completions.create.assert_called_once()
     call_args = mock_client.chat.completions.create.call_args[1]
     assert call_args["model"] == "gpt-3.5-turbo"  # Should use the default model
-    assert len(call_args["messages"]) == 1
-    assert call_args["messages"][0]["role"] == "user"
+    # A fixed system message comes first so requests share a cacheable prefix
+    assert len(call_args["messages"]) == 2
+    assert call_args["messages"][0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert call_args["messages"][1]["role"] == "user"
+    assert call_args["messages"][1]["content"].endswith("Question: Test question")
+
+def test_system_prefix_is_request_independent(llm_manager):
+    """The system message must not change with the context or question."""
+    first = llm_manager._prepare_messages("Context A", "Question A")
+    second = llm_manager._prepare_messages("Context B", "Question B")
+    assert first[0] == second[0]
+    assert "Context A" not in first[0]["content"]
+
+def test_clients_leave_retries_to_resilience_layer(llm_manager):
+    """SDK retries would multiply every ResilientLLMManager attempt and hide failures from the breaker."""
+    assert llm_manager.client.max_retries == 0
+
+    async def async_client_retries():
+        retries = llm_manager.async_client.max_retries
+        await llm_manager.aclose()
+        return retries
+
+    assert asyncio.run(async_client_retries()) == 0
 
 def test_init_no_api_key():
     """Test initialization without API key."""
@@ -0,0 +1,81 @@
+"""
+Test the OpenAI-compatible mock server.
+"""
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+from src.config import config
+from src.llm.llm_manager import LLMManager
+from src.llm import mock_server
+from src.llm.mock_server import MockLLMBackend, MockServerSettings, create_app
+
+def make_client(**settings):
+    return TestClient(create_app(MockServerSettings(latency_ms=0, tokens_per_second=1e6, seed=7, **settings)))
+
+def test_chat_completion_shape():
+    response = make_client(completion_tokens=20).post("/v1/chat/completions", json={
+        "model": "gpt-test",
+        "messages": [{"role": "user", "content": "What is a Green Card?"}]
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["model"] == "gpt-test"
+    assert body["choices"][0]["message"]["content"]
+    assert body["usage"]["completion_tokens"] >= 20
+
+def test_injected_faults():
+    rate_limited = make_client(rate_limit_rate=1.0).post("/v1/chat/completions", json={"messages": []})
+    assert rate_limited.status_code == 429
+    assert rate_limited.headers["retry-after"] == "1.0"
+    assert make_client(error_rate=1.0).post("/v1/chat/completions", json={"messages": []}).status_code == 500
+
+def test_settings_update_is_validated():
+    client = make_client()
+    assert client.post("/mock/settings", json={"error_rate": 2}).status_code == 400
+    assert client.post("/mock/settings", json={"unknown": 1}).status_code == 400
+    assert client.post("/mock/settings", json={"error_rate": 0.5}).json()["settings"]["error_rate"] == 0.5
+
+def test_llm_manager_against_mock_server(monkeypatch):
+    monkeypatch.setattr(config.llm, "api_key", "mock")
+    monkeypatch.setattr(config.llm, "base_url", "http://mock/v1")
+    app = create_app(MockServerSettings(latency_ms=0, tokens_per_second=1e6, completion_tokens=15))
+    manager = LLMManager(model_name="mock-model")
+
+    async def run():
+        # Route the pooled client to the app in-process instead of over the network
+        manager._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        manager._async_client = AsyncOpenAI(api_key="mock", base_url="http://mock/v1", http_client=manager._http_client)
+        manager._semaphore = asyncio.Semaphore(2)
+        result = await manager.agenerate_response("context", "question")
+        stream = await manager.astream_response("context", "question")
+        deltas = [delta async for delta in stream]
+        await manager.aclose()
+        return result, deltas, stream.result
+
+    result, deltas, streamed = asyncio.run(run())
+    assert result["model"] == "mock-model"
+    assert result["usage"]["completion_tokens"] >= 15
+    assert len(deltas) > 1
+    assert streamed["content"] == result["content"]
+
+def test_repeated_long_system_prefix_reports_cached_tokens():
+    client = make_client()
+    messages = [{"role": "system", "content": "rule " * 1500}, {"role": "user", "content": "What is a Green Card?"}]
+    first = client.post("/v1/chat/completions", json={"messages": messages}).json()
+    second = client.post("/v1/chat/completions", json={"messages": messages}).json()
+    assert first["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+    assert second["usage"]["prompt_tokens_details"]["cached_tokens"] % 128 == 0
+    assert second["usage"]["prompt_tokens_details"]["cached_tokens"] >= 1024
+
+def test_prefix_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(mock_server, "PREFIX_CACHE_MAX_ENTRIES", 2)
+    backend = MockLLMBackend(MockServerSettings(seed=7))
+    prefixes = [[{"role": "system", "content": f"rule {index} " * 1500}] for index in range(3)]
+    for messages in prefixes:
+        assert backend.cached_tokens(messages) == 0
+    assert len(backend._seen_prefixes) == 2
+    # The oldest prefix was forgotten, the newest is still cached
+    assert backend.cached_tokens(prefixes[0]) == 0
+    assert backend.cached_tokens(prefixes[2]) >= 1024
+
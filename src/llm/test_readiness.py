@@ -0,0 +1,46 @@
+"""
+Test the background LLM readiness probe.
+"""
+import asyncio
+from src.llm.readiness import ReadinessProbe
+
+def test_probe_records_outcomes():
+    outcomes = iter([True, ConnectionError("refused")])
+
+    async def check():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    probe = ReadinessProbe(check)
+    assert probe.status["reachable"] is None
+    assert asyncio.run(probe.probe()) is True
+    assert asyncio.run(probe.probe()) is False
+    assert probe.status["last_error"] == "ConnectionError: refused"
+
+def test_probe_times_out():
+    async def hang():
+        await asyncio.sleep(10)
+
+    probe = ReadinessProbe(hang, timeout=0.01)
+    assert asyncio.run(probe.probe()) is False
+    assert probe.status["last_error"].startswith("TimeoutError")
+
+def test_probe_runs_in_background():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        return True
+
+    async def run():
+        probe = ReadinessProbe(check, interval=0.01)
+        probe.start()
+        await asyncio.sleep(0.05)
+        await probe.stop()
+        return probe
+
+    probe = asyncio.run(run())
+    assert probe.reachable is True
+    assert len(calls) >= 2
@@ -0,0 +1,133 @@
+"""
+Test retries, hedging and circuit breaking around LLM calls.
+"""
+import asyncio
+import httpx
+import openai
+import pytest
+from src.config import config
+from src.llm.resilience import (
+    CircuitBreaker, LLMUnavailableError, ResilientLLMManager, is_retryable
+)
+
+class FlakyLLMManager:
+    """LLM stand-in that fails a number of times before answering."""
+
+    def __init__(self, model_name="primary", failures=0, error=asyncio.TimeoutError, delay=0.0):
+        self.model_name = model_name
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def agenerate_response(self, context, user_input, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        await asyncio.sleep(self.delay)
+        return {"content": f"answer from {self.model_name}", "model": self.model_name, "usage": {}}
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(config.llm, "retry_base_delay", 0.001)
+    monkeypatch.setattr(config.llm, "max_retries", 2)
+    monkeypatch.setattr(config.llm, "deadline", 1.0)
+
+def test_is_retryable():
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bad request"))
+
+def test_retries_until_success():
+    primary = FlakyLLMManager(failures=2)
+    manager = ResilientLLMManager(primary)
+    result = asyncio.run(manager.agenerate_response("context", "question"))
+    assert result["model"] == "primary"
+    assert primary.calls == 3
+    assert manager.stats["retries"] == 2
+
+def test_non_retryable_error_is_raised():
+    manager = ResilientLLMManager(FlakyLLMManager(failures=1, error=ValueError))
+    with pytest.raises(ValueError):
+        asyncio.run(manager.agenerate_response("context", "question"))
+
+def authentication_error():
+    response = httpx.Response(401, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.AuthenticationError("Incorrect API key provided", response=response, body=None)
+
+def test_unavailable_primary_opens_breaker_and_falls_back():
+    primary = FlakyLLMManager(failures=10, error=authentication_error)
+    fallback = FlakyLLMManager(model_name="fallback")
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    manager = ResilientLLMManager(primary, fallback=fallback, breaker=breaker)
+    for _ in range(2):
+        result = asyncio.run(manager.agenerate_response("context", "question"))
+        assert result["model"] == "fallback"
+    # A 401 is not retried, and once the breaker opens the primary is skipped entirely
+    assert primary.calls == 2
+    assert breaker.state == "open"
+    result = asyncio.run(manager.agenerate_response("context", "question"))
+    assert result["model"] == "fallback"
+    assert primary.calls == 2
+
+def test_bad_request_leaves_breaker_untouched():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    manager = ResilientLLMManager(FlakyLLMManager(failures=1, error=ValueError), breaker=breaker)
+    with pytest.raises(ValueError):
+        asyncio.run(manager.agenerate_response("context", "question"))
+    assert breaker.failures == 1
+
+def test_fallback_after_retries_exhausted():
+    fallback = FlakyLLMManager(model_name="fallback")
+    manager = ResilientLLMManager(FlakyLLMManager(failures=10), fallback=fallback)
+    result = asyncio.run(manager.agenerate_response("context", "question"))
+    assert result["model"] == "fallback"
+    assert manager.stats["fallbacks"] == 1
+
+def test_unavailable_without_fallback():
+    manager = ResilientLLMManager(FlakyLLMManager(failures=10))
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(manager.agenerate_response("context", "question"))
+
+def test_deadline_bounds_slow_calls(monkeypatch):
+    monkeypatch.setattr(config.llm, "deadline", 0.05)
+    manager = ResilientLLMManager(FlakyLLMManager(delay=1.0))
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(manager.agenerate_response("context", "question"))
+
+def test_hedged_request_wins(monkeypatch):
+    monkeypatch.setattr(config.llm, "hedge_enabled", True)
+    monkeypatch.setattr(config.llm, "hedge_min_delay", 0.01)
+    primary = FlakyLLMManager(delay=0.0)
+    manager = ResilientLLMManager(primary)
+    for _ in range(20):
+        manager.latencies.record(0.01)
+
+    # The first request stalls; the hedge fired after the p95 delay answers first
+    delays = iter([0.5, 0.0])
+    original = primary.agenerate_response
+
+    async def uneven(context, user_input, **kwargs):
+        primary.delay = next(delays)
+        return await original(context, user_input, **kwargs)
+
+    primary.agenerate_response = uneven
+    result = asyncio.run(manager.agenerate_response("context", "question"))
+    assert result["model"] == "primary"
+    assert manager.stats["hedged"] == 1
+    assert manager.stats["hedge_wins"] == 1
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 11.0
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call while half-open
+    breaker.record_success()
+    assert breaker.state == "closed"
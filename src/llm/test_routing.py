@@ -0,0 +1,25 @@
+"""
+Test confidence-based model routing.
+"""
+from src.llm.routing import FAST_ROUTE, PRIMARY_ROUTE, ModelRouter
+
+def make_router():
+    return ModelRouter("gpt-large", 1000, "gpt-small", 400, min_similarity=0.75)
+
+def test_strong_matches_take_the_fast_route():
+    router = make_router()
+    assert router.select(0.9).name == FAST_ROUTE
+    assert router.select(0.9).max_tokens == 400
+    assert router.select(0.5).name == PRIMARY_ROUTE
+    assert router.select(None).model == "gpt-large"
+
+def test_route_stats():
+    router = make_router()
+    router.record(router.fast, 0.2, {"total_tokens": 100})
+    router.record(router.fast, 0.4, {"total_tokens": 300}, escalated=True)
+    router.record(router.primary, 1.0, {"total_tokens": 500})
+    routes = router.get_stats()["routes"]
+    assert routes["fast"]["requests"] == 2
+    assert routes["fast"]["escalation_rate"] == 0.5
+    assert routes["fast"]["avg_tokens"] == 200
+    assert routes["primary"]["p95_latency"] == 1.0
@@ -0,0 +1,42 @@
+"""
+Test streamed LLM responses.
+"""
+import asyncio
+from types import SimpleNamespace
+from src.llm.streaming import ResponseStream
+
+def make_chunk(content, model="gpt-test"):
+    return SimpleNamespace(model=model, usage=None,
+                           choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+def test_response_stream_collects_result():
+    stream = ResponseStream(iter(["Green ", "Card"]), "gpt-test", "prompt text")
+    assert list(stream) == ["Green ", "Card"]
+    assert stream.result["content"] == "Green Card"
+    assert stream.result["model"] == "gpt-test"
+    assert stream.result["usage"]["total_tokens"] > 0
+
+def test_response_stream_from_chunks_async():
+    chunks = [make_chunk(None), make_chunk("绿卡"), make_chunk("是什么")]
+    stream = ResponseStream.from_chunks(iter(chunks), "fallback-model")
+
+    async def consume():
+        return [delta async for delta in stream]
+
+    assert asyncio.run(consume()) == ["绿卡", "是什么"]
+    assert stream.result["content"] == "绿卡是什么"
+    assert stream.result["model"] == "gpt-test"
+
+def test_response_stream_from_async_chunks():
+    async def chunks():
+        for chunk in [make_chunk("H-1B "), make_chunk(None), make_chunk("visa")]:
+            yield chunk
+
+    stream = ResponseStream.from_async_chunks(chunks(), "fallback-model", "prompt text")
+
+    async def consume():
+        return [delta async for delta in stream]
+
+    assert asyncio.run(consume()) == ["H-1B ", "visa"]
+    assert stream.result["content"] == "H-1B visa"
+    assert stream.result["usage"]["prompt_tokens"] > 0
@@ -0,0 +1,176 @@
+"""
+In-memory BM25 inverted index over FAQ text, used alongside dense retrieval.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latin words keep inner hyphens and slashes so identifiers such as "I-485",
+# "EB-2" and "H-1B" stay single tokens. CJK runs are split into characters.
+_TOKEN_PATTERN = re.compile(
+    r"[a-z0-9]+(?:[-/][a-z0-9]+)*|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+"
+)
+_CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "if", "in", "is", "it", "my", "of", "on", "or", "the",
+    "to", "what", "when", "where", "which", "who", "why", "with", "you", "your",
+    "q"
+})
+
+def tokenize(text: str) -> List[str]:
+    """Split text into BM25 terms.
+
+    English text is lowercased and split into words, dropping common stopwords.
+    Hyphenated identifiers are kept whole and also indexed without the hyphen, so
+    "I-485" matches "i485". Chinese text has no word boundaries, so each CJK run
+    contributes its character unigrams and bigrams.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: Terms in document order.
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if _CJK_PATTERN.match(token):
+            tokens.extend(token)
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token not in _STOPWORDS:
+            tokens.append(token)
+            compact = re.sub(r"[-/]", "", token)
+            if compact != token:
+                tokens.append(compact)
+    return tokens
+
+class BM25Index:
+    """Incrementally updatable BM25 index.
+
+    Documents can be added, replaced and removed one at a time; corpus statistics
+    are maintained as running totals, so no update requires a rebuild.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Initialize an empty index.
+
+        Args:
+            k1 (float): Term frequency saturation parameter.
+            b (float): Document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_languages: Dict[str, Optional[str]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: str, text: str, language: Optional[str] = None) -> None:
+        """Add a document, replacing any previous version with the same ID."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            length = sum(terms.values())
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = length
+            self._doc_languages[doc_id] = language
+            self._total_length += length
+
+    def add_many(
+        self,
+        doc_ids: Sequence[str],
+        texts: Sequence[str],
+        languages: Optional[Sequence[Optional[str]]] = None
+    ) -> None:
+        """Add several documents."""
+        languages = languages or [None] * len(doc_ids)
+        for doc_id, text, language in zip(doc_ids, texts, languages):
+            self.add(doc_id, text, language)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document if it is indexed."""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        self._doc_languages.pop(doc_id, None)
+
+    def clear(self) -> None:
+        """Remove every document."""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._doc_languages.clear()
+            self._total_length = 0
+
+    def search(self, query: str, top_k: int = 10, language: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Score documents against a query.
+
+        Args:
+            query (str): Query text.
+            top_k (int): Number of results to return.
+            language (Optional[str]): Only return documents indexed with this language.
+
+        Returns:
+            List[Tuple[str, float]]: (doc_id, score) pairs, best first.
+        """
+        query_terms = set(tokenize(query))
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count or not query_terms:
+                return []
+            avg_length = self._total_length / doc_count
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if language is not None and self._doc_languages.get(doc_id) != language:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several rankings of document IDs with reciprocal rank fusion.
+
+    Args:
+        rankings (Sequence[Sequence[str]]): Document IDs per ranking, best first.
+        k (int): Rank offset; larger values flatten the contribution of top ranks.
+
+    Returns:
+        List[Tuple[str, float]]: (doc_id, fused score) pairs, best first.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
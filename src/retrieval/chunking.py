@@ -0,0 +1,160 @@
+"""
+Sentence-aware chunking of FAQ answers for indexing.
+
+Long answers are split into overlapping passages that fit the embedding
+model's window. Each chunk is stored as its own document, carrying the FAQ
+question and links back to its parent FAQ, so retrieval can match the relevant
+part of an answer and group chunks of the same FAQ afterwards.
+"""
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.utils.tokens import estimate_tokens
+
+# Sentence ends: Latin punctuation followed by whitespace, or CJK punctuation
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|(?<=[。！？；])")
+
+# E5 models truncate at 512 tokens; leave headroom for differences between tokenizers
+DEFAULT_CHUNK_MAX_TOKENS = 384
+DEFAULT_CHUNK_OVERLAP_TOKENS = 48
+
+def chunk_id(parent_id: str, index: int) -> str:
+    """ID of the ``index``-th chunk of a parent document."""
+    return f"{parent_id}#c{index}"
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping their terminal punctuation."""
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def _split_long_sentence(sentence: str, max_tokens: int, token_fn: Callable[[str], int]) -> List[str]:
+    """Hard-split a sentence that alone exceeds the chunk size, by words or characters."""
+    units = sentence.split() if " " in sentence else list(sentence)
+    joiner = " " if " " in sentence else ""
+    pieces, current = [], []
+    for unit in units:
+        if current and token_fn(joiner.join(current + [unit])) > max_tokens:
+            pieces.append(joiner.join(current))
+            current = []
+        current.append(unit)
+    if current:
+        pieces.append(joiner.join(current))
+    return pieces
+
+def chunk_text(
+    text: str,
+    max_tokens: int = DEFAULT_CHUNK_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP_TOKENS,
+    token_fn: Callable[[str], int] = estimate_tokens
+) -> List[str]:
+    """Split text into overlapping chunks of whole sentences.
+
+    Args:
+        text (str): Text to split.
+        max_tokens (int): Maximum tokens per chunk.
+        overlap_tokens (int): Trailing sentences of a chunk, up to this many tokens,
+            are repeated at the start of the next one.
+        token_fn (Callable[[str], int]): Token counter.
+
+    Returns:
+        List[str]: Chunks in text order; a text that fits is returned whole.
+    """
+    text = text.strip()
+    if not text or token_fn(text) <= max_tokens:
+        return [text] if text else []
+
+    sentences: List[str] = []
+    for sentence in split_sentences(text):
+        if token_fn(sentence) > max_tokens:
+            sentences.extend(_split_long_sentence(sentence, max_tokens, token_fn))
+        else:
+            sentences.append(sentence)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for sentence in sentences:
+        if current and token_fn(" ".join(current + [sentence])) > max_tokens:
+            chunks.append(" ".join(current))
+            # Carry trailing sentences over as overlap, as long as the new sentence still fits
+            overlap: List[str] = []
+            for previous in reversed(current):
+                candidate = [previous] + overlap
+                if (token_fn(" ".join(candidate)) > overlap_tokens
+                        or token_fn(" ".join(candidate + [sentence])) > max_tokens):
+                    break
+                overlap = candidate
+            current = overlap
+        current.append(sentence)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def chunk_faq(
+    doc_id: str,
+    question: str,
+    answer: str,
+    metadata: Dict[str, Any],
+    max_tokens: int = DEFAULT_CHUNK_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP_TOKENS
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Build the documents and metadata to index for one FAQ.
+
+    Every chunk repeats the question, so it is embedded in context. An answer that
+    fits in one chunk keeps ``doc_id``; longer answers get ``{doc_id}#c{i}`` IDs.
+
+    Args:
+        doc_id (str): ID of the FAQ document.
+        question (str): FAQ question.
+        answer (str): FAQ answer.
+        metadata (Dict[str, Any]): Metadata shared by every chunk.
+        max_tokens (int): Maximum tokens per chunk, including the question.
+        overlap_tokens (int): Overlap between consecutive chunks.
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: (document text, metadata) per chunk. The
+        metadata holds the chunk's ``id`` and its part of the answer, plus
+        ``parent_id``, ``chunk_index`` and ``chunk_count``.
+    """
+    question_tokens = estimate_tokens(f"Q: {question}\nA: ")
+    answer_chunks = chunk_text(answer, max(max_tokens - question_tokens, overlap_tokens + 1), overlap_tokens) or [""]
+    records = []
+    for index, answer_chunk in enumerate(answer_chunks):
+        chunk_metadata = dict(metadata)
+        chunk_metadata.update({
+            'id': doc_id if len(answer_chunks) == 1 else chunk_id(doc_id, index),
+            'question': question,
+            'answer': answer_chunk,
+            'parent_id': doc_id,
+            'chunk_index': index,
+            'chunk_count': len(answer_chunks)
+        })
+        records.append((f"Q: {question}\nA: {answer_chunk}", chunk_metadata))
+    return records
+
+def merge_chunk_texts(chunks: List[Tuple[int, str]]) -> str:
+    """Join retrieved chunks of one answer, removing the overlap between neighbours.
+
+    Args:
+        chunks (List[Tuple[int, str]]): (chunk_index, text) pairs in any order.
+
+    Returns:
+        str: The chunks in answer order; gaps between non-adjacent chunks are marked with "...".
+    """
+    merged = ""
+    previous_index = None
+    for index, text in sorted(chunks):
+        if previous_index is None:
+            merged = text
+        elif index == previous_index + 1:
+            # Skip the leading sentences this chunk repeats from the end of the previous one
+            tail = split_sentences(merged)
+            sentences = split_sentences(text)
+            overlap = next(
+                (size for size in range(min(len(tail), len(sentences)), 0, -1)
+                 if tail[-size:] == sentences[:size]),
+                0
+            )
+            merged = " ".join([merged] + sentences[overlap:])
+        else:
+            merged = f"{merged} ... {text}"
+        previous_index = index
+    return merged.strip()
@@ -0,0 +1,111 @@
+"""
+Token-budgeted assembly of the LLM context from retrieved passages.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from src.retrieval.bm25_index import tokenize
+from src.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_SEPARATOR = "\n\n"
+# Token-set overlap at or above which two passages are treated as the same text
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# Truncated passages must keep at least this many tokens to be worth including
+MIN_TRUNCATED_TOKENS = 32
+
+@dataclass
+class ContextBuildResult:
+    """Context string plus accounting for what was packed into it."""
+    context: str
+    included_ids: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    tokens_saved: int = 0
+    dropped_duplicates: int = 0
+    dropped_over_budget: int = 0
+
+def format_passage(metadata: dict) -> str:
+    """Render one retrieved FAQ as a context passage."""
+    return f"Q: {metadata.get('question', '')}\nA: {metadata.get('answer', '')}"
+
+def _truncate(text: str, tokens: int, budget: int, model_name: Optional[str] = None) -> Tuple[str, int]:
+    """Cut a passage down until it fits ``budget`` tokens, returning it with its token count.
+
+    Token density varies along the text, so the proportional cut is re-measured
+    and repeated until the passage fits.
+    """
+    length = len(text)
+    while True:
+        length = max(1, min(length - 1, int(length * budget / tokens)))
+        passage = text[:length].rstrip() + "..."
+        tokens = estimate_tokens(passage, model_name)
+        if tokens <= budget or length == 1:
+            return passage, tokens
+
+def _is_near_duplicate(terms: frozenset, seen: List[frozenset]) -> bool:
+    for other in seen:
+        union = len(terms | other)
+        if union and len(terms & other) / union >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+def build_context(
+    results: Sequence[Any],
+    token_budget: int,
+    model_name: Optional[str] = None,
+    format_fn: Callable[[dict], str] = format_passage
+) -> ContextBuildResult:
+    """Greedily pack the best passages into a token budget.
+
+    Results are taken best first. A passage is skipped when it is a translation
+    of one already included (same ``base_id``) or its text nearly duplicates one;
+    otherwise it is included if it still fits. When not even the best passage
+    fits, it is truncated so the context is never empty.
+
+    Args:
+        results (Sequence[Any]): Search results, best first, exposing ``id`` and ``metadata``.
+        token_budget (int): Maximum tokens for the assembled context.
+        model_name (Optional[str]): Model whose tokenizer should be used.
+        format_fn (Callable[[dict], str]): Renders a result's metadata as a passage.
+
+    Returns:
+        ContextBuildResult: The context and its token accounting.
+    """
+    result = ContextBuildResult(context="")
+    separator_tokens = estimate_tokens(PASSAGE_SEPARATOR, model_name)
+    parts: List[str] = []
+    seen_base_ids = set()
+    seen_terms: List[frozenset] = []
+    unbudgeted_tokens = 0
+
+    for item in results:
+        metadata = item.metadata or {}
+        passage = format_fn(metadata)
+        tokens = estimate_tokens(passage, model_name)
+        unbudgeted_tokens += tokens + (separator_tokens if unbudgeted_tokens else 0)
+
+        base_id = metadata.get('base_id')
+        terms = frozenset(tokenize(passage))
+        if (base_id and base_id in seen_base_ids) or _is_near_duplicate(terms, seen_terms):
+            result.dropped_duplicates += 1
+            continue
+
+        cost = tokens + (separator_tokens if parts else 0)
+        if result.tokens_used + cost > token_budget:
+            if parts or token_budget < MIN_TRUNCATED_TOKENS:
+                result.dropped_over_budget += 1
+                continue
+            passage, cost = _truncate(passage, tokens, token_budget, model_name)
+
+        parts.append(passage)
+        result.included_ids.append(item.id)
+        result.tokens_used += cost
+        if base_id:
+            seen_base_ids.add(base_id)
+        seen_terms.append(terms)
+
+    result.context = PASSAGE_SEPARATOR.join(parts)
+    result.tokens_saved = max(0, unbudgeted_tokens - result.tokens_used)
+    return result
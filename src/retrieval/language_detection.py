@@ -0,0 +1,75 @@
+"""
+Language detection for user queries.
+
+Only English and Chinese are supported, so most inputs can be decided from the
+Unicode script of their characters alone. langdetect is consulted only for
+mixed text where the script counts are not decisive.
+"""
+import re
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from langdetect import DetectorFactory, detect
+
+# langdetect is non-deterministic unless seeded
+DetectorFactory.seed = 0
+
+logger = logging.getLogger(__name__)
+
+_CJK_IDEOGRAPH = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+_LATIN_WORD = re.compile(r"[A-Za-z]+")
+# Kana and Hangul mean the text is neither English nor Chinese
+_OTHER_CJK_SCRIPT = re.compile(r"[\u3040-\u30ff\uac00-\ud7af]")
+
+# Share of CJK ideographs, counted against Latin words, at or above which text is Chinese
+ZH_RATIO_THRESHOLD = 0.6
+DETECTION_CACHE_SIZE = 4096
+
+def normalize_language(lang: str) -> str:
+    """Normalize language codes to match those in the database ('en', 'zh')."""
+    lang = lang.lower()
+    if lang.startswith('zh'):
+        return 'zh'
+    if lang.startswith('en'):
+        return 'en'
+    # Default to English if not recognized
+    return 'en'
+
+def detect_by_script(text: str) -> Optional[str]:
+    """Decide the language from character scripts alone.
+
+    Each CJK ideograph is counted against each Latin word, since one Chinese
+    character carries roughly as much meaning as one English word.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        Optional[str]: 'en' or 'zh' when the script mix is decisive, None otherwise.
+    """
+    if _OTHER_CJK_SCRIPT.search(text):
+        return None
+    ideographs = len(_CJK_IDEOGRAPH.findall(text))
+    if ideographs == 0:
+        return 'en' if _LATIN_WORD.search(text) else None
+    latin_words = len(_LATIN_WORD.findall(text))
+    if ideographs / (ideographs + latin_words) >= ZH_RATIO_THRESHOLD:
+        return 'zh'
+    return None
+
+@lru_cache(maxsize=DETECTION_CACHE_SIZE)
+def detect_language(text: str) -> Tuple[str, str]:
+    """Detect the language of a text, using the script fast path when possible.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        Tuple[str, str]: The normalized language code and the method that decided it
+        ("script" or "langdetect").
+    """
+    language = detect_by_script(text)
+    if language is not None:
+        return language, "script"
+    return normalize_language(detect(text)), "langdetect"
@@ -0,0 +1,173 @@
+"""
+Cross-encoder reranking of retrieval candidates on CPU.
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+
+from src.retrieval.context_builder import format_passage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+class CrossEncoderReranker:
+    """Reorders dense candidates by cross-encoder relevance.
+
+    The model is loaded on first use. With ``use_onnx`` it is run through
+    ONNX Runtime via optimum when that is installed, otherwise through
+    sentence-transformers on torch. Candidates are scored in batches in dense
+    order until the latency budget runs out; unscored candidates keep their
+    dense order behind the scored ones.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        batch_size: int = 8,
+        latency_budget_ms: float = 150.0,
+        margin: float = 0.1,
+        max_length: int = 256,
+        use_onnx: bool = True
+    ):
+        """
+        Initialize the reranker.
+
+        Args:
+            model_name (str): Hugging Face cross-encoder model.
+            batch_size (int): Query/passage pairs scored per forward pass.
+            latency_budget_ms (float): Scoring stops after this much time has been spent.
+            margin (float): Dense similarity gap at the top-k boundary above which
+                reranking is skipped.
+            max_length (int): Maximum tokens per query/passage pair.
+            use_onnx (bool): Prefer ONNX Runtime when optimum is installed.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.margin = margin
+        self.max_length = max_length
+        self.use_onnx = use_onnx
+        self.backend: Optional[str] = None
+        self._score_fn: Optional[Callable[[List[List[str]]], np.ndarray]] = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+
+    def _load(self) -> bool:
+        """Load the model once; returns False if no backend is available."""
+        if self._score_fn is not None or self._load_failed:
+            return self._score_fn is not None
+        with self._load_lock:
+            if self._score_fn is not None or self._load_failed:
+                return self._score_fn is not None
+            start = time.perf_counter()
+            if self.use_onnx:
+                self._score_fn = self._load_onnx()
+            if self._score_fn is None:
+                self._score_fn = self._load_torch()
+            if self._score_fn is None:
+                self._load_failed = True
+                logger.warning("No cross-encoder backend available, reranking disabled")
+                return False
+            logger.info(f"Loaded reranker {self.model_name} ({self.backend}) in "
+                        f"{(time.perf_counter() - start) * 1000:.0f}ms")
+            return True
+
+    def _load_onnx(self) -> Optional[Callable[[List[List[str]]], np.ndarray]]:
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            from transformers import AutoTokenizer
+        except ImportError:
+            return None
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+        except Exception as e:
+            logger.warning(f"Failed to load ONNX reranker, falling back to torch: {e}")
+            return None
+
+        def score(pairs: List[List[str]]) -> np.ndarray:
+            features = tokenizer(
+                [query for query, _ in pairs],
+                [passage for _, passage in pairs],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            logits = model(**features).logits
+            return np.asarray(logits, dtype=np.float32)[:, 0]
+
+        self.backend = "onnx"
+        return score
+
+    def _load_torch(self) -> Optional[Callable[[List[List[str]]], np.ndarray]]:
+        try:
+            from sentence_transformers import CrossEncoder
+            model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        except Exception as e:
+            logger.warning(f"Failed to load cross-encoder {self.model_name}: {e}")
+            return None
+
+        def score(pairs: List[List[str]]) -> np.ndarray:
+            return np.asarray(model.predict(pairs, batch_size=self.batch_size), dtype=np.float32)
+
+        self.backend = "torch"
+        return score
+
+    def is_decisive(self, candidates: Sequence[Any], top_k: int) -> bool:
+        """Whether the dense scores already separate the top ``top_k`` from the rest."""
+        if len(candidates) <= top_k:
+            return True
+        boundary = min(candidate.similarity for candidate in candidates[:top_k])
+        runner_up = max(candidate.similarity for candidate in candidates[top_k:])
+        return boundary - runner_up >= self.margin
+
+    def rerank(
+        self,
+        query: str,
+        candidates: Sequence[Any],
+        top_k: int,
+        format_fn: Callable[[dict], str] = format_passage
+    ) -> List[Any]:
+        """Return the ``top_k`` most relevant candidates.
+
+        Args:
+            query (str): User query text.
+            candidates (Sequence[Any]): Search results, best first, exposing ``similarity``
+                and ``metadata``.
+            top_k (int): Number of results to return.
+            format_fn (Callable[[dict], str]): Renders a candidate's metadata as passage text.
+
+        Returns:
+            List[Any]: Reordered candidates, truncated to ``top_k``.
+        """
+        candidates = list(candidates)
+        if self.is_decisive(candidates, top_k):
+            logger.info("Dense ranking is decisive, skipping rerank")
+            return candidates[:top_k]
+        if not self._load():
+            return candidates[:top_k]
+
+        start = time.perf_counter()
+        scores: List[float] = []
+        for offset in range(0, len(candidates), self.batch_size):
+            batch = candidates[offset:offset + self.batch_size]
+            pairs = [[query, format_fn(candidate.metadata or {})] for candidate in batch]
+            try:
+                scores.extend(float(score) for score in self._score_fn(pairs))
+            except Exception as e:
+                logger.error(f"Reranking failed, keeping dense order: {e}")
+                return candidates[:top_k]
+            if (time.perf_counter() - start) * 1000 >= self.latency_budget_ms:
+                break
+
+        scored = len(scores)
+        order = sorted(range(scored), key=lambda i: scores[i], reverse=True)
+        reranked = [candidates[i] for i in order] + candidates[scored:]
+        logger.info(f"Reranked {scored}/{len(candidates)} candidates in "
+                    f"{(time.perf_counter() - start) * 1000:.1f}ms")
+        return reranked[:top_k]
@@ -1,13 +1,20 @@
 """
 Retrieval manager for handling user queries and finding relevant documents.
 """
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from langdetect import detect
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, Sequence
 import numpy as np
 
+from src.config import config
 from src.embeddings.embedding_utils import EmbeddingManager
-from src.vector_db.vector_db_manager import VectorDBManager
+from src.vector_db.vector_db_manager import VectorDBManager, SearchResult, SEARCH_INCLUDE_FIELDS
+from src.retrieval.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.retrieval.context_builder import ContextBuildResult, build_context
+from src.retrieval.reranker import CrossEncoderReranker
+from src.retrieval.chunking import merge_chunk_texts
+from src.retrieval import language_detection
 
 # Configure logging
 logging.basicConfig(
@@ -25,19 +32,56 @@ class RetrievalManager:
             logger.info("Initializing RetrievalManager")
             self.embedding_manager = EmbeddingManager()
             self.vector_db_manager = VectorDBManager()
+            
+            # Keyword index for hybrid search, kept in sync with the vector database
+            self.keyword_index = None
+            if config.retrieval.hybrid_enabled:
+                self.keyword_index = BM25Index(k1=config.retrieval.bm25_k1, b=config.retrieval.bm25_b)
+                self._load_keyword_index()
+                self.vector_db_manager.subscribe(self._on_vector_db_change)
+            
+            # Optional cross-encoder rerank stage; the model loads on first use
+            self.reranker = None
+            if config.retrieval.rerank_enabled:
+                self.reranker = CrossEncoderReranker(
+                    model_name=config.retrieval.rerank_model,
+                    batch_size=config.retrieval.rerank_batch_size,
+                    latency_budget_ms=config.retrieval.rerank_latency_budget_ms,
+                    margin=config.retrieval.rerank_margin,
+                    use_onnx=config.retrieval.rerank_use_onnx
+                )
         except Exception as e:
             logger.exception(f"Failed to initialize RetrievalManager: {str(e)}")
             raise
     
+    def _load_keyword_index(self) -> None:
+        """(Re)build the keyword index from the documents in the vector database."""
+        records = self.vector_db_manager.export_records(include_embeddings=False)
+        self.keyword_index.clear()
+        self.keyword_index.add_many(
+            records["ids"],
+            records["documents"],
+            [metadata.get("language") for metadata in records["metadatas"]]
+        )
+        logger.info(f"Built keyword index over {len(self.keyword_index)} documents")
+    
+    def _on_vector_db_change(self, event: str, **payload: Any) -> None:
+        """Apply vector database changes to the keyword index incrementally."""
+        if event == "add":
+            self.keyword_index.add_many(
+                payload["ids"],
+                payload["documents"],
+                [(metadata or {}).get("language") for metadata in payload["metadatas"]]
+            )
+        elif event == "delete":
+            for doc_id in payload["ids"]:
+                self.keyword_index.remove(doc_id)
+        else:
+            self._load_keyword_index()
+    
     def normalize_language(self, lang: str) -> str:
         """Normalize language codes to match those in the database ('en', 'zh')."""
-        lang = lang.lower()
-        if lang.startswith('zh'):
-            return 'zh'
-        if lang.startswith('en'):
-            return 'en'
-        # Default to English if not recognized
-        return 'en'
+        return language_detection.normalize_language(lang)
 
     def detect_language(self, text: str) -> str:
         """Detect the language of the input text.
@@ -52,9 +96,8 @@ class RetrievalManager:
             if not text.strip():
                 raise ValueError("Input text cannot be empty")
             
-            lang = detect(text)
-            norm_lang = self.normalize_language(lang)
-            logger.info(f"Detected language: {lang} (normalized: {norm_lang})")
+            norm_lang, method = language_detection.detect_language(text.strip())
+            logger.info(f"Detected language: {norm_lang} (via {method})")
             return norm_lang
             
         except Exception as e:
@@ -65,61 +108,423 @@ class RetrievalManager:
         self,
         query: str,
         language: Optional[str] = None,
-        top_k: int = 3
-    ) -> List[Dict[str, Any]]:
+        top_k: int = 3,
+        include: Optional[Sequence[str]] = ("metadatas",)
+    ) -> List[SearchResult]:
         """Process a user query and return relevant documents.
         
         Args:
             query (str): User query text.
             language (Optional[str]): Optional language code. If not provided, will be detected.
             top_k (int): Number of results to return.
+            include (Optional[Sequence[str]]): Fields to project into the results. Defaults to
+                metadata only, which already carries the question and answer text.
             
         Returns:
-            List[Dict[str, Any]]: List of relevant documents with metadata.
+            List[SearchResult]: List of relevant documents with metadata.
         """
         try:
-            if not query.strip():
-                raise ValueError("Query cannot be empty")
+            language = self._resolve_language(query, language)
+            logger.info(f"Processing query in {language}: {query}")
+            query_embedding = self.embed_query(query)
+            return self.search(query, query_embedding, language, top_k, include)
             
-            # Detect language if not provided
-            if language is None:
-                language = self.detect_language(query)
-            else:
-                language = self.normalize_language(language)
+        except Exception as e:
+            logger.exception(f"Failed to process query: {str(e)}")
+            raise
+    
+    async def aprocess_query(
+        self,
+        query: str,
+        language: Optional[str] = None,
+        top_k: int = 3,
+        include: Optional[Sequence[str]] = ("metadatas",),
+        executor: Optional[Executor] = None
+    ) -> List[SearchResult]:
+        """Asynchronous version of ``process_query``.
+        
+        Query encoding and the cross-encoder rerank are CPU-bound and run on
+        ``executor``, which bounds their concurrency; the vector database search is
+        blocking I/O and runs on the default thread pool. The event loop stays free
+        for other requests in the meantime.
+        
+        Args:
+            query (str): User query text.
+            language (Optional[str]): Optional language code. If not provided, will be detected.
+            top_k (int): Number of results to return.
+            include (Optional[Sequence[str]]): Fields to project into the results.
+            executor (Optional[Executor]): Executor for CPU-bound stages. If None, uses the loop default.
             
+        Returns:
+            List[SearchResult]: List of relevant documents with metadata.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            language = self._resolve_language(query, language)
             logger.info(f"Processing query in {language}: {query}")
+            query_embedding = await loop.run_in_executor(executor, self.embed_query, query)
+            candidates, include = await asyncio.to_thread(
+                self._search_candidates, query, query_embedding, language, top_k, include
+            )
+            if self.reranker is not None:
+                return await loop.run_in_executor(executor, self._rank_candidates, query, candidates, top_k, include)
+            return self._rank_candidates(query, candidates, top_k, include)
             
-            # Generate embedding for the query in the same format as stored documents
-            formatted_query = f"Q: {query}\nA:"
-            query_embedding = self.embedding_manager.get_embedding(formatted_query)
+        except Exception as e:
+            logger.exception(f"Failed to process query: {str(e)}")
+            raise
+    
+    def process_queries(
+        self,
+        queries: Sequence[str],
+        languages: Optional[Sequence[Optional[str]]] = None,
+        top_k: int = 3,
+        include: Optional[Sequence[str]] = ("metadatas",),
+        batch_size: int = 32
+    ) -> List[List[SearchResult]]:
+        """Batched version of ``process_query`` for offline workloads.
+        
+        All queries are encoded in batched forward passes, which is much cheaper
+        than encoding them one at a time; the searches then run per query.
+        
+        Args:
+            queries (Sequence[str]): User query texts.
+            languages (Optional[Sequence[Optional[str]]]): Language code per query; None entries are detected.
+            top_k (int): Number of results per query.
+            include (Optional[Sequence[str]]): Fields to project into the results.
+            batch_size (int): Encoder batch size.
+            
+        Returns:
+            List[List[SearchResult]]: Results for each query, in input order.
+        """
+        try:
+            languages = languages or [None] * len(queries)
+            resolved = [self._resolve_language(query, language) for query, language in zip(queries, languages)]
+            embeddings = self.embedding_manager.get_embeddings(
+                [f"Q: {query}\nA:" for query in queries], batch_size=batch_size
+            )
+            logger.info(f"Encoded {len(queries)} queries in batches of {batch_size}")
+            return [
+                self.search(query, embedding, language, top_k, include)
+                for query, embedding, language in zip(queries, embeddings, resolved)
+            ]
+            
+        except Exception as e:
+            logger.exception(f"Failed to process queries: {str(e)}")
+            raise
+    
+    def _resolve_language(self, query: str, language: Optional[str]) -> str:
+        """Validate the query and detect or normalize its language."""
+        if not query.strip():
+            raise ValueError("Query cannot be empty")
+        
+        # Detect language if not provided
+        if language is None or language == "auto":
+            return self.detect_language(query)
+        return self.normalize_language(language)
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query in the same format as the stored documents."""
+        formatted_query = f"Q: {query}\nA:"
+        return self.embedding_manager.get_embedding(formatted_query)
+    
+    def search(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        language: Optional[str],
+        top_k: int = 3,
+        include: Optional[Sequence[str]] = ("metadatas",)
+    ) -> List[SearchResult]:
+        """Retrieve documents for an already embedded query.
+        
+        Args:
+            query (str): User query text, used for keyword matching.
+            query_embedding (np.ndarray): Embedding from ``embed_query``.
+            language (Optional[str]): Normalized language code.
+            top_k (int): Number of results to return.
+            include (Optional[Sequence[str]]): Fields to project into the results.
             
-            # Search vector database
+        Returns:
+            List[SearchResult]: List of relevant documents with metadata.
+        """
+        candidates, include = self._search_candidates(query, query_embedding, language, top_k, include)
+        return self._rank_candidates(query, candidates, top_k, include)
+    
+    def _search_candidates(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        language: Optional[str],
+        top_k: int,
+        include: Optional[Sequence[str]]
+    ) -> tuple:
+        """Run the I/O-bound part of ``search``: dense, cross-lingual and keyword candidates.
+        
+        Returns:
+            tuple: The candidates and the projection they were fetched with.
+        """
+        # The reranker needs question/answer text and a wider candidate pool;
+        # cross-lingual merging needs each result's language and base_id
+        rerank = self.reranker is not None
+        cross_lingual = config.retrieval.cross_lingual_enabled and language is not None
+        if (rerank or cross_lingual) and include is not None and "metadatas" not in include:
+            include = tuple(include) + ("metadatas",)
+        n_results = max(top_k, config.retrieval.rerank_candidates) if rerank else top_k
+        
+        hybrid = self.keyword_index is not None and len(self.keyword_index) > 0
+        n_candidates = n_results * config.retrieval.candidate_multiplier if hybrid else n_results
+        if cross_lingual:
+            results = self._search_cross_lingual(query_embedding, language, n_candidates, include)
+        else:
+            # Search vector database; the language routes to its own partition
             results = self.vector_db_manager.search_similar(
                 query_embedding=query_embedding,
-                n_results=top_k,
-                where={"language": language} if language else None
+                n_results=n_candidates,
+                language=language,
+                include=include
             )
+        
+        if hybrid:
+            results = self._fuse_keyword_results(
+                query, query_embedding, results, None if cross_lingual else language,
+                n_results, n_candidates, include,
+                cross_lingual_language=language if cross_lingual else None
+            )
+        return results, include
+    
+    def _rank_candidates(
+        self,
+        query: str,
+        results: List[SearchResult],
+        top_k: int,
+        include: Optional[Sequence[str]]
+    ) -> List[SearchResult]:
+        """Run the final part of ``search``: the CPU-bound rerank and grouping of chunks."""
+        if self.reranker is not None:
+            results = self.reranker.rerank(query, results, top_k)
+        
+        # Grouping reads chunk metadata, so skip it for lean projections
+        if include is None or "metadatas" in include:
+            results = self.group_by_parent(results)
+        
+        logger.info(f"Found {len(results)} relevant documents")
+        return results
+    
+    def _search_cross_lingual(
+        self,
+        query_embedding: np.ndarray,
+        language: str,
+        n_results: int,
+        include: Optional[Sequence[str]]
+    ) -> List[SearchResult]:
+        """Search every language with one embedding and merge the calibrated rankings.
+        
+        Similarities across languages run lower than within one, so results in other
+        languages are shifted down by the configured penalty before merging; a
+        translation therefore only outranks a same-language FAQ when it is clearly
+        closer. FAQs present in several languages keep only their best version.
+        
+        Args:
+            query_embedding (np.ndarray): Embedding from ``embed_query``.
+            language (str): Language of the query.
+            n_results (int): Number of results to return.
+            include (Optional[Sequence[str]]): Fields to project into the results.
             
-            logger.info(f"Found {len(results)} relevant documents")
-            return results
+        Returns:
+            List[SearchResult]: Merged results with calibrated similarities, best first.
+        """
+        languages = list(dict.fromkeys([language, *config.database.languages]))
+        results_by_language = self.vector_db_manager.search_multilingual(
+            query_embedding, languages, n_results=n_results, include=include
+        )
+        
+        merged = []
+        for result_language, results in results_by_language.items():
+            penalty = 0.0 if result_language == language else config.retrieval.cross_lingual_penalty
+            for result in results:
+                result.similarity -= penalty
+                merged.append(result)
+        merged.sort(key=lambda result: result.similarity, reverse=True)
+        deduped = self._dedupe_translations(merged)
+        
+        logger.info("Cross-lingual search: " + ", ".join(
+            f"{len(results)} {result_language}" for result_language, results in results_by_language.items()
+        ) + f", {len(deduped)} after merging")
+        return deduped[:n_results]
+    
+    def _dedupe_translations(self, results: List[SearchResult]) -> List[SearchResult]:
+        """Keep one version of each FAQ: the most similar, at the rank of its best-ranked version."""
+        # Insertion order follows each FAQ's first (best-ranked) appearance
+        best: Dict[str, SearchResult] = {}
+        for result in results:
+            base_id = result.metadata.get('base_id') or result.id
+            if base_id not in best or result.similarity > best[base_id].similarity:
+                best[base_id] = result
+        return list(best.values())
+    
+    def _fuse_keyword_results(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        dense_results: List[SearchResult],
+        language: Optional[str],
+        top_k: int,
+        n_candidates: int,
+        include: Optional[Sequence[str]],
+        cross_lingual_language: Optional[str] = None
+    ) -> List[SearchResult]:
+        """Merge dense and BM25 rankings with reciprocal rank fusion.
+        
+        Keyword hits the vector search missed are scored against the query embedding
+        so every returned result carries a comparable similarity. Like dense hits, they
+        must reach the database similarity threshold to be kept.
+        
+        With ``cross_lingual_language`` set, keyword-only hits in other languages get
+        the same penalty as in ``_search_cross_lingual`` and the fused list keeps one
+        version of each FAQ.
+        """
+        keyword_hits = self.keyword_index.search(query, top_k=n_candidates, language=language)
+        fused = reciprocal_rank_fusion(
+            [[result.id for result in dense_results], [doc_id for doc_id, _ in keyword_hits]],
+            k=config.retrieval.rrf_k
+        )[:top_k]
+        
+        by_id = {result.id: result for result in dense_results}
+        missing = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if missing:
+            projection = SEARCH_INCLUDE_FIELDS if include is None else include
+            threshold = config.database.similarity_threshold
+            for result in self.vector_db_manager.score_ids(query_embedding, missing, include=projection):
+                if result.similarity >= threshold:
+                    if cross_lingual_language is not None and result.metadata.get('language') != cross_lingual_language:
+                        result.similarity -= config.retrieval.cross_lingual_penalty
+                    by_id[result.id] = result
+        
+        kept = sum(doc_id in by_id for doc_id in missing)
+        logger.info(f"Hybrid search: {len(dense_results)} dense, {len(keyword_hits)} keyword, "
+                    f"{kept}/{len(missing)} keyword-only in top {top_k} above the similarity threshold")
+        results = [by_id[doc_id] for doc_id, _ in fused if doc_id in by_id]
+        if cross_lingual_language is not None:
+            results = self._dedupe_translations(results)
+        return results
+    
+    def find_direct_answer(
+        self,
+        query: str,
+        results: List[SearchResult],
+        language: Optional[str] = None
+    ) -> Optional[SearchResult]:
+        """Return the top result if it answers the query verbatim as an existing FAQ.
+        
+        The top hit must clear the configured similarity bar, its stored question must
+        share most of its terms with the query, and its answer must be stored whole
+        (not chunked), so the curated answer can be returned without the LLM.
+        
+        Args:
+            query (str): User query text.
+            results (List[SearchResult]): Search results, best first.
+            language (Optional[str]): Language of the query; FAQs stored in another
+                language are left to the LLM to answer in the query's language.
             
-        except Exception as e:
-            logger.exception(f"Failed to process query: {str(e)}")
-            raise
+        Returns:
+            Optional[SearchResult]: The matching FAQ, or None if the LLM should answer.
+        """
+        if not config.retrieval.direct_answer_enabled or not results:
+            return None
+        top = results[0]
+        if top.similarity < config.retrieval.direct_answer_similarity:
+            return None
+        metadata = top.metadata or {}
+        if metadata.get('chunk_count', 1) > 1 or not metadata.get('answer'):
+            return None
+        if language and metadata.get('language', language) != language:
+            return None
+        
+        query_terms = set(tokenize(query))
+        question_terms = set(tokenize(metadata.get('question', '')))
+        if not query_terms or not question_terms:
+            return None
+        overlap = len(query_terms & question_terms) / len(query_terms | question_terms)
+        if overlap < config.retrieval.direct_answer_question_overlap:
+            return None
+        
+        logger.info(f"Direct FAQ match {top.id} (similarity {top.similarity:.3f}, question overlap {overlap:.2f})")
+        return top
     
-    def get_context(self, results: List[Dict[str, Any]]) -> str:
-        """Generate a context string from retrieved results.
+    def group_by_parent(self, results: List[SearchResult]) -> List[SearchResult]:
+        """Merge retrieved chunks of the same FAQ into one result.
+        
+        The merged result takes the position and similarity of the FAQ's best chunk,
+        and its answer joins the matched chunks in answer order.
         
         Args:
-            results (List[Dict[str, Any]]): List of relevant documents with metadata.
+            results (List[SearchResult]): Search results, best first.
             
         Returns:
-            str: Concatenated context string.
+            List[SearchResult]: One result per parent FAQ, best first.
         """
-        context_parts = []
+        groups: Dict[str, List[SearchResult]] = {}
         for result in results:
-            # Use metadata fields for question and answer
-            question = result['metadata'].get('question', '')
-            answer = result['metadata'].get('answer', '')
-            context_parts.append(f"Q: {question}\nA: {answer}")
-        return "\n\n".join(context_parts) 
\ No newline at end of file
+            metadata = result.metadata or {}
+            parent_id = metadata.get('parent_id') if metadata.get('chunk_count', 1) > 1 else None
+            groups.setdefault(parent_id or result.id, []).append(result)
+        
+        grouped = []
+        for parent_id, chunks in groups.items():
+            best = chunks[0]
+            if len(chunks) == 1 and best.id == parent_id:
+                grouped.append(best)
+                continue
+            metadata = dict(best.metadata)
+            metadata.update({
+                'id': parent_id,
+                'answer': merge_chunk_texts(
+                    [(chunk.metadata.get('chunk_index', 0), chunk.metadata.get('answer', '')) for chunk in chunks]
+                ),
+                'chunk_ids': [chunk.id for chunk in chunks]
+            })
+            grouped.append(SearchResult(
+                id=parent_id,
+                similarity=best.similarity,
+                document=f"Q: {metadata.get('question', '')}\nA: {metadata['answer']}",
+                metadata=metadata
+            ))
+        return grouped
+    
+    def build_context(
+        self,
+        results: List[SearchResult],
+        token_budget: Optional[int] = None
+    ) -> ContextBuildResult:
+        """Pack retrieved results into a token-budgeted context.
+        
+        Args:
+            results (List[SearchResult]): List of relevant documents with metadata, best first.
+            token_budget (Optional[int]): Maximum context tokens. If None, uses config default.
+            
+        Returns:
+            ContextBuildResult: The context and its token accounting.
+        """
+        built = build_context(
+            results,
+            token_budget or config.retrieval.context_token_budget,
+            model_name=config.llm.model_name
+        )
+        logger.info(
+            f"Built context with {len(built.included_ids)}/{len(results)} passages, "
+            f"{built.tokens_used} tokens ({built.tokens_saved} saved, "
+            f"{built.dropped_duplicates} duplicates dropped)"
+        )
+        return built
+    
+    def get_context(self, results: List[SearchResult]) -> str:
+        """Generate a context string from retrieved results.
+        
+        Args:
+            results (List[SearchResult]): List of relevant documents with metadata.
+            
+        Returns:
+            str: Concatenated context string, limited to the configured token budget.
+        """
+        return self.build_context(results).context
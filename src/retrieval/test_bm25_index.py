@@ -0,0 +1,48 @@
+"""
+Test the BM25 keyword index used for hybrid retrieval.
+"""
+import pytest
+from src.retrieval.bm25_index import BM25Index, tokenize, reciprocal_rank_fusion
+
+@pytest.fixture
+def keyword_index():
+    index = BM25Index()
+    index.add("i485_en", "Q: What is Form I-485?\nA: Form I-485 is used to adjust status to permanent resident.", "en")
+    index.add("i130_en", "Q: What is Form I-130?\nA: Form I-130 is a petition for an alien relative.", "en")
+    index.add("i485_zh", "Q: 什么是I-485表格？\nA: I-485表格用于调整身份。", "zh")
+    return index
+
+def test_tokenize_keeps_identifiers():
+    tokens = tokenize("Can I file I-485 with an EB-2 or H-1B?")
+    assert "i-485" in tokens and "i485" in tokens
+    assert "eb-2" in tokens and "h-1b" in tokens
+    assert "can" not in tokens
+
+def test_tokenize_chinese_ngrams():
+    tokens = tokenize("绿卡申请")
+    assert "绿" in tokens and "绿卡" in tokens and "申请" in tokens
+
+def test_search_exact_identifier(keyword_index):
+    results = keyword_index.search("I485", top_k=3)
+    assert results[0][0] in ("i485_en", "i485_zh")
+    assert "i130_en" not in [doc_id for doc_id, _ in results]
+
+def test_search_language_filter(keyword_index):
+    results = keyword_index.search("I-485", language="zh")
+    assert [doc_id for doc_id, _ in results] == ["i485_zh"]
+
+def test_incremental_update(keyword_index):
+    keyword_index.remove("i485_en")
+    assert "i485_en" not in keyword_index
+    assert all(doc_id != "i485_en" for doc_id, _ in keyword_index.search("I-485"))
+    keyword_index.add("i130_en", "Q: What is Form I-751?\nA: Removal of conditions.", "en")
+    assert len(keyword_index) == 2
+    assert keyword_index.search("I-751")[0][0] == "i130_en"
+    assert keyword_index.search("I-130") == []
+
+def test_search_empty_query(keyword_index):
+    assert keyword_index.search("what is the") == []
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
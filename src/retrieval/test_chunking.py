@@ -0,0 +1,46 @@
+"""
+Tests for FAQ answer chunking.
+"""
+from src.retrieval.chunking import (
+    chunk_faq, chunk_text, merge_chunk_texts, split_sentences
+)
+
+LONG_ANSWER = " ".join(
+    f"Sentence number {i} explains one more step of the adjustment of status process." for i in range(40)
+)
+
+def test_split_sentences_handles_chinese():
+    assert split_sentences("第一句。第二句！Third one. Fourth?") == ["第一句。", "第二句！", "Third one.", "Fourth?"]
+
+def test_short_text_is_single_chunk():
+    assert chunk_text("Short answer.", max_tokens=50) == ["Short answer."]
+
+def test_chunks_respect_size_and_overlap():
+    chunks = chunk_text(LONG_ANSWER, max_tokens=100, overlap_tokens=25)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 * 4 for chunk in chunks)
+    # The last sentence of each chunk opens the next one
+    for previous, following in zip(chunks, chunks[1:]):
+        assert following.startswith(split_sentences(previous)[-1])
+
+def test_chunk_faq_ids_and_metadata():
+    records = chunk_faq("i485_en", "What is Form I-485?", LONG_ANSWER, {"base_id": "i485", "language": "en"},
+                        max_tokens=120, overlap_tokens=20)
+    assert len(records) > 1
+    for index, (text, metadata) in enumerate(records):
+        assert text.startswith("Q: What is Form I-485?\nA: ")
+        assert metadata["id"] == f"i485_en#c{index}"
+        assert metadata["parent_id"] == "i485_en"
+        assert metadata["chunk_index"] == index
+        assert metadata["chunk_count"] == len(records)
+        assert metadata["base_id"] == "i485"
+
+    single = chunk_faq("short_en", "Q?", "Short answer.", {"language": "en"})
+    assert [metadata["id"] for _, metadata in single] == ["short_en"]
+
+def test_merge_chunk_texts_removes_overlap():
+    chunks = chunk_text(LONG_ANSWER, max_tokens=100, overlap_tokens=25)
+    merged = merge_chunk_texts(list(enumerate(chunks))[::-1])
+    assert merged == LONG_ANSWER
+    gap = merge_chunk_texts([(0, chunks[0]), (2, chunks[2])])
+    assert " ... " in gap
@@ -0,0 +1,60 @@
+"""
+Tests for token-budgeted context assembly.
+"""
+from types import SimpleNamespace
+from src.retrieval.context_builder import build_context, estimate_tokens
+
+def make_result(doc_id, question, answer, base_id=None):
+    metadata = {"id": doc_id, "question": question, "answer": answer}
+    if base_id:
+        metadata["base_id"] = base_id
+    return SimpleNamespace(id=doc_id, metadata=metadata)
+
+def test_estimate_tokens_counts_cjk():
+    assert estimate_tokens("") == 0
+    # Chinese text uses about one token per character, far more than len / 4
+    assert estimate_tokens("什么是绿卡") >= 5
+    assert estimate_tokens("word " * 40) < 100
+
+def test_build_context_drops_cross_language_duplicates():
+    results = [
+        make_result("i485_en", "What is Form I-485?", "The Green Card application form.", "i485"),
+        make_result("i485_zh", "什么是I-485表格？", "绿卡申请表。", "i485"),
+        make_result("eb2_en", "What is EB-2?", "An employment-based category.", "eb2"),
+    ]
+    built = build_context(results, token_budget=1000)
+    assert built.included_ids == ["i485_en", "eb2_en"]
+    assert built.dropped_duplicates == 1
+    assert built.tokens_saved > 0
+    assert built.context.startswith("Q: What is Form I-485?")
+
+def test_build_context_drops_near_duplicate_text():
+    answer = "You can check your case status online with your receipt number."
+    results = [
+        make_result("a", "How do I check my case status?", answer),
+        make_result("b", "How do I check my case status?", answer + " Online."),
+    ]
+    built = build_context(results, token_budget=1000)
+    assert built.included_ids == ["a"]
+
+def test_build_context_respects_budget():
+    results = [make_result(str(i), f"Question {i}?", "answer " * 50) for i in range(5)]
+    built = build_context(results, token_budget=200)
+    assert built.tokens_used <= 200
+    assert 0 < len(built.included_ids) < 5
+    assert built.dropped_over_budget == 5 - len(built.included_ids)
+
+def test_build_context_truncates_oversized_top_passage():
+    results = [make_result("long", "Long question?", "detail " * 500)]
+    built = build_context(results, token_budget=100)
+    assert built.included_ids == ["long"]
+    assert estimate_tokens(built.context) <= 100
+    assert built.tokens_used <= 100
+
+def test_build_context_truncation_fits_uneven_token_density():
+    # The dense Chinese half comes first, so a single proportional cut would overshoot
+    results = [make_result("mixed", "混合问题？", "绿" * 400 + " detail" * 100)]
+    built = build_context(results, token_budget=100)
+    assert built.included_ids == ["mixed"]
+    assert estimate_tokens(built.context) <= 100
+    assert built.tokens_used == estimate_tokens(built.context)
@@ -0,0 +1,35 @@
+"""
+Test the script-based language detection fast path.
+"""
+from unittest.mock import patch
+from src.retrieval import language_detection
+from src.retrieval.language_detection import detect_by_script, detect_language, normalize_language
+
+def test_detect_by_script_english():
+    assert detect_by_script("What documents do I need for EB-2 application?") == "en"
+
+def test_detect_by_script_chinese_with_identifier():
+    assert detect_by_script("我需要哪些文件来申请 EB-2？") == "zh"
+
+def test_detect_by_script_ambiguous():
+    assert detect_by_script("What does 绿卡 mean in my green card case?") is None
+    assert detect_by_script("12345") is None
+    assert detect_by_script("グリーンカードとは") is None
+
+def test_detect_language_uses_fast_path():
+    detect_language.cache_clear()
+    with patch.object(language_detection, "detect") as mock_detect:
+        assert detect_language("什么是绿卡？") == ("zh", "script")
+        mock_detect.assert_not_called()
+
+def test_detect_language_falls_back_to_langdetect():
+    detect_language.cache_clear()
+    with patch.object(language_detection, "detect", return_value="zh-cn") as mock_detect:
+        assert detect_language("绿卡 green card") == ("zh", "langdetect")
+        assert detect_language("绿卡 green card") == ("zh", "langdetect")
+        mock_detect.assert_called_once()
+
+def test_normalize_language():
+    assert normalize_language("zh-cn") == "zh"
+    assert normalize_language("EN") == "en"
+    assert normalize_language("fr") == "en"
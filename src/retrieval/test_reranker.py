@@ -0,0 +1,58 @@
+"""
+Tests for the cross-encoder rerank stage.
+"""
+import time
+from types import SimpleNamespace
+import numpy as np
+from src.retrieval.reranker import CrossEncoderReranker
+
+def make_candidate(doc_id, similarity, answer):
+    return SimpleNamespace(id=doc_id, similarity=similarity,
+                           metadata={"question": doc_id, "answer": answer})
+
+def keyword_scorer(keyword, delay=0.0):
+    """Score pairs by whether the passage mentions a keyword."""
+    def score(pairs):
+        time.sleep(delay)
+        return np.array([1.0 if keyword in passage else 0.0 for _, passage in pairs])
+    return score
+
+def make_reranker(score_fn, **kwargs):
+    reranker = CrossEncoderReranker(**kwargs)
+    reranker._score_fn = score_fn
+    reranker.backend = "test"
+    return reranker
+
+def test_rerank_reorders_candidates():
+    candidates = [
+        make_candidate("a", 0.80, "general information"),
+        make_candidate("b", 0.79, "more general information"),
+        make_candidate("c", 0.78, "biometrics appointment details"),
+    ]
+    reranker = make_reranker(keyword_scorer("biometrics"), margin=0.1)
+    assert [c.id for c in reranker.rerank("biometrics", candidates, top_k=1)] == ["c"]
+
+def test_rerank_skips_when_dense_margin_is_decisive():
+    candidates = [
+        make_candidate("a", 0.90, "general information"),
+        make_candidate("b", 0.50, "biometrics appointment details"),
+    ]
+    calls = []
+    reranker = make_reranker(lambda pairs: calls.append(pairs) or np.zeros(len(pairs)), margin=0.1)
+    assert [c.id for c in reranker.rerank("biometrics", candidates, top_k=1)] == ["a"]
+    assert calls == []
+
+def test_rerank_stops_at_latency_budget():
+    candidates = [make_candidate(str(i), 0.5, "plain") for i in range(6)]
+    candidates.append(make_candidate("late", 0.5, "biometrics"))
+    reranker = make_reranker(keyword_scorer("biometrics", delay=0.02), batch_size=2,
+                             latency_budget_ms=1, margin=0.1)
+    # Only the first batch is scored, so the late match keeps its dense position
+    results = reranker.rerank("biometrics", candidates, top_k=3)
+    assert [c.id for c in results] == ["0", "1", "2"]
+
+def test_rerank_without_backend_keeps_dense_order():
+    candidates = [make_candidate(str(i), 0.5, "plain") for i in range(3)]
+    reranker = CrossEncoderReranker(margin=0.1)
+    reranker._load_failed = True
+    assert [c.id for c in reranker.rerank("q", candidates, top_k=2)] == ["0", "1"]
@@ -1,8 +1,14 @@
 """
 Test the retrieval pipeline functionality.
 """
+import asyncio
+import threading
 import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.config import config
 from src.retrieval.retrieval_manager import RetrievalManager
+from src.vector_db.vector_db_manager import SearchResult
 
 @pytest.fixture(scope="module")
 def retrieval_manager():
@@ -40,6 +46,80 @@ def test_detect_language_empty(retrieval_manager):
     with pytest.raises(ValueError):
         retrieval_manager.detect_language("")
 
+def test_find_direct_answer(retrieval_manager):
+    faq = SearchResult(
+        id="what-is-i485_en",
+        similarity=0.95,
+        metadata={"question": "What is Form I-485?", "answer": "The Green Card application form."}
+    )
+    assert retrieval_manager.find_direct_answer("what is form I-485", [faq]) is faq
+    # A different question about the same topic still goes to the LLM
+    assert retrieval_manager.find_direct_answer("How much does Form I-485 cost to file?", [faq]) is None
+    faq.similarity = 0.5
+    assert retrieval_manager.find_direct_answer("What is Form I-485?", [faq]) is None
+
+def test_cross_lingual_merge(retrieval_manager, monkeypatch):
+    def make(doc_id, language, similarity):
+        return SearchResult(id=doc_id, similarity=similarity,
+                            metadata={"base_id": doc_id.rsplit("_", 1)[0], "language": language})
+    monkeypatch.setattr(retrieval_manager.vector_db_manager, "search_multilingual", lambda *args, **kwargs: {
+        "zh": [make("fee_zh", "zh", 0.70)],
+        "en": [make("fee_en", "en", 0.72), make("biometrics_en", "en", 0.60)]
+    })
+    monkeypatch.setattr(config.retrieval, "cross_lingual_penalty", 0.05)
+    results = retrieval_manager._search_cross_lingual(np.zeros(768), "zh", 3, ("metadatas",))
+    # The English translation of the same FAQ is calibrated below the Chinese one and dropped
+    assert [result.id for result in results] == ["fee_zh", "biometrics_en"]
+    assert results[1].similarity == pytest.approx(0.55)
+
+def test_keyword_only_hits_respect_similarity_threshold(retrieval_manager, monkeypatch):
+    class KeywordIndex:
+        def search(self, query, top_k, language=None):
+            return [("weak", 3.0), ("strong", 2.0)]
+    monkeypatch.setattr(retrieval_manager, "keyword_index", KeywordIndex())
+    monkeypatch.setattr(retrieval_manager.vector_db_manager, "score_ids", lambda embedding, ids, include: [
+        SearchResult(id="weak", similarity=0.2, metadata={}),
+        SearchResult(id="strong", similarity=0.6, metadata={})
+    ])
+    monkeypatch.setattr(config.database, "similarity_threshold", 0.5)
+    dense = [SearchResult(id="dense", similarity=0.7, metadata={})]
+    results = retrieval_manager._fuse_keyword_results("query", np.zeros(768), dense, "en", 3, 6, ("metadatas",))
+    assert [result.id for result in results] == ["dense", "strong"]
+
+def test_cross_lingual_keyword_hits_are_calibrated(retrieval_manager, monkeypatch):
+    class KeywordIndex:
+        def search(self, query, top_k, language=None):
+            return [("fee_en", 3.0)]
+    monkeypatch.setattr(retrieval_manager, "keyword_index", KeywordIndex())
+    monkeypatch.setattr(retrieval_manager.vector_db_manager, "score_ids", lambda embedding, ids, include: [
+        SearchResult(id="fee_en", similarity=0.72, metadata={"base_id": "fee", "language": "en"})
+    ])
+    monkeypatch.setattr(config.database, "similarity_threshold", 0.5)
+    monkeypatch.setattr(config.retrieval, "cross_lingual_penalty", 0.05)
+    dense = [SearchResult(id="fee_zh", similarity=0.70, metadata={"base_id": "fee", "language": "zh"})]
+    results = retrieval_manager._fuse_keyword_results(
+        "query", np.zeros(768), dense, None, 3, 6, ("metadatas",), cross_lingual_language="zh"
+    )
+    # The translation is penalized like a dense cross-lingual hit and loses to the original
+    assert [result.id for result in results] == ["fee_zh"]
+
+def test_rerank_runs_on_the_cpu_executor(retrieval_manager, monkeypatch):
+    class Reranker:
+        def rerank(self, query, candidates, top_k):
+            self.thread = threading.current_thread().name
+            return list(candidates)[:top_k]
+    reranker = Reranker()
+    monkeypatch.setattr(retrieval_manager, "reranker", reranker)
+    monkeypatch.setattr(retrieval_manager, "embed_query", lambda query: np.zeros(768))
+    candidates = [SearchResult(id="faq_en", similarity=0.8, metadata={})]
+    monkeypatch.setattr(retrieval_manager, "_search_candidates", lambda *args: (candidates, ("metadatas",)))
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-cpu")
+    results = asyncio.run(retrieval_manager.aprocess_query("What is a Green Card?", "en", executor=executor))
+    executor.shutdown()
+    assert [result.id for result in results] == ["faq_en"]
+    assert reranker.thread.startswith("rag-cpu")
+
 def test_get_context(retrieval_manager):
     # Use a real query to get results, then test context generation
     query = "What documents do I need for EB-2 application?"
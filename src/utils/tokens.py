@@ -0,0 +1,53 @@
+"""
+Token counting for prompt budgeting and usage estimates.
+"""
+import math
+import re
+import logging
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - exercised only when tiktoken is absent
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_CJK_CHARACTER = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+@lru_cache(maxsize=8)
+def _get_encoding(model_name: Optional[str]):
+    """Load the tiktoken encoding for a model, falling back to cl100k_base."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name) if model_name else tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable, using estimator: {e}")
+            return None
+
+def estimate_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """Count the tokens a text will use in the prompt.
+
+    Uses tiktoken when it is installed. Otherwise each CJK character is counted
+    as one token and the remaining text as one token per four characters, which
+    matches the OpenAI tokenizers closely for English and Chinese.
+
+    Args:
+        text (str): Text to measure.
+        model_name (Optional[str]): Model whose tokenizer should be used.
+
+    Returns:
+        int: Token count.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    cjk = len(_CJK_CHARACTER.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
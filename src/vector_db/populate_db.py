@@ -14,6 +14,8 @@ if project_root not in sys.path:
 
 from src.embeddings.embedding_utils import EmbeddingManager
 from src.vector_db.vector_db_manager import VectorDBManager
+from src.retrieval.chunking import chunk_faq
+from src.config import config
 
 # Configure logging
 logging.basicConfig(
@@ -37,22 +39,25 @@ def populate_vector_db():
         with open(faq_path, 'r', encoding='utf-8') as f:
             faqs = json.load(f)["faqs"]
         
-        # Generate embeddings and add to vector DB
+        # Generate embeddings and add to vector DB, one document per answer chunk
         for faq in faqs:
-            # Combine question and answer for better context
-            text = f"{faq['question']} {faq['answer']}"
-            embedding = embedding_manager.get_embedding(text)
+            # Translations share an FAQ id, so the language keeps their documents apart
+            unique_id = f"{faq['id']}_{faq['language']}"
+            chunks = chunk_faq(
+                unique_id,
+                faq['question'],
+                faq['answer'],
+                {'base_id': faq['id'], 'language': faq['language']},
+                max_tokens=config.retrieval.chunk_max_tokens,
+                overlap_tokens=config.retrieval.chunk_overlap_tokens
+            )
+            texts = [text for text, _ in chunks]
             
             # Add to vector DB
             vector_db_manager.add_documents(
-                documents=[text],
-                embeddings=[embedding],
-                metadatas=[{
-                    'id': faq['id'],
-                    'question': faq['question'],
-                    'answer': faq['answer'],
-                    'language': faq['language']
-                }]
+                documents=texts,
+                embeddings=[embedding_manager.get_embedding(text) for text in texts],
+                metadatas=[metadata for _, metadata in chunks]
             )
             
         logger.info("Successfully populated vector database with FAQ embeddings")
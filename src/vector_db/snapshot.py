@@ -0,0 +1,150 @@
+"""
+Snapshot and restore tooling for the vector database.
+
+A snapshot is a single compressed ``.npz`` file holding the stored ids, embeddings,
+documents and metadata together with a versioned manifest. Restoring a snapshot
+writes the stored vectors straight back through ``VectorDBManager``, so a new
+replica can be brought up without loading the embedding model.
+
+Usage:
+    python -m src.vector_db.snapshot export snapshots/faq.npz
+    python -m src.vector_db.snapshot restore snapshots/faq.npz --replace
+"""
+import sys
+import json
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.vector_db.vector_db_manager import VectorDBManager
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+DEFAULT_EMBEDDING_MODEL = "intfloat/multilingual-e5-base"
+RESTORE_BATCH_SIZE = 1000
+
+def export_snapshot(
+    path: str,
+    vector_db_manager: VectorDBManager = None,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL
+) -> Dict[str, Any]:
+    """Write every record in the vector database to a snapshot file.
+    
+    Args:
+        path (str): Destination file. A ``.npz`` suffix is added by NumPy if missing.
+        vector_db_manager (VectorDBManager): Manager to export from. If None, uses the default instance.
+        embedding_model (str): Name of the model that produced the vectors, recorded in the manifest.
+        
+    Returns:
+        Dict[str, Any]: The snapshot manifest.
+    """
+    vector_db_manager = vector_db_manager or VectorDBManager()
+    records = vector_db_manager.export_records()
+    embeddings = records["embeddings"]
+    
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created": datetime.now().isoformat(),
+        "collection_name": vector_db_manager.collection_name,
+        "embedding_model": embedding_model,
+        "embedding_dimensions": int(embeddings.shape[1]) if embeddings.size else 0,
+        "count": len(records["ids"])
+    }
+    
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        manifest=np.array(json.dumps(manifest)),
+        ids=np.array(records["ids"], dtype=str),
+        embeddings=embeddings,
+        documents=np.array(json.dumps(records["documents"], ensure_ascii=False)),
+        metadatas=np.array(json.dumps(records["metadatas"], ensure_ascii=False))
+    )
+    logger.info(f"Exported {manifest['count']} records to {path}")
+    return manifest
+
+def restore_snapshot(
+    path: str,
+    vector_db_manager: VectorDBManager = None,
+    replace: bool = False
+) -> Dict[str, Any]:
+    """Load a snapshot file back into the vector database.
+    
+    Args:
+        path (str): Snapshot file written by ``export_snapshot``.
+        vector_db_manager (VectorDBManager): Manager to restore into. If None, uses the default instance.
+        replace (bool): Replace the existing index instead of adding to it.
+        
+    Returns:
+        Dict[str, Any]: The snapshot manifest.
+    """
+    vector_db_manager = vector_db_manager or VectorDBManager()
+    
+    with np.load(path, allow_pickle=False) as snapshot:
+        manifest = json.loads(str(snapshot["manifest"]))
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+        ids = snapshot["ids"].tolist()
+        embeddings = snapshot["embeddings"]
+        documents = json.loads(str(snapshot["documents"]))
+        metadatas = json.loads(str(snapshot["metadatas"]))
+    
+    if not (len(ids) == len(documents) == len(metadatas) == len(embeddings)):
+        raise ValueError("Snapshot is inconsistent: record counts do not match")
+    
+    restored_metadatas = [{**metadata, "id": doc_id} for doc_id, metadata in zip(ids, metadatas)]
+    
+    if replace:
+        # Build the restored index on the side and swap it in, so searches never see it half-loaded
+        if not vector_db_manager.swap_index(documents, list(embeddings), restored_metadatas):
+            raise RuntimeError("Failed to swap in the restored index")
+    else:
+        for start in range(0, len(ids), RESTORE_BATCH_SIZE):
+            end = start + RESTORE_BATCH_SIZE
+            if not vector_db_manager.add_documents(
+                documents=documents[start:end],
+                embeddings=list(embeddings[start:end]),
+                metadatas=restored_metadatas[start:end]
+            ):
+                raise RuntimeError(f"Failed to restore records {start}-{min(end, len(ids))}")
+    
+    logger.info(f"Restored {len(ids)} records from {path} (model: {manifest.get('embedding_model')})")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore vector database snapshots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Write the vector database to a snapshot file")
+    export_parser.add_argument("path", help="Snapshot file to write")
+    export_parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL,
+                               help="Model that produced the stored vectors")
+    
+    restore_parser = subparsers.add_parser("restore", help="Load a snapshot file into the vector database")
+    restore_parser.add_argument("path", help="Snapshot file to read")
+    restore_parser.add_argument("--replace", action="store_true",
+                                help="Replace the existing index instead of adding to it")
+    
+    args = parser.parse_args()
+    if args.command == "export":
+        export_snapshot(args.path, embedding_model=args.embedding_model)
+    else:
+        restore_snapshot(args.path, replace=args.replace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Test the reader-writer lock guarding the vector database.
+"""
+import threading
+import time
+from src.vector_db.locking import ReadWriteLock
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = []
+    barrier = threading.Barrier(3, timeout=2)
+    
+    def reader():
+        with lock.read_lock():
+            inside.append(1)
+            barrier.wait()
+    
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert len(inside) == 3
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_write()
+    
+    def reader():
+        with lock.read_lock():
+            events.append("read")
+    
+    thread = threading.Thread(target=reader)
+    thread.start()
+    time.sleep(0.05)
+    events.append("write-done")
+    lock.release_write()
+    thread.join(timeout=2)
+    assert events == ["write-done", "read"]
+
+def test_waiting_writer_blocks_new_readers():
+    lock = ReadWriteLock()
+    events = []
+    lock.acquire_read()
+    
+    def writer():
+        with lock.write_lock():
+            events.append("write")
+    
+    def late_reader():
+        with lock.read_lock():
+            events.append("late-read")
+    
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    time.sleep(0.05)
+    reader_thread = threading.Thread(target=late_reader)
+    reader_thread.start()
+    time.sleep(0.05)
+    assert events == []
+    lock.release_read()
+    writer_thread.join(timeout=2)
+    reader_thread.join(timeout=2)
+    assert events == ["write", "late-read"]
@@ -7,7 +7,9 @@ import logging
 import pytest
 import numpy as np
 from src.embeddings.embedding_utils import EmbeddingManager
+from src.config import config
 from src.vector_db.vector_db_manager import VectorDBManager
+from src.vector_db.snapshot import export_snapshot, restore_snapshot
 
 # Add the project root to the Python path
 project_root = str(Path(__file__).parent.parent.parent)
@@ -26,8 +28,9 @@ def embedding_manager():
     return EmbeddingManager()
 
 @pytest.fixture(scope="module")
-def vector_db_manager():
-    return VectorDBManager()
+def vector_db_manager(tmp_path_factory):
+    # Isolated from the served index: these tests add, restore and swap whole collections
+    return VectorDBManager.isolated(str(tmp_path_factory.mktemp("vector_db")))
 
 def test_add_documents_and_search(vector_db_manager, embedding_manager):
     text = "Test document for vector db."
@@ -65,6 +68,116 @@ def test_search_similar_invalid_embedding(vector_db_manager):
     results = vector_db_manager.search_similar(np.array([1, 2, 3]), n_results=1)
     assert results == []
 
+def test_search_similar_projection(vector_db_manager, embedding_manager):
+    text = "Projection test document."
+    embedding = embedding_manager.get_embedding(text)
+    metadata = {"id": "projection-test", "question": "Q", "answer": "A", "language": "en"}
+    vector_db_manager.add_documents([text], [embedding], [metadata])
+    results = vector_db_manager.search_similar(embedding, n_results=1, include=())
+    assert len(results) == 1
+    assert results[0].id == "projection-test"
+    # Text fields are fetched lazily on first access
+    assert results[0].document == text
+    assert results[0]['metadata']['question'] == "Q"
+
+def test_search_similar_invalid_include(vector_db_manager):
+    # A caller error, so it is raised rather than logged as a failed search
+    with pytest.raises(ValueError, match="Unsupported include fields"):
+        vector_db_manager.search_similar(np.zeros(768), include=("embeddings",))
+    with pytest.raises(ValueError, match="Unsupported include fields"):
+        vector_db_manager.search_multilingual(np.zeros(768), ["en"], include=("embeddings",))
+
+def test_search_similar_language_partition(embedding_manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, "partition_by_language", True)
+    vector_db_manager = VectorDBManager.isolated(str(tmp_path / "vector_db"))
+    texts = ["Partition test document.", "分区测试文档。", "Document without a language."]
+    embeddings = [embedding_manager.get_embedding(text) for text in texts]
+    vector_db_manager.add_documents(texts, embeddings, [
+        {"id": "partition-test-en", "question": "Q", "answer": "A", "language": "en"},
+        {"id": "partition-test-zh", "question": "Q", "answer": "A", "language": "zh"},
+        {"id": "partition-test-none", "question": "Q", "answer": "A"}
+    ])
+    results = vector_db_manager.search_similar(embeddings[1], n_results=5, language="zh", similarity_threshold=-1.0)
+    assert [result['id'] for result in results] == ["partition-test-zh"]
+    
+    # Language-less documents live in the shared collection and are still read across languages
+    results = vector_db_manager.search_similar(embeddings[2], n_results=5, similarity_threshold=-1.0)
+    assert results[0]['id'] == "partition-test-none"
+    assert len(vector_db_manager.export_records(include_embeddings=False)["ids"]) == 3
+    
+    stats = vector_db_manager.get_collection_stats()
+    assert stats["partitioned"] is True
+    assert stats["partitions"]["zh"] == 1
+    assert stats["document_count"] == 3
+
+def test_search_multilingual(vector_db_manager, embedding_manager):
+    en_text = "Multilingual test document."
+    zh_text = "多语言测试文档。"
+    vector_db_manager.add_documents(
+        [en_text, zh_text],
+        [embedding_manager.get_embedding(en_text), embedding_manager.get_embedding(zh_text)],
+        [
+            {"id": "multilingual-test-en", "base_id": "multilingual-test", "question": "Q", "answer": "A", "language": "en"},
+            {"id": "multilingual-test-zh", "base_id": "multilingual-test", "question": "Q", "answer": "A", "language": "zh"}
+        ]
+    )
+    results = vector_db_manager.search_multilingual(
+        embedding_manager.get_embedding(zh_text), ["zh", "en"], n_results=3, similarity_threshold=-1.0
+    )
+    assert set(results) == {"zh", "en"}
+    for language, language_results in results.items():
+        assert 0 < len(language_results) <= 3
+        assert all(result.metadata["language"] == language for result in language_results)
+
+def test_search_multilingual_unpartitioned(embedding_manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(config.database, "partition_by_language", False)
+    vector_db_manager = VectorDBManager.isolated(str(tmp_path / "vector_db"))
+    texts = ["Multilingual test document.", "多语言测试文档。", "Documento de prueba multilingüe."]
+    vector_db_manager.add_documents(texts, [embedding_manager.get_embedding(text) for text in texts], [
+        {"id": f"unpartitioned-test-{language}", "question": "Q", "answer": "A", "language": language}
+        for language in ("en", "zh", "es")
+    ])
+    queries = []
+    collection_type = type(vector_db_manager.collection)
+    query = collection_type.query
+    monkeypatch.setattr(collection_type, "query", lambda self, **kwargs: queries.append(kwargs) or query(self, **kwargs))
+    
+    results = vector_db_manager.search_multilingual(
+        embedding_manager.get_embedding(texts[1]), ["zh", "en"], n_results=3,
+        similarity_threshold=-1.0, include=["documents"]
+    )
+    # One query covers every language; the hits are split by their metadata
+    assert len(queries) == 1
+    assert {language: [result.id for result in language_results] for language, language_results in results.items()} == {
+        "zh": ["unpartitioned-test-zh"], "en": ["unpartitioned-test-en"]
+    }
+
+def test_snapshot_roundtrip(embedding_manager, tmp_path):
+    # A restore with replace=True rewrites every collection, so it gets a manager of its own
+    vector_db_manager = VectorDBManager.isolated(str(tmp_path / "vector_db"))
+    text = "Snapshot test document."
+    embedding = embedding_manager.get_embedding(text)
+    metadata = {"id": "snapshot-test", "question": "Q", "answer": "A", "language": "en"}
+    vector_db_manager.add_documents([text], [embedding], [metadata])
+    path = str(tmp_path / "snapshot.npz")
+    manifest = export_snapshot(path, vector_db_manager)
+    assert manifest["count"] >= 1
+    restored = restore_snapshot(path, vector_db_manager, replace=True)
+    assert restored["count"] == manifest["count"]
+    assert vector_db_manager.get_collection_stats()["document_count"] == manifest["count"]
+    assert vector_db_manager.get_document("snapshot-test")["document"] == text
+
+def test_swap_index(vector_db_manager, embedding_manager):
+    texts = ["Swap test document one.", "交换测试文档。"]
+    embeddings = [embedding_manager.get_embedding(text) for text in texts]
+    metadatas = [
+        {"id": "swap-test-en", "question": "Q", "answer": "A", "language": "en"},
+        {"id": "swap-test-zh", "question": "Q", "answer": "A", "language": "zh"}
+    ]
+    assert vector_db_manager.swap_index(texts, embeddings, metadatas) is True
+    assert vector_db_manager.get_collection_stats()["document_count"] == 2
+    assert vector_db_manager.get_document("swap-test-zh")["document"] == texts[1]
+
 def test_vector_db():
     """Test vector database functionality with sample queries."""
     try:
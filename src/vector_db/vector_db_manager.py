@@ -4,11 +4,17 @@ Vector database manager for handling ChromaDB operations.
 import chromadb
 import numpy as np
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import json
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence, Callable, Iterator, Tuple
 from chromadb.config import Settings
 import os
 
 from src.config import config
+from src.vector_db.locking import ReadWriteLock
 
 # Configure logging
 logging.basicConfig(
@@ -17,15 +23,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SEARCH_INCLUDE_FIELDS = ("documents", "metadatas")
+STAGING_BATCH_SIZE = 1000
+
+class SearchResult:
+    """A single search hit.
+    
+    Only the id and similarity are always populated. The document text and metadata
+    are either projected in by the search or fetched from the database on first access.
+    Item access (``result['document']``) is supported for callers written against the
+    plain dictionary results.
+    """
+    
+    __slots__ = ("id", "similarity", "_document", "_metadata", "_fetch")
+    
+    _KEYS = ("id", "document", "metadata", "similarity")
+    
+    def __init__(
+        self,
+        id: str,
+        similarity: float,
+        document: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        fetch: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None
+    ):
+        self.id = id
+        self.similarity = similarity
+        self._document = document
+        self._metadata = metadata
+        self._fetch = fetch
+    
+    def _load(self) -> None:
+        """Fetch the text fields that were not projected into the search result."""
+        fetch, self._fetch = self._fetch, None
+        record = fetch(self.id) if fetch else None
+        if record:
+            if self._document is None:
+                self._document = record.get('document')
+            if self._metadata is None:
+                self._metadata = record.get('metadata') or {}
+    
+    @property
+    def document(self) -> Optional[str]:
+        if self._document is None and self._fetch is not None:
+            self._load()
+        return self._document
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None and self._fetch is not None:
+            self._load()
+        return self._metadata if self._metadata is not None else {}
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._KEYS
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._KEYS else default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dictionary, fetching any text that was not projected."""
+        return {
+            'id': self.id,
+            'document': self.document,
+            'metadata': self.metadata,
+            'similarity': self.similarity
+        }
+    
+    def __repr__(self) -> str:
+        return f"SearchResult(id={self.id!r}, similarity={self.similarity:.4f})"
+
 class VectorDBManager:
-    """Manager class for handling ChromaDB operations."""
+    """Manager class for handling ChromaDB operations.
+    
+    The instance is shared by every request thread. Searches and lookups hold a
+    shared read lock; writes hold it exclusively and are additionally serialized
+    among themselves, so a long rebuild staged through ``swap_index`` only blocks
+    readers for the instant the new collections are swapped in.
+    """
     
     _instance = None
     _client = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = super(VectorDBManager, cls).__new__(cls)
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = super(VectorDBManager, cls).__new__(cls)
         return cls._instance
     
     def __init__(self, collection_name: Optional[str] = None):
@@ -36,46 +126,223 @@ class VectorDBManager:
         """
         if hasattr(self, 'initialized'):
             return
-            
+        
+        with VectorDBManager._instance_lock:
+            if hasattr(self, 'initialized'):
+                return
+            self._initialize(collection_name)
+    
+    @classmethod
+    def isolated(cls, persist_dir: str, collection_name: Optional[str] = None) -> "VectorDBManager":
+        """Create a manager outside the process-wide singleton.
+        
+        The manager gets its own ChromaDB client on ``persist_dir``, so writes, snapshot
+        restores and index swaps never reach the served index. Used by tests and tools.
+        
+        Args:
+            persist_dir (str): Directory holding the isolated database.
+            collection_name (Optional[str]): Name of the collection to use. If None, uses config default.
+        
+        Returns:
+            VectorDBManager: A new, independent manager.
+        """
+        manager = super().__new__(cls)
+        manager._initialize(collection_name, persist_dir=persist_dir)
+        return manager
+    
+    def _initialize(self, collection_name: Optional[str], persist_dir: Optional[str] = None) -> None:
+        """Connect to ChromaDB and load the collections.
+        
+        Runs once per process for the singleton; ``persist_dir`` gives an isolated
+        manager its own client instead of the shared one.
+        """
         self.collection_name = collection_name or config.database.collection_name
+        self._lock = ReadWriteLock()
+        self._write_mutex = threading.Lock()
+        self._partition_lock = threading.Lock()
+        self._listeners: List[Callable[..., None]] = []
         try:
+            isolated = persist_dir is not None
             # Set persistent directory for ChromaDB from config
-            persist_dir = config.get_database_path()
+            persist_dir = persist_dir or config.get_database_path()
             
             # Create persistent directory if it doesn't exist
             os.makedirs(persist_dir, exist_ok=True)
             
-            # Initialize persistent client if not already initialized
-            if VectorDBManager._client is None:
-                VectorDBManager._client = chromadb.PersistentClient(path=persist_dir)
-            
-            self.client = VectorDBManager._client
+            if isolated:
+                self.client = chromadb.PersistentClient(path=persist_dir)
+            else:
+                # Initialize persistent client if not already initialized
+                if VectorDBManager._client is None:
+                    VectorDBManager._client = chromadb.PersistentClient(path=persist_dir)
+                self.client = VectorDBManager._client
             logger.info(f"Initializing VectorDBManager with collection: {self.collection_name} (persistent at {persist_dir})")
             
+            # Collections rebuilt by swap_index live under generated names
+            self._aliases_path = Path(persist_dir) / f"{self.collection_name}-aliases.json"
+            self._aliases = self._load_aliases()
+            
             # Get or create collection
-            self.collection = self._get_or_create_collection()
+            self.collection = self._get_or_create_collection(self._physical_name(self.collection_name))
+            
+            # One collection per language when partitioning is enabled
+            self.partitioned = config.database.partition_by_language
+            self.partitions: Dict[str, Any] = {}
+            if self.partitioned:
+                for language in config.database.languages:
+                    self._get_partition(language)
+                self._migrate_legacy_collection()
+            
             self.initialized = True
             
         except Exception as e:
             logger.exception(f"Failed to initialize VectorDBManager: {str(e)}")
             raise
     
-    def _get_or_create_collection(self):
-        """Get an existing collection or create a new one."""
+    def _get_or_create_collection(self, name: Optional[str] = None):
+        """Get an existing collection or create a new one.
+        
+        Args:
+            name (Optional[str]): Collection name. If None, uses the base collection name.
+        """
+        name = name or self.collection_name
         try:
             # Try to get existing collection
-            collection = self.client.get_collection(self.collection_name)
-            logger.info(f"Retrieved existing collection: {self.collection_name}")
+            collection = self.client.get_collection(name)
+            logger.info(f"Retrieved existing collection: {name}")
             return collection
         except Exception:
             # Create new collection if it doesn't exist
             collection = self.client.create_collection(
-                name=self.collection_name,
+                name=name,
                 metadata={"description": "Green Card FAQ collection"}
             )
-            logger.info(f"Created new collection: {self.collection_name}")
+            logger.info(f"Created new collection: {name}")
             return collection
     
+    def partition_name(self, language: str) -> str:
+        """Get the collection name used for a language partition."""
+        return f"{self.collection_name}-{language}"
+    
+    def _get_partition(self, language: str):
+        """Get the collection for a language, creating the partition on first use."""
+        partition = self.partitions.get(language)
+        if partition is None:
+            with self._partition_lock:
+                partition = self.partitions.get(language)
+                if partition is None:
+                    logical_name = self.partition_name(language)
+                    partition = self._get_or_create_collection(self._physical_name(logical_name))
+                    self.partitions[language] = partition
+        return partition
+    
+    def _physical_name(self, logical_name: str) -> str:
+        """Resolve a logical collection name to the collection currently serving it."""
+        return self._aliases.get(logical_name, logical_name)
+    
+    def _load_aliases(self) -> Dict[str, str]:
+        """Load the logical-to-physical collection name mapping."""
+        try:
+            with open(self._aliases_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading collection aliases: {e}")
+            return {}
+    
+    def _save_aliases(self) -> None:
+        """Persist the alias mapping, replacing the previous file atomically."""
+        tmp_path = self._aliases_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._aliases, f, indent=2)
+        os.replace(tmp_path, self._aliases_path)
+    
+    def subscribe(self, listener: Callable[..., None]) -> None:
+        """Register a callback that is told about every change to the stored documents.
+        
+        The listener is called as ``listener(event, **payload)`` after the change is
+        committed, where event is one of:
+            - "add": payload has ``ids``, ``documents`` and ``metadatas``.
+            - "delete": payload has ``ids``.
+            - "reset": many documents changed at once; reload from ``export_records``.
+        
+        Args:
+            listener (Callable[..., None]): Callback to register.
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: str, **payload: Any) -> None:
+        """Tell subscribers about a committed change."""
+        for listener in list(self._listeners):
+            try:
+                listener(event, **payload)
+            except Exception as e:
+                logger.exception(f"Vector DB listener failed on {event}: {str(e)}")
+    
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Serialize writers and block readers for the duration of the block."""
+        with self._write_mutex, self._lock.write_lock():
+            yield
+    
+    def _group_records(
+        self,
+        ids: List[str],
+        documents: List[str],
+        embeddings: List[Any],
+        metadatas: List[Dict[str, Any]]
+    ) -> Dict[Optional[str], Dict[str, list]]:
+        """Group records by the language partition they belong to (None for the shared collection)."""
+        groups: Dict[Optional[str], Dict[str, list]] = {}
+        for doc_id, doc, emb, meta in zip(ids, documents, embeddings, metadatas):
+            language = (meta or {}).get("language") if self.partitioned else None
+            group = groups.setdefault(language, {"ids": [], "documents": [], "embeddings": [], "metadatas": []})
+            group["ids"].append(doc_id)
+            group["documents"].append(doc)
+            group["embeddings"].append(emb)
+            group["metadatas"].append(meta)
+        return groups
+    
+    def _collections_for(self, language: Optional[str] = None) -> List[Any]:
+        """Get the collections a read for the given language has to touch.
+        
+        With partitioning enabled, documents without a language stay in the shared
+        collection, so a read across all languages includes it as well.
+        """
+        if not self.partitioned:
+            return [self.collection]
+        if language is not None:
+            return [self._get_partition(language)]
+        return self._all_collections()
+    
+    def _migrate_legacy_collection(self) -> None:
+        """Move documents from the single shared collection into empty language partitions.
+        
+        Databases populated before partitioning was introduced keep every language
+        in one collection. Vectors are copied as-is, so no re-embedding is needed, and
+        removed from the shared collection, which keeps only language-less documents.
+        """
+        try:
+            if self.collection.count() == 0:
+                return
+            if any(partition.count() > 0 for partition in self.partitions.values()):
+                return
+            
+            legacy = self.collection.get(include=["documents", "embeddings", "metadatas"])
+            grouped = self._group_records(
+                legacy['ids'], legacy['documents'], legacy['embeddings'], legacy['metadatas']
+            )
+            
+            for language, group in grouped.items():
+                if language is None:
+                    continue
+                self._get_partition(language).add(**group)
+                self.collection.delete(ids=group['ids'])
+                logger.info(f"Migrated {len(group['ids'])} documents into partition: {self.partition_name(language)}")
+        except Exception as e:
+            logger.exception(f"Failed to migrate legacy collection into partitions: {str(e)}")
+    
     def add_documents(
         self,
         documents: List[str],
@@ -109,14 +376,15 @@ class VectorDBManager:
                 metadatas = [{"id": str(i)} for i in range(len(documents))]
             ids = [meta["id"] for meta in metadatas]
             
-            # Add documents to collection
-            self.collection.add(
-                ids=ids,
-                documents=documents,
-                embeddings=embeddings_list,
-                metadatas=metadatas
-            )
+            # Route each document to its language partition, or to the shared collection
+            groups = self._group_records(ids, documents, embeddings_list, metadatas)
+            
+            with self._exclusive():
+                for language, group in groups.items():
+                    collection = self._get_partition(language) if language else self.collection
+                    collection.add(**group)
             
+            self._notify("add", ids=ids, documents=documents, metadatas=metadatas)
             logger.info(f"Successfully added {len(documents)} documents to collection")
             return True
             
@@ -129,8 +397,10 @@ class VectorDBManager:
         query_embedding: np.ndarray,
         n_results: Optional[int] = None,
         where: Optional[Dict] = None,
-        similarity_threshold: Optional[float] = None
-    ) -> List[Dict[str, Any]]:
+        similarity_threshold: Optional[float] = None,
+        language: Optional[str] = None,
+        include: Optional[Sequence[str]] = None
+    ) -> List[SearchResult]:
         """Search for similar documents in the collection.
         
         Args:
@@ -138,70 +408,212 @@ class VectorDBManager:
             n_results (Optional[int]): Number of results to return. If None, uses config default.
             where (Optional[Dict]): Filter conditions.
             similarity_threshold (Optional[float]): Minimum similarity score to include a result. If None, uses config default.
+            language (Optional[str]): Restrict the search to one language. With partitioning enabled only
+                that language's collection is searched; otherwise a metadata filter is applied.
+            include (Optional[Sequence[str]]): Fields to project into the results, any of
+                "documents" and "metadatas". If None, both are included. Fields left out are
+                fetched lazily when accessed.
             
         Returns:
-            List[Dict[str, Any]]: List of similar documents with metadata.
+            List[SearchResult]: List of similar documents with metadata.
+        
+        Raises:
+            ValueError: If ``include`` names an unsupported field.
         """
+        include = self._resolve_include(include)
         try:
             # Use config defaults if not provided
             n_results = n_results or config.database.max_results
             similarity_threshold = similarity_threshold or config.database.similarity_threshold
             
-            # Log collection state
-            doc_count = self.collection.count()
-            logger.info(f"Collection state: {doc_count} documents")
+            if language and not self.partitioned:
+                where = {**(where or {}), "language": language}
             
-            if doc_count == 0:
-                logger.warning("Collection is empty. No documents to search.")
-                return []
+            filtered_results = []
+            with self._lock.read_lock():
+                for collection in self._collections_for(language):
+                    filtered_results.extend(self._query_collection(
+                        collection, query_embedding, n_results, where, similarity_threshold, include
+                    ))
             
-            # Convert query embedding to list format
-            query_embedding_list = query_embedding.tolist()
+            # Merge partitions back into a single ranking
+            filtered_results.sort(key=lambda result: result.similarity, reverse=True)
+            filtered_results = filtered_results[:n_results]
             
-            # Perform the search
-            results = self.collection.query(
-                query_embeddings=[query_embedding_list],
-                n_results=n_results,
-                where=where
-            )
-            
-            # Log raw results for debugging
-            logger.debug(f"Raw query results: {results}")
+            logger.info(f"Found {len(filtered_results)} similar documents")
+            return filtered_results
             
-            if not results or not results.get('documents') or not results['documents'][0]:
-                logger.warning("No results found in query response")
-                return []
+        except Exception as e:
+            logger.exception(f"Failed to search similar documents: {str(e)}")
+            return []
+    
+    def search_multilingual(
+        self,
+        query_embedding: np.ndarray,
+        languages: Sequence[str],
+        n_results: Optional[int] = None,
+        similarity_threshold: Optional[float] = None,
+        include: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[SearchResult]]:
+        """Search several languages with one query embedding, in one consistent snapshot.
+        
+        All languages are queried under a single read lock, so an index swap cannot
+        land between them. Without partitioning this is one query over all requested
+        languages, split by metadata; each partition is a separate index and needs a
+        query of its own.
+        
+        Args:
+            query_embedding (np.ndarray): Query embedding vector.
+            languages (Sequence[str]): Language codes to search.
+            n_results (Optional[int]): Number of results per language. If None, uses config default.
+            similarity_threshold (Optional[float]): Minimum similarity score to include a result. If None, uses config default.
+            include (Optional[Sequence[str]]): Fields to project into the results, as in ``search_similar``.
             
-            # Debug: Print a few examples of stored documents and their embeddings
-            logger.info("Example stored documents and their embeddings:")
-            if 'embeddings' in results and results['embeddings'] and results['embeddings'][0]:
-                for i, (doc, emb) in enumerate(zip(results['documents'][0][:2], results['embeddings'][0][:2])):
-                    logger.info(f"Document {i}: {doc}")
-                    logger.info(f"Embedding {i}: {emb[:5]}...")  # Print first 5 elements
-            else:
-                for i, doc in enumerate(results['documents'][0][:2]):
-                    logger.info(f"Document {i}: {doc}")
+        Returns:
+            Dict[str, List[SearchResult]]: Results per language, best first.
+        
+        Raises:
+            ValueError: If ``include`` names an unsupported field.
+        """
+        include = self._resolve_include(include)
+        try:
+            n_results = n_results or config.database.max_results
+            similarity_threshold = similarity_threshold or config.database.similarity_threshold
             
-            # Filter results by similarity threshold
-            filtered_results = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results['documents'][0],
-                results['metadatas'][0],
-                results['distances'][0]
-            )):
-                similarity = 1 - distance  # Convert distance to similarity
-                if similarity >= similarity_threshold:
-                    filtered_results.append({
-                        'document': doc,
-                        'metadata': metadata,
-                        'similarity': similarity
-                    })
+            languages = list(dict.fromkeys(languages))
+            results_by_language: Dict[str, List[SearchResult]] = {language: [] for language in languages}
+            with self._lock.read_lock():
+                if self.partitioned:
+                    for language in languages:
+                        results_by_language[language] = self._query_collection(
+                            self._get_partition(language), query_embedding, n_results, None, similarity_threshold, include
+                        )
+                else:
+                    # Metadata is needed to split the hits, whatever the caller asked for
+                    query_include = include if "metadatas" in include else (*include, "metadatas")
+                    hits = self._query_collection(
+                        self.collection, query_embedding, n_results * len(languages),
+                        {"language": {"$in": languages}}, similarity_threshold, query_include
+                    )
+                    for hit in hits:
+                        language_results = results_by_language[hit.metadata["language"]]
+                        if len(language_results) < n_results:
+                            language_results.append(hit)
             
-            logger.info(f"Found {len(filtered_results)} similar documents")
-            return filtered_results
+            logger.info("Found " + ", ".join(
+                f"{len(results)} {language}" for language, results in results_by_language.items()
+            ) + " similar documents")
+            return results_by_language
             
         except Exception as e:
             logger.exception(f"Failed to search similar documents: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def _resolve_include(include: Optional[Sequence[str]]) -> Tuple[str, ...]:
+        """Validate the fields a search should project; None means all of them."""
+        include = SEARCH_INCLUDE_FIELDS if include is None else tuple(include)
+        unknown = set(include) - set(SEARCH_INCLUDE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported include fields: {sorted(unknown)}")
+        return include
+    
+    def _query_collection(
+        self,
+        collection,
+        query_embedding: np.ndarray,
+        n_results: int,
+        where: Optional[Dict],
+        similarity_threshold: float,
+        include: Sequence[str] = SEARCH_INCLUDE_FIELDS
+    ) -> List[SearchResult]:
+        """Query a single collection and filter the hits by similarity threshold."""
+        # Log collection state
+        doc_count = collection.count()
+        logger.info(f"Collection state ({collection.name}): {doc_count} documents")
+        
+        if doc_count == 0:
+            logger.warning(f"Collection {collection.name} is empty. No documents to search.")
+            return []
+        
+        # Convert query embedding to list format
+        query_embedding_list = query_embedding.tolist()
+        
+        # Perform the search, projecting only the requested fields
+        results = collection.query(
+            query_embeddings=[query_embedding_list],
+            n_results=min(n_results, doc_count),
+            where=where or None,
+            include=list(include) + ["distances"]
+        )
+        
+        # Log raw results for debugging
+        logger.debug(f"Raw query results: {results}")
+        
+        if not results or not results.get('ids') or not results['ids'][0]:
+            logger.warning("No results found in query response")
+            return []
+        
+        ids = results['ids'][0]
+        documents = results['documents'][0] if "documents" in include else [None] * len(ids)
+        metadatas = results['metadatas'][0] if "metadatas" in include else [None] * len(ids)
+        
+        # Filter results by similarity threshold
+        filtered_results = []
+        for doc_id, doc, metadata, distance in zip(ids, documents, metadatas, results['distances'][0]):
+            similarity = 1 - distance  # Convert distance to similarity
+            if similarity >= similarity_threshold:
+                filtered_results.append(SearchResult(
+                    id=doc_id,
+                    similarity=similarity,
+                    document=doc,
+                    metadata=metadata,
+                    fetch=self.get_document
+                ))
+        return filtered_results
+    
+    def score_ids(
+        self,
+        query_embedding: np.ndarray,
+        ids: List[str],
+        include: Sequence[str] = SEARCH_INCLUDE_FIELDS
+    ) -> List[SearchResult]:
+        """Score specific documents against a query embedding.
+        
+        Used for candidates found by other means (e.g. keyword search) that the
+        vector search did not return. Similarities use the same scale as
+        ``search_similar``.
+        
+        Args:
+            query_embedding (np.ndarray): Query embedding vector.
+            ids (List[str]): Document IDs to score.
+            include (Sequence[str]): Fields to project into the results.
+            
+        Returns:
+            List[SearchResult]: Results for the IDs that were found, in no particular order.
+        """
+        if not ids:
+            return []
+        try:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            scored = []
+            with self._lock.read_lock():
+                for collection in self._collections_for(None):
+                    records = collection.get(ids=list(ids), include=["embeddings"] + list(include))
+                    for i, doc_id in enumerate(records['ids']):
+                        embedding = np.asarray(records['embeddings'][i], dtype=np.float32)
+                        # Collections use squared L2 distance, as does search_similar
+                        distance = float(np.sum((query - embedding) ** 2))
+                        scored.append(SearchResult(
+                            id=doc_id,
+                            similarity=1 - distance,
+                            document=records['documents'][i] if "documents" in include else None,
+                            metadata=records['metadatas'][i] if "metadatas" in include else None,
+                            fetch=self.get_document
+                        ))
+            return scored
+        except Exception as e:
+            logger.exception(f"Failed to score documents: {str(e)}")
             return []
     
     def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
@@ -214,12 +626,14 @@ class VectorDBManager:
             Optional[Dict[str, Any]]: Document with metadata if found, None otherwise.
         """
         try:
-            result = self.collection.get(ids=[doc_id])
-            if result and result['documents']:
-                return {
-                    'document': result['documents'][0],
-                    'metadata': result['metadatas'][0] if result['metadatas'] else {}
-                }
+            with self._lock.read_lock():
+                for collection in self._all_collections():
+                    result = collection.get(ids=[doc_id])
+                    if result and result['documents']:
+                        return {
+                            'document': result['documents'][0],
+                            'metadata': result['metadatas'][0] if result['metadatas'] else {}
+                        }
             return None
         except Exception as e:
             logger.exception(f"Failed to get document {doc_id}: {str(e)}")
@@ -235,27 +649,183 @@ class VectorDBManager:
             bool: True if successful, False otherwise.
         """
         try:
-            self.collection.delete(ids=[doc_id])
+            with self._exclusive():
+                for collection in self._all_collections():
+                    collection.delete(ids=[doc_id])
+            self._notify("delete", ids=[doc_id])
             logger.info(f"Successfully deleted document: {doc_id}")
             return True
         except Exception as e:
             logger.exception(f"Failed to delete document {doc_id}: {str(e)}")
             return False
     
-    def clear_collection(self) -> bool:
+    def export_records(self, include_embeddings: bool = True) -> Dict[str, Any]:
+        """Export every stored record, including its embedding.
+        
+        Args:
+            include_embeddings (bool): Whether to read the stored vectors as well.
+        
+        Returns:
+            Dict[str, Any]: ``ids``, ``documents``, ``metadatas`` lists and an ``embeddings``
+            float32 matrix with one row per record (empty if not requested).
+        """
+        fields = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        embeddings: List[List[float]] = []
+        with self._lock.read_lock():
+            for collection in self._collections_for(None):
+                records = collection.get(include=fields)
+                ids.extend(records['ids'])
+                documents.extend(records['documents'])
+                metadatas.extend(meta or {} for meta in records['metadatas'])
+                if include_embeddings:
+                    embeddings.extend(records['embeddings'])
+        
+        logger.info(f"Exported {len(ids)} records from {self.collection_name}")
+        return {
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "embeddings": np.asarray(embeddings, dtype=np.float32)
+        }
+    
+    def _all_collections(self) -> List[Any]:
+        """Get every collection managed by this instance, partitions first."""
+        return list(self.partitions.values()) + [self.collection]
+    
+    def swap_index(
+        self,
+        documents: List[str],
+        embeddings: List[np.ndarray],
+        metadatas: List[Dict[str, Any]]
+    ) -> bool:
+        """Replace the whole index with new records without pausing searches.
+        
+        The records are written into freshly created staging collections while
+        searches keep running against the current ones. The staging collections
+        are then swapped in under the exclusive lock in a single step, so readers
+        see either the old index or the new one, never a partial rebuild.
+        
+        Args:
+            documents (List[str]): List of document texts.
+            embeddings (List[np.ndarray]): List of document embeddings.
+            metadatas (List[Dict[str, Any]]): List of metadata dictionaries, each with an "id".
+            
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if len(documents) != len(embeddings) or len(documents) != len(metadatas):
+            logger.error("Number of documents, embeddings and metadatas do not match")
+            return False
+        
+        with self._write_mutex:
+            staged: Dict[Optional[str], Any] = {}
+            try:
+                ids = [meta["id"] for meta in metadatas]
+                embeddings_list = [np.asarray(emb).tolist() for emb in embeddings]
+                groups = self._group_records(ids, documents, embeddings_list, metadatas)
+                keys = set(groups) | set(self.partitions) | {None}
+                
+                for key in keys:
+                    logical_name = self.partition_name(key) if key else self.collection_name
+                    staging = self.client.create_collection(
+                        name=f"{logical_name}-{uuid.uuid4().hex[:8]}",
+                        metadata={"description": "Green Card FAQ collection"}
+                    )
+                    staged[key] = staging
+                    group = groups.get(key)
+                    if group:
+                        for start in range(0, len(group["ids"]), STAGING_BATCH_SIZE):
+                            staging.add(**{field: values[start:start + STAGING_BATCH_SIZE] for field, values in group.items()})
+            except Exception as e:
+                logger.exception(f"Failed to stage new index: {str(e)}")
+                for staging in staged.values():
+                    try:
+                        self.client.delete_collection(staging.name)
+                    except Exception:
+                        pass
+                return False
+            
+            with self._lock.write_lock():
+                retired = []
+                for key, staging in staged.items():
+                    if key is None:
+                        retired.append(self.collection)
+                        self.collection = staging
+                        self._aliases[self.collection_name] = staging.name
+                    else:
+                        retired.append(self.partitions.get(key))
+                        self.partitions[key] = staging
+                        self._aliases[self.partition_name(key)] = staging.name
+                self._save_aliases()
+            
+            # No reader can still hold the retired collections once the swap is done
+            for collection in retired:
+                if collection is None:
+                    continue
+                try:
+                    self.client.delete_collection(collection.name)
+                except Exception as e:
+                    logger.warning(f"Failed to drop retired collection {collection.name}: {e}")
+        
+        self._notify("reset")
+        logger.info(f"Swapped in new index with {len(documents)} documents")
+        return True
+    
+    def clear_collection(self, language: Optional[str] = None) -> bool:
         """Clear all documents from the collection.
         
+        Args:
+            language (Optional[str]): Only clear this language's partition. If None, clears everything.
+        
         Returns:
             bool: True if successful, False otherwise.
         """
         try:
-            self.collection.delete(where={})
-            logger.info("Successfully cleared collection")
+            with self._exclusive():
+                collections = [self._get_partition(language)] if language and self.partitioned else self._all_collections()
+                for collection in collections:
+                    ids = collection.get(include=[])['ids']
+                    if ids:
+                        collection.delete(ids=ids)
+            self._notify("reset")
+            logger.info(f"Successfully cleared collection{f' partition: {language}' if language else ''}")
             return True
         except Exception as e:
             logger.exception(f"Failed to clear collection: {str(e)}")
             return False
     
+    def rebuild_partition(self, language: str) -> bool:
+        """Drop and recreate a language partition so it can be repopulated on its own.
+        
+        Args:
+            language (str): Language of the partition to rebuild.
+            
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if not self.partitioned:
+            logger.error("Language partitioning is disabled; nothing to rebuild")
+            return False
+        try:
+            name = self.partition_name(language)
+            with self._exclusive():
+                try:
+                    self.client.delete_collection(self._physical_name(name))
+                except Exception:
+                    logger.info(f"Partition {name} did not exist yet")
+                if self._aliases.pop(name, None) is not None:
+                    self._save_aliases()
+                self.partitions[language] = self._get_or_create_collection(name)
+            self._notify("reset")
+            logger.info(f"Rebuilt empty partition: {name}")
+            return True
+        except Exception as e:
+            logger.exception(f"Failed to rebuild partition {language}: {str(e)}")
+            return False
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection.
         
@@ -263,11 +833,19 @@ class VectorDBManager:
             Dict[str, Any]: Collection statistics.
         """
         try:
-            count = self.collection.count()
+            with self._lock.read_lock():
+                if self.partitioned:
+                    partition_counts = {language: partition.count() for language, partition in self.partitions.items()}
+                    count = sum(partition_counts.values()) + self.collection.count()
+                else:
+                    partition_counts = {}
+                    count = self.collection.count()
             return {
                 "collection_name": self.collection_name,
                 "document_count": count,
-                "is_empty": count == 0
+                "is_empty": count == 0,
+                "partitioned": self.partitioned,
+                "partitions": partition_counts
             }
         except Exception as e:
             logger.exception(f"Failed to get collection stats: {str(e)}")
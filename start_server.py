@@ -101,9 +101,13 @@ def print_startup_info():
     
     print("\n📚 Available endpoints:")
     print("   - POST /query - Submit immigration questions")
+    print("   - POST /query/stream - Stream answers as server-sent events")
     print("   - GET /health - Check API health")
+    print("   - GET /ready - Readiness (models loaded and LLM reachable)")
     print("   - GET /config - View configuration")
     print("   - GET /system/info - System information")
+    print("   - GET /llm/routes - Model routing statistics")
+    print("   - GET /usage - Token usage and estimated cost")
     print("   - GET /docs - API documentation")
     
     print("\n🔗 API will be available at:")
@@ -42,6 +42,41 @@ def submit_query(question, language):
         st.error(f"Error submitting query: {str(e)}")
         return None
 
+def stream_query(question, language, on_answer):
+    """Submit a query to the streaming endpoint, rendering the answer as it arrives.
+    
+    Calls on_answer with the answer so far after every token. Returns the final
+    response in the same shape as /query, or None on failure.
+    """
+    try:
+        with requests.post(
+            f"{API_BASE_URL}/query/stream",
+            json={"question": question, "language": language},
+            stream=True,
+            timeout=30
+        ) as response:
+            if response.status_code != 200:
+                return None
+            answer, result, event = "", None, None
+            for raw_line in response.iter_lines():
+                line = raw_line.decode("utf-8")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "token":
+                        answer += data["content"]
+                        on_answer(answer)
+                    elif event == "done":
+                        result = {**data, "answer": answer}
+                    elif event == "error":
+                        st.error(f"Error processing query: {data.get('detail', 'unknown error')}")
+                        return None
+            return result
+    except Exception as e:
+        st.error(f"Error submitting query: {str(e)}")
+        return None
+
 def get_pending_questions():
     """Get questions pending expert review."""
     try:
@@ -168,17 +203,16 @@ def render_query_interface():
             submit_button = st.form_submit_button("Submit Question", type="primary")
     
     if submit_button and question.strip():
+        # Answer, rendered incrementally as tokens stream in
+        st.subheader("Answer")
+        answer_placeholder = st.empty()
         with st.spinner("Processing your question..."):
-            result = submit_query(question.strip(), language)
+            result = stream_query(question.strip(), language, answer_placeholder.markdown)
             
             if result:
                 # Display Results
                 st.success("✅ Response Generated")
                 
-                # Answer
-                st.subheader("Answer")
-                st.write(result["answer"])
-                
                 # Confidence Information
                 confidence = result.get("confidence", {})
                 if confidence:
@@ -213,6 +247,7 @@ def render_query_interface():
                             st.write("**Response Info:**")
                             st.write(f"• Model: {result.get('model', 'Unknown')}")
                             st.write(f"• Cached: {'✅' if result.get('cached') else '❌'}")
+                            st.write(f"• Route: {result.get('route', 'llm')}")
                             st.write(f"• Flagged for Review: {'✅' if confidence.get('flagged_for_review') else '❌'}")
                             if confidence.get('question_id'):
                                 st.write(f"• Question ID: {confidence['question_id']}")